@@ -0,0 +1,296 @@
+from collections.abc import Iterable
+from datetime import datetime
+from functools import partial
+from itertools import chain
+from time import time_ns
+
+from django.core.cache import cache
+from django.db.models import Model, signals
+from django.utils import timezone
+
+from .search.engine import SearchEngine
+
+
+def get_generation_seed() -> int:
+    """Возвращает начальное значение поколения для ключа, отсутствующего в кеше.
+
+    Ключ мог быть вытеснен из кеша, а процессы могли запомнить его прежние значения.
+    Поэтому отсчёт начинается не с единицы, а с текущего времени в микросекундах:
+    такое значение заведомо больше всех, до которых успели дойти прежде.
+
+    """
+    return time_ns() // 1000
+
+
+def cache_get_generation(name: str) -> int:
+    """Возвращает текущее поколение (номер версии) данных с указанным именем.
+    Поколение хранится в общем кеше и используется для инвалидации производных данных.
+
+    :param name:
+
+    """
+    return cache_get_generations(name)[0]
+
+
+def cache_get_generations(*names: str) -> list[int]:
+    """Возвращает текущие поколения данных с указанными именами (за одно обращение к кешу).
+
+    :param names:
+
+    """
+    keys = [f'generation|{name}' for name in names]
+    generations = cache.get_many(keys)
+
+    for key in keys:
+        if key not in generations:
+            cache.add(key, get_generation_seed(), None)
+            generations[key] = cache.get(key)
+
+    return [generations[key] for key in keys]
+
+
+def cache_bump_generation(name: str) -> int:
+    """Увеличивает поколение данных с указанным именем. Возвращает новое поколение.
+
+    :param name:
+
+    """
+    key = f'generation|{name}'
+
+    try:
+        return cache.incr(key)
+
+    except ValueError:
+        # Ключ вытеснен из кеша (или ещё не создавался). Начинаем отсчёт заново,
+        # но так, чтобы новое поколение не совпало с только что вытесненным.
+        generation = get_generation_seed()
+        cache.set(key, generation, None)
+        return generation
+
+
+def get_search_generation_name(model: type[Model]) -> str:
+    """Возвращает имя поколения результатов поиска для указанной модели.
+
+    :param model:
+
+    """
+    return f'search|{model._meta.concrete_model._meta.label_lower}'
+
+
+def is_update_relevant(update_fields: Iterable[str] | None, fields: Iterable[str]) -> bool:
+    """Проверяет, затрагивает ли сохранение объекта указанные поля.
+    Сохранение без ограничения полей (update_fields) затрагивает все поля.
+
+    :param update_fields: Поля, переданные в save() (см. аргумент сигнала post_save).
+    :param fields:
+
+    """
+    return update_fields is None or not set(fields).isdisjoint(update_fields)
+
+
+def get_search_fields(model: type[Model]) -> set[str]:
+    """Возвращает поля модели, от которых зависят результаты поиска по ней.
+
+    :param model:
+
+    """
+    return {
+        'status',
+        'slug',
+        SearchEngine.get_title_field(model),
+        *chain(*model.search_index_fields.values()),
+        *chain(*getattr(model, 'search_rank_fields', {}).values()),
+    }
+
+
+def search_cache_invalidate(model: type[Model], *, update_fields: Iterable[str] | None = None, **kwargs):
+    """Обработчик сигналов сохранения и удаления объектов.
+    Инвалидирует закешированные результаты поиска по области.
+
+    Сохранения, не затрагивающие значимые для поиска поля
+    (например, счётчика голосов), пропускаются.
+
+    :param model: Модель области.
+    :param update_fields:
+
+    """
+    if is_update_relevant(update_fields, get_search_fields(model)):
+        cache_bump_generation(get_search_generation_name(model))
+
+
+def search_cache_connect(*search_in: type[Model]):
+    """Подключает инвалидацию закешированных результатов поиска для указанных моделей.
+
+    :param search_in:
+
+    """
+    for model in search_in:
+        handler = partial(search_cache_invalidate, model)
+
+        # Прокси-модели (например, категории) сохраняются и от своего имени, и от имени исходной модели.
+        for sender in {model, model._meta.concrete_model}:
+            uid = f'search_cache_{sender._meta.label_lower}'
+            signals.post_save.connect(handler, sender=sender, dispatch_uid=uid, weak=False)
+            signals.post_delete.connect(handler, sender=sender, dispatch_uid=uid, weak=False)
+
+
+def get_listing_generation_name(model: type[Model]) -> str:
+    """Возвращает имя поколения закешированных количеств объектов в списках области.
+
+    :param model:
+
+    """
+    return f'listing|{model._meta.concrete_model._meta.label_lower}'
+
+
+def listing_cache_invalidate(model: type[Model]):
+    """Инвалидирует закешированные количества объектов в списках области.
+
+    :param model:
+
+    """
+    cache_bump_generation(get_listing_generation_name(model))
+
+
+def listing_cache_invalidate_deleted(sender: type[Model], **kwargs):
+    """Обработчик сигнала удаления объектов области.
+    Инвалидирует закешированные количества объектов в списках области
+    и отмечает изменение списка: объекты удаляются и минуя save()
+    (например, при слиянии персон).
+
+    :param sender:
+
+    """
+    listing_cache_invalidate(sender)
+    listing_watermark_touch(sender)
+
+
+def get_listing_watermark_key(model: type[Model], category_id: int | None = None) -> str:
+    """Возвращает ключ кеша для отметки о последнем изменении списка области
+    (либо списка объектов области в указанной категории).
+
+    :param model:
+    :param category_id:
+
+    """
+    key = f'listing_modified|{model._meta.concrete_model._meta.label_lower}'
+
+    if category_id is not None:
+        key = f'{key}|{category_id}'
+
+    return key
+
+
+def listing_watermark_get(model: type[Model], category_id: int | None = None) -> datetime:
+    """Возвращает время последнего изменения списка области
+    (для списка в категории учитываются также изменения связей с ней).
+
+    Отметки хранятся в общем кеше и не требуют обращения к БД.
+    Отсутствующая (например, вытесненная) отметка считается поставленной сейчас.
+
+    :param model:
+    :param category_id:
+
+    """
+    keys = [get_listing_watermark_key(model)]
+
+    if category_id is not None:
+        keys.append(get_listing_watermark_key(model, category_id))
+
+    watermarks = cache.get_many(keys)
+    now = timezone.now()
+
+    for key in keys:
+        if key not in watermarks:
+            cache.add(key, now, None)
+            watermarks[key] = cache.get(key, now)
+
+    return max(watermarks.values())
+
+
+def listing_watermark_touch(model: type[Model], category_id: int | None = None):
+    """Отмечает изменение списка области (либо списка объектов области в указанной категории).
+
+    :param model:
+    :param category_id:
+
+    """
+    cache.set(get_listing_watermark_key(model, category_id), timezone.now(), None)
+
+
+def listing_cache_invalidate_tie(instance: Model, **kwargs):
+    """Обработчик сигналов сохранения и удаления связей объектов с категориями.
+    Инвалидирует закешированные количества объектов и отмечает изменение
+    списка области связанного объекта и списка в категории
+    (в общем списке выводятся и категории объектов).
+
+    :param instance:
+
+    """
+    model = instance.content_type.model_class()
+
+    if model is not None:
+        listing_cache_invalidate(model)
+        listing_watermark_touch(model)
+        listing_watermark_touch(model, instance.category_id)
+
+
+def get_categories_generation_name(model: type[Model] | None = None) -> str:
+    """Возвращает имя поколения закешированного перечня категорий, к которым
+    привязаны объекты области. Если модель не указана, возвращает имя
+    общего для всех областей поколения (изменяется при изменении самих категорий).
+
+    :param model:
+
+    """
+    if model is None:
+        return 'categories'
+
+    return f'categories|{model._meta.concrete_model._meta.label_lower}'
+
+
+def categories_map_invalidate(instance: Model, **kwargs):
+    """Обработчик сигналов сохранения и удаления связей объектов с категориями.
+    Инвалидирует закешированный перечень категорий области связанного объекта.
+
+    :param instance:
+
+    """
+    model = instance.content_type.model_class()
+
+    if model is not None:
+        cache_bump_generation(get_categories_generation_name(model))
+
+
+def categories_map_invalidate_all(**kwargs):
+    """Обработчик сигналов сохранения и удаления категорий.
+    Инвалидирует закешированные перечни категорий всех областей.
+
+    """
+    cache_bump_generation(get_categories_generation_name())
+
+
+def get_details_generation_name(model: type[Model], obj_id: int) -> str:
+    """Возвращает имя поколения данных, связанных с объектом (категорий, обсуждений),
+    выводимых на странице объекта.
+
+    :param model:
+    :param obj_id:
+
+    """
+    return f'details|{model._meta.concrete_model._meta.label_lower}|{obj_id}'
+
+
+def details_cache_invalidate_linked(instance: Model, **kwargs):
+    """Обработчик сигналов сохранения и удаления объектов, привязанных
+    к другим объектам (связей с категориями, обсуждений).
+    Инвалидирует данные, выводимые на странице объекта, к которому сделана привязка.
+
+    :param instance:
+
+    """
+    content_type = instance.content_type
+    model = content_type and content_type.model_class()
+
+    if model is not None and instance.object_id:
+        cache_bump_generation(get_details_generation_name(model, instance.object_id))
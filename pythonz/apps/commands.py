@@ -4,8 +4,10 @@ from datetime import timedelta
 from django.utils import timezone
 
 from .generics.models import RealmBaseModel
+from .integration.telegram import warm_inline_cache
 from .models import ReferenceMissing
 from .realms import get_realms
+from .search.bundle import ReferenceBundle
 
 
 def publish_postponed():
@@ -48,7 +50,22 @@ def publish_postponed():
                 # В последующем возможно логика будет усложнена.
                 item = items[0]
                 item.mark_published()
-                item.save()
+                item.save(update_fields=['status'])
+
+
+def flush_missing_refs():
+    """Сбрасывает в БД накопленные в кеше промахи справочника."""
+    ReferenceMissing.flush()
+
+
+def warm_telegram_inline():
+    """Подготавливает встрочные результаты Telegram для самых частых запросов."""
+    warm_inline_cache()
+
+
+def build_ide_bundle():
+    """Формирует новую версию выгрузки справочника для IDE, если данные изменились."""
+    ReferenceBundle.build()
 
 
 def clean_missing_refs(min_hits: int = 4):
@@ -1,4 +1,5 @@
 import os
+from collections.abc import Callable, Iterable
 from contextlib import suppress
 from copy import copy
 from datetime import datetime
@@ -16,9 +17,11 @@ from django.utils.functional import cached_property
 from django.utils.html import urlize
 from django.utils.text import Truncator
 from etc.models import InheritedModelMetaclass
+from sitecats.models import ModelWithCategory
 from siteflags.models import ModelWithFlag
 from slugify import CYRILLIC, Slugify
 
+from ..caching import listing_cache_invalidate, listing_watermark_touch
 from ..integration.base import RemoteSource
 from ..integration.utils import get_image_from_url
 from ..signals import sig_entity_new, sig_entity_published, sig_support_changed
@@ -53,7 +56,65 @@ class ModelWithAuthorAndTranslator(models.Model):
         abstract = True
 
 
-class ModelWithCompiledText(models.Model):
+class ModelWithTrackedFields(models.Model):
+    """Класс-примесь для моделей, которым требуется знать,
+    изменились ли значения некоторых полей с момента загрузки из БД.
+
+    """
+    tracked_fields: tuple[str, ...] = ('title', 'description', 'text_src')
+    """Поля, изменения которых отслеживаются. Отсутствующие в модели поля пропускаются."""
+
+    class Meta:
+        abstract = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._remember_tracked()
+
+    def _remember_tracked(self, update_fields: Iterable[str] | None = None):
+        # Отложенные (не загруженные) поля отсутствуют в __dict__, их не трогаем,
+        # чтобы не порождать лишних запросов к БД.
+        values = self.__dict__
+
+        if update_fields is None:
+            self._tracked_initial = {name: values[name] for name in self.tracked_fields if name in values}
+            return
+
+        # Запоминаем лишь записанные в БД поля, прочие изменения остаются несохранёнными.
+        self._tracked_initial.update({
+            name: values[name] for name in self.tracked_fields
+            if name in update_fields and name in values
+        })
+
+    def is_field_changed(self, name: str, update_fields: Iterable[str] | None = None) -> bool:
+        """Возвращает флаг, указывающий на то, изменилось ли значение поля
+        с момента загрузки объекта из БД (либо с момента последнего сохранения).
+        Для новых объектов всегда возвращает True.
+
+        :param name: Имя поля.
+        :param update_fields: Поля, ограничивающие сохранение (см. .save()).
+            Если поле не входит в их число, оно считается неизменившимся.
+
+        """
+        if update_fields is not None and name not in update_fields:
+            return False
+
+        if self._state.adding:
+            return True
+
+        if name not in self.__dict__:
+            return False
+
+        initial = self._tracked_initial
+
+        return name not in initial or initial[name] != self.__dict__[name]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_tracked(kwargs.get('update_fields'))
+
+
+class ModelWithCompiledText(ModelWithTrackedFields):
     """Класс-примесь для моделей, требующих поля, содержащие тексты в rst."""
 
     text = models.TextField('Текст')
@@ -65,14 +126,28 @@ class ModelWithCompiledText(models.Model):
     @classmethod
     def compile_text(cls, text: str) -> str:
         """Преобразует rst-подобное форматирование в html.
+        Результаты для одинаковых текстов берутся из кеша.
 
         :param text:
 
         """
-        return TextCompiler.compile(text)
+        return TextCompiler.compile_cached(text)
 
     def save(self, *args, **kwargs):
-        self.text = self.compile_text(self.text_src)
+        """Перекрыт, чтобы скомпилировать текст, если изменился его исходник.
+
+        :param args:
+        :param kwargs:
+
+        """
+        update_fields = kwargs.get('update_fields')
+
+        if self.is_field_changed('text_src', update_fields):
+            self.text = self.compile_text(self.text_src)
+
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'text'}
+
         super().save(*args, **kwargs)
 
 
@@ -88,7 +163,7 @@ def get_upload_to(instance: Model, filename: str) -> str:
     return os.path.join('img', category, 'orig', f'{uuid4()}{os.path.splitext(filename)[-1]}')  # noqa PTH122,PTH118
 
 
-class CommonEntityModel(models.Model):
+class CommonEntityModel(ModelWithTrackedFields):
     """Базовый класс для моделей сущностей."""
 
     COVER_UPLOAD_TO = 'common'  # Имя категории (оно же имя директории) для хранения загруженных обложек.
@@ -119,6 +194,30 @@ class CommonEntityModel(models.Model):
     allow_linked: bool = True
     """Разрешена ли привязка элементов друг к другу."""
 
+    _typographed: dict[str, str] = {}
+    """Значения полей, уже обработанных типографом (см. .typograph_many())."""
+
+    @classmethod
+    def typograph_many(cls, items: list[dict]) -> list[dict[str, str]]:
+        """Приводит в порядок заголовки и описания в данных нескольких объектов разом
+        (см. BasicTypograph.apply_many()). Возвращает для каждого объекта словарь
+        обработанных значений, который следует поместить в атрибут ._typographed
+        созданного объекта, чтобы при сохранении значения повторно не обрабатывались.
+
+        :param items: Словари с данными объектов. Изменяются на месте.
+
+        """
+        typographed = [{} for _ in items]
+
+        for name in ('title', 'description'):
+            indexes = [idx for idx, item_data in enumerate(items) if item_data.get(name)]
+            values = BasicTypograph.apply_many([items[idx][name] for idx in indexes])
+
+            for idx, value in zip(indexes, values, strict=True):
+                items[idx][name] = typographed[idx][name] = value
+
+        return typographed
+
     def generate_slug(self) -> str:
         """Генерирует краткое имя для URL и заполняет им атрибут slug."""
         return SLUGIFIER(self.title)
@@ -137,14 +236,20 @@ class CommonEntityModel(models.Model):
         return super().validate_unique(exclude)
 
     def save(self, *args, **kwargs):
-        """Перекрыт, чтобы привести заголовок в порядок.
+        """Перекрыт, чтобы привести заголовок и описание в порядок, если они изменились.
 
         :param args:
         :param kwargs:
 
         """
-        self.title = BasicTypograph.apply_to(self.title)
-        self.description = BasicTypograph.apply_to(self.description)
+        update_fields = kwargs.get('update_fields')
+        typographed = self._typographed
+
+        if self.is_field_changed('title', update_fields) and typographed.get('title') != self.title:
+            self.title = BasicTypograph.apply_to(self.title)
+
+        if self.is_field_changed('description', update_fields) and typographed.get('description') != self.description:
+            self.description = BasicTypograph.apply_to(self.description)
 
         if not self.id and self.slug_auto:
             self.slug = self.generate_slug()
@@ -216,7 +321,7 @@ class RealmFilteredQuerySet(models.QuerySet):
         return self.filter(status=RealmBaseModel.Status.POSTPONED)
 
 
-class RealmBaseModel(ModelWithFlag):
+class RealmBaseModel(ModelWithFlag, ModelWithTrackedFields):
     """Базовый класс для моделей, использующихся в областях (realms) сайта."""
 
     @unique
@@ -277,6 +382,12 @@ class RealmBaseModel(ModelWithFlag):
 
     """
 
+    paginator_keyset: bool = False
+    """Следует ли для глубоких страниц списка использовать навигацию по ключу
+    (paginator_order, id) вместо смещения. Поле paginator_order не должно допускать NULL.
+
+    """
+
     paginator_defer: list[str] = []
     """Тяжелые поля, содержимое которых не важно для списков."""
 
@@ -292,6 +403,21 @@ class RealmBaseModel(ModelWithFlag):
 
     """
 
+    search_index_fields: dict[str, tuple[str, ...]] = {}
+    """Поля, попадающие в полнотекстовый индекс, разложенные
+    по колонкам индекса (title, terms, description). См. FullTextIndex.
+
+    """
+
+    search_rank_fields: dict[str, tuple[str, ...]] = {}
+    """Поля, учитываемые при ранжировании результатов поиска (см. Ranker).
+    Если не указаны, используются search_index_fields.
+
+    """
+
+    search_boost: float = 1.0
+    """Коэффициент, на который умножается оценка результатов поиска из этой области."""
+
     @classmethod
     def make_html(cls, text: str) -> str:
         """Применяет базовую html-разметку к указанному тексту.
@@ -328,6 +454,12 @@ class RealmBaseModel(ModelWithFlag):
 
         self._status_backup = self.status
 
+    publish_update_fields: tuple[str, ...] = ()
+    """Поля, изменяемые в .on_publish(). При сохранении с ограничением
+    полей (update_fields) и публикацией сохраняются дополнительно.
+
+    """
+
     def on_publish(self):
         """Вызывается при смене стутуса на «Опубликовано»."""
 
@@ -344,11 +476,17 @@ class RealmBaseModel(ModelWithFlag):
 
             notify_new - флаг, указывающий на то, требуется ли отослать
                 оповещения о создании сущности.
+
+            update_fields - поля, которые требуется сохранить. Выставляемые здесь
+                поля времени публикации и модификации добавляются к ним автоматически.
         """
         initial_pk = self.pk
         notify_published = kwargs.pop('notify_published', None)
         notify_new = kwargs.pop('notify_new', True)
 
+        update_fields = kwargs.get('update_fields')
+        update_fields = None if update_fields is None else set(update_fields)
+
         now = timezone.now()
 
         if (status_changed := self._status_backup != self.status) or self._consider_published:
@@ -360,21 +498,41 @@ class RealmBaseModel(ModelWithFlag):
                 if self.is_published:
                     self.on_publish()
 
+                    if update_fields is not None:
+                        update_fields.update(self.publish_update_fields)
+
             if self.is_published:
                 self.time_published = now
                 self._consider_published = False
 
+                if update_fields is not None:
+                    update_fields.add('time_published')
+
                 if notify_published is None:
                     notify_published = True
 
         if self._consider_modified:
             self.time_modified = now
 
+            if update_fields is not None:
+                update_fields.add('time_modified')
+
         else:
             self._consider_modified = True
 
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
+
         super().save(*args, **kwargs)
 
+        if status_changed:
+            # Объект мог появиться в списках области, либо исчезнуть из них.
+            listing_cache_invalidate(self.__class__)
+
+        # Изменения даже неопубликованных объектов могут отразиться в списках
+        # (например, в списке пользователей), поэтому отмечаем любое сохранение.
+        listing_watermark_touch(self.__class__)
+
         with suppress(AttributeError):  # Пропускаем модели, в которых нет нужных атрибутов.
 
             if notify_new and (not initial_pk and self.pk):
@@ -446,52 +604,100 @@ class RealmBaseModel(ModelWithFlag):
     def cache_get_key_most_voted_objects(cls, category: 'Category' = None, class_name: str = None) -> str:
         """Возвращает ключ кеша, содержащего наиболее популярные материалы раздела.
 
-        :param category:
+        :param category: Категория, либо её идентификатор.
         :param class_name:
 
         """
         if class_name is None:
             class_name = cls.__name__
 
-        return f'most_voted|{class_name}|{category}'
+        return f"most_voted|{class_name}|{getattr(category, 'id', category)}"
+
+    most_voted_num: int = 3
+    """Количество наиболее популярных материалов, выводимых в списках."""
 
     @classmethod
-    def get_most_voted_objects(cls, category: 'Category' = None, base_query: QuerySet = None) -> QuerySet:
+    def get_most_voted_objects(
+        cls,
+        category: 'Category' = None,
+        base_query: QuerySet | Callable[[], QuerySet] = None
+    ) -> list['RealmBaseModel']:
         """Возвращает наиболее популярные материалы раздела (и, опционально, категории в нём).
 
-        :param category:
-        :param base_query:
+        В кеше хранятся только идентификаторы материалов. Сами материалы
+        получаются одним запросом.
+
+        :param category: Категория, либо её идентификатор.
+
+        :param base_query: Выборка, из которой следует выбирать материалы.
+            Может быть передана функцией, возвращающей выборку: тогда она
+            будет вызвана, только если идентификаторов нет в кеше.
 
         """
         cache_key = cls.cache_get_key_most_voted_objects(category=category)
-        objects = cache.get(cache_key)
+        ids = cache.get(cache_key)
 
-        if objects is None:
+        if ids is None:
 
             if base_query is None:
                 base_query = cls.objects.published()
 
-            query = base_query.filter(supporters_num__gt=0)
+            elif callable(base_query):
+                base_query = base_query()
+
+            query = base_query.filter(supporters_num__gt=0).order_by('-supporters_num')
+            ids = list(query.values_list('id', flat=True)[:cls.most_voted_num])
+
+            cache.set(cache_key, ids, 86400)
+
+        if not ids:
+            return []
 
-            if cls.paginator_related:
-                query = query.select_related(*cls.paginator_related)
+        query = cls.objects.published()
 
-            query = query.order_by('-supporters_num')
-            objects = query.all()[:3]
+        if cls.paginator_related:
+            query = query.select_related(*cls.paginator_related)
 
-            cache.set(cache_key, objects, 86400)
+        objects = query.in_bulk(ids)
 
-        return objects
+        if len(objects) < len(ids):
+            # Материалы, снятые с публикации после кеширования, пропускаем,
+            # а перечень при следующем обращении собираем заново.
+            cache.delete(cache_key)
+
+        return [objects[obj_id] for obj_id in ids if obj_id in objects]
 
     @classmethod
     def cache_delete_most_voted_objects(cls, **kwargs):
-        """Очищает кеш наиболее популярных материлов раздела.
+        """Очищает кеш наиболее популярных материлов раздела,
+        а также категорий, к которым привязан материал (entity), если он указан.
+
+        Также служит обработчиком сигналов сохранения и удаления связей объектов
+        с категориями (instance): тогда очищается кеш лишь для категории связи.
 
         :param kwargs:
 
         """
-        # TODO Не инвалидирует кеш в категориях раздела. При случае решить, а нужно ли вообще.
-        cache.delete(cls.cache_get_key_most_voted_objects(class_name=kwargs['sender']))
+        if (tie := kwargs.get('instance')) is not None:
+            model = tie.content_type.model_class()
+
+            if model is not None:
+                cache.delete(cls.cache_get_key_most_voted_objects(category=tie.category_id, class_name=model.__name__))
+
+            return
+
+        class_name = kwargs['sender']
+        keys = [cls.cache_get_key_most_voted_objects(class_name=class_name)]
+
+        entity = kwargs.get('entity')
+
+        if isinstance(entity, ModelWithCategory):
+            keys.extend(
+                cls.cache_get_key_most_voted_objects(category=category_id, class_name=class_name)
+                for category_id in entity.categories.values_list('category_id', flat=True)
+            )
+
+        cache.delete_many(keys)
 
     @property
     def is_draft(self) -> bool:
@@ -528,13 +734,14 @@ class RealmBaseModel(ModelWithFlag):
         ).filter(status=RealmBaseModel.Status.PUBLISHED).select_related('submitter')
 
     @classmethod
-    def get_most_voted_objects_in_category(cls, category: 'Category') -> QuerySet:
+    def get_most_voted_objects_in_category(cls, category: 'Category') -> list['RealmBaseModel']:
         """Возвращает наиболее популярные объекты из указанной категории.
 
         :param category:
 
         """
-        return cls.get_most_voted_objects(category=category, base_query=cls.get_category_objects_base_query(category))
+        return cls.get_most_voted_objects(
+            category=category, base_query=lambda: cls.get_category_objects_base_query(category))
 
     @classmethod
     def get_objects_in_category(cls, category: 'Category') -> QuerySet:
@@ -554,9 +761,9 @@ class RealmBaseModel(ModelWithFlag):
         self.supporters_num += 1
         self.set_flag(user, status=self.FLAG_STATUS_SUPPORT)
         self.mark_unmodified()
-        self.save()
+        self.save(update_fields=['supporters_num'])
 
-        sig_support_changed.send(self.__class__.__name__)
+        sig_support_changed.send(self.__class__.__name__, entity=self)
 
     def remove_support(self, user: 'User'):
         """Убирает флаг поддержки данным пользователем данной сущности.
@@ -567,9 +774,9 @@ class RealmBaseModel(ModelWithFlag):
         self.supporters_num -= 1
         self.remove_flag(user, status=self.FLAG_STATUS_SUPPORT)
         self.mark_unmodified()
-        self.save()
+        self.save(update_fields=['supporters_num'])
 
-        sig_support_changed.send(self.__class__.__name__)
+        sig_support_changed.send(self.__class__.__name__, entity=self)
 
     def get_suppport_for_objects(self, objects_list: QuerySet, user: 'User') -> dict:
         """Возвращает данные о поддержке пользователем(ями) указанного набора сущностей.
@@ -752,12 +959,18 @@ class WithRemoteSource(RealmBaseModel, metaclass=WithRemoteSourceMeta):
 
             ).values_list('src_id', flat=True))
 
-            for item_data in items:
+            items = [item_data for item_data in items if item_data['src_id'] not in seen]
+            typographed = []
 
-                if item_data['src_id'] in seen:
-                    continue
+            if issubclass(cls, CommonEntityModel):
+                # Типограф обрабатывает заголовки и описания всех новых записей разом.
+                typographed = cls.typograph_many(items)
 
+            for idx, item_data in enumerate(items):
                 obj = cls.spawn_object(item_data, source=source_obj)
 
+                if typographed:
+                    obj._typographed = typographed[idx]
+
                 # По одному, чтобы отработала логика save().
                 obj.save(notify_published=False)
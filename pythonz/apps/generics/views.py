@@ -1,29 +1,56 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from collections.abc import Callable
 from datetime import datetime
+from hashlib import md5
+from typing import Any
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import PermissionDenied
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, PermissionDenied, ValidationError
 from django.core.paginator import EmptyPage, Page, Paginator
-from django.db.models import QuerySet
-from django.http import Http404, HttpRequest
+from django.db.models import Model, Q, QuerySet
+from django.http import Http404, HttpRequest, JsonResponse
 from django.shortcuts import HttpResponse, get_object_or_404, redirect, render
 from django.utils.decorators import method_decorator
+from django.utils.functional import cached_property
 from django.views.decorators.http import condition
 from django.views.generic.base import View
 from siteajax.toolbox import ajax_dispatch
 from sitecats.models import Tie
 from sitecats.toolbox import get_category_aliases_under
 
+from ..caching import (
+    cache_get_generation,
+    cache_get_generations,
+    get_categories_generation_name,
+    get_details_generation_name,
+    get_listing_generation_name,
+    listing_watermark_get,
+)
 from ..exceptions import PythonzException, RedirectRequired
 from ..integration.partners import get_partner_links
 from ..models import Article, Category, Community, Discussion, Event, ModelWithCategory, ModelWithDiscussions, User
-from ..utils import message_error, message_info, message_success, message_warning
+from ..utils import (
+    TextCompiler,
+    message_error,
+    message_info,
+    message_success,
+    message_warning,
+)
 from .models import ModelWithCompiledText, RealmBaseModel
 
 if False:  # pragma: nocover
     from .realms import RealmBase  # noqa
 
+ETAG_VERSION = f'{settings.VERSION}-{TextCompiler.VERSION}'
+"""Версия разметки страниц для ETag. Изменяется с версией сайта (код, шаблоны)
+и версией компилятора текстов, поэтому после обновления страницы отдаются заново.
+
+"""
+
 
 class HttpRequest(HttpRequest):
 
@@ -175,31 +202,200 @@ class RealmView(View):
         return get_object_or_404(q, pk=obj_id)
 
 
+class CachedCountPaginator(Paginator):
+    """Постраничная навигация, кеширующая количество объектов.
+
+    Ключ кеша включает запрос выборки (а значит, и категорию, и фильтры)
+    и поколение области, увеличивающееся при смене статуса её объектов
+    и изменении их связей с категориями (см. listing_cache_invalidate()).
+
+    """
+    timeout: int = 86400
+    """Время жизни закешированного количества (в секундах)."""
+
+    def __init__(self, objects: QuerySet | list, per_page: int, *, model: type[Model]):
+        """
+        :param objects:
+        :param per_page:
+        :param model: Модель области.
+
+        """
+        super().__init__(objects, per_page)
+        self.model = model
+
+    def get_cache_key(self) -> str | None:
+        """Возвращает ключ кеша для количества объектов,
+        либо None, если количество кешировать не следует.
+
+        """
+        objects = self.object_list
+
+        if not isinstance(objects, QuerySet):
+            return None
+
+        try:
+            sql = str(objects.order_by().query)
+
+        except EmptyResultSet:
+            return None
+
+        generation = cache_get_generation(get_listing_generation_name(self.model))
+
+        return f'listing_count|{generation}|{md5(sql.encode()).hexdigest()}'
+
+    @cached_property
+    def count(self) -> int:
+        key = self.get_cache_key()
+
+        if key is None:
+            return super().count
+
+        count = cache.get(key)
+
+        if count is None:
+            count = super().count
+            cache.set(key, count, self.timeout)
+
+        return count
+
+
+class KeysetPage(list):
+    """Страница навигации по ключу (см. KeysetPaginator).
+    Поддерживает атрибуты Page, используемые в шаблоне навигации.
+
+    """
+    is_keyset: bool = True
+    has_previous: bool = True
+    before_current: tuple = ()
+    after_current: tuple = ()
+
+    def __init__(self, items: list, *, cursor_next: str):
+        super().__init__(items)
+        self.cursor_next = cursor_next
+        self.has_next = bool(cursor_next)
+
+
+class KeysetPaginator:
+    """Постраничная навигация по ключу (keyset, seek).
+
+    Вместо пропуска строк предыдущих страниц (OFFSET) выбираются строки,
+    следующие за последней строкой предыдущей страницы по паре (поле сортировки, id).
+    Позиция передаётся в адресе страницы в виде курсора. Подсчёт количества
+    строк не требуется, а стоимость выборки не зависит от глубины страницы
+    при наличии составного индекса (поле сортировки, id) в том же направлении.
+
+    """
+    def __init__(self, objects: QuerySet, per_page: int, *, order: str):
+        """
+        :param objects:
+        :param per_page:
+        :param order: Поле сортировки (с минусом для обратного порядка). Не должно допускать NULL.
+
+        """
+        self.per_page = per_page
+        self.field = order.lstrip('-')
+        self.descending = order.startswith('-')
+        self.objects = objects.order_by(order, '-pk' if self.descending else 'pk')
+        """Объекты, упорядоченные по ключу. Их же следует использовать и для страниц со смещением."""
+
+    def get_cursor(self, obj: Model) -> str:
+        """Возвращает курсор, указывающий на позицию после указанного объекта.
+
+        :param obj:
+
+        """
+        # str() сохраняет точность значений (например, микросекунды для дат).
+        value = json.dumps([getattr(obj, self.field), obj.pk], default=str)
+        return urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+    def parse_cursor(self, cursor: str) -> tuple[Any, int] | None:
+        """Возвращает значение поля сортировки и идентификатор из курсора,
+        либо None, если курсор некорректен.
+
+        :param cursor:
+
+        """
+        field = self.objects.model._meta.get_field(self.field)
+
+        try:
+            value, pk = json.loads(urlsafe_b64decode(f"{cursor}{'=' * (-len(cursor) % 4)}"))
+            return field.to_python(value), int(pk)
+
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def page(self, cursor: str) -> KeysetPage | None:
+        """Возвращает страницу, следующую за позицией курсора,
+        либо None, если курсор некорректен.
+
+        :param cursor:
+
+        """
+        position = self.parse_cursor(cursor)
+
+        if position is None:
+            return None
+
+        value, pk = position
+        field = self.field
+        lookup = 'lt' if self.descending else 'gt'
+
+        # Ограничение (field <= value) вынесено отдельно от дизъюнкции,
+        # чтобы ведущий столбец составного индекса (field, id) использовался для поиска диапазона.
+        items = list(self.objects.filter(
+            Q(**{f'{field}__{lookup}e': value}),
+            Q(**{f'{field}__{lookup}': value}) | Q(**{f'pk__{lookup}': pk}),
+        )[:self.per_page + 1])
+
+        return KeysetPage(items[:self.per_page], cursor_next=self.get_next_cursor(items))
+
+    def get_next_cursor(self, items: list) -> str:
+        """Возвращает курсор следующей страницы, либо пустую строку, если её нет.
+
+        :param items: Объекты страницы, дополненные первым объектом следующей.
+
+        """
+        if len(items) <= self.per_page:
+            return ''
+
+        return self.get_cursor(items[self.per_page - 1])
+
+
 class ListingView(RealmView):
     """Список объектов."""
 
-    def get_last_modified(self, *args, **kwargs) -> datetime | None:
-        """Возвращает Last-Modified для списка сущностей."""
+    keyset_numbered_pages: int = 10
+    """Количество первых страниц с номерной навигацией для областей,
+    в которых включена навигация по ключу (см. RealmBaseModel.paginator_keyset).
 
-        field = 'time_published'
-        objects = self.get_paginator_objects()
+    """
 
-        if isinstance(objects, list):
-            # Если пришёл список, значит кеширование должно
-            # было быть реализовано при его составлении.
-            return
+    def get_watermark(self) -> datetime:
+        """Возвращает время последнего изменения списка (см. listing_watermark_get())."""
 
-        last = objects.values(field).order_by(field).last()
+        category_id = self.kwargs.get('category_id')
 
-        return last and last[field]
+        return listing_watermark_get(self.realm.model, None if category_id is None else int(category_id))
 
+    def get_last_modified(self, *args, **kwargs) -> datetime | None:
+        """Возвращает Last-Modified для списка сущностей."""
+        return self.get_watermark()
+
+    def get_etag(self, request: HttpRequest, *args, **kwargs) -> str | None:
+        """Возвращает слабый ETag для списка сущностей.
+        Учитывает пользователя, так как страница для него может отличаться.
+
+        """
+        return f'W/"{ETAG_VERSION}-{self.get_watermark().timestamp()}-{request.user.pk or 0}"'
+
+    func_etag = get_etag
     func_last_mod = get_last_modified
 
     def get_paginator_objects(self) -> QuerySet:
         """Возвращает объекты для страницы при постраницчной навигации."""
         return self.realm.model.get_paginator_objects()
 
-    def get_most_voted_objects(self) -> QuerySet:
+    def get_most_voted_objects(self) -> QuerySet | list:
         """Возвращает объекты, за которые было отдано больше всего голосов."""
         return self.realm.model.get_most_voted_objects()
 
@@ -227,30 +423,80 @@ class ListingView(RealmView):
     def get_paginator_per_page(self, request: HttpRequest) -> int:
         return self.realm.model.items_per_page
 
+    def get_keyset_paginator(self, objects: QuerySet | list, per_page: int) -> KeysetPaginator | None:
+        """Возвращает объект навигации по ключу, если она включена для области.
+
+        :param objects:
+        :param per_page:
+
+        """
+        model = self.realm.model
+
+        if not model.paginator_keyset or isinstance(objects, list):
+            return None
+
+        return KeysetPaginator(objects, per_page, order=model.paginator_order)
+
+    def extend_keyset(self, page_items: Page, keyset: KeysetPaginator):
+        """Ограничивает номерную навигацию неглубокими страницами.
+        С последней из них навигация продолжается по ключу.
+
+        :param page_items:
+        :param keyset:
+
+        """
+        numbered_max = self.keyset_numbered_pages
+        page_items.after_current = [page for page in page_items.after_current if page <= numbered_max]
+        page_items.hide_last = True
+
+        if page_items.number >= numbered_max and page_items.has_next():
+            page_items.cursor_next = keyset.get_cursor(page_items[-1])
+
+    categories_limit: int = 30
+    """Максимальное количество категорий в перечне категорий области."""
+
     @classmethod
-    def get_categories(cls) -> list[Category]:
+    def get_categories_map(cls) -> list[tuple[int, str, str]]:
+        """Возвращает перечень категорий, к которым привязаны объекты области:
+        идентификаторы, названия и адреса страниц со списками объектов в категориях.
+
+        Перечень хранится в общем кеше и строится заново при изменении
+        связей объектов области с категориями, либо самих категорий.
 
+        """
         model = cls.realm.model
 
-        if not issubclass(model, ModelWithCategory):
-            return []
+        generations = cache_get_generations(
+            get_categories_generation_name(), get_categories_generation_name(model))
+        cache_key = f"categories_map|{model._meta.label_lower}|{'|'.join(map(str, generations))}"
 
-        content_type = ContentType.objects.get_for_model(model, for_concrete_model=False)
+        categories_map = cache.get(cache_key)
 
-        categories = [
-            Category(id=category_id, title=category_title)
-            for category_id, category_title in
-                Tie.objects.filter(content_type=content_type).
-                    values_list('category_id', 'category__title').
-                    distinct()[:30]
-        ]
+        if categories_map is None:
+            content_type = ContentType.objects.get_for_model(model, for_concrete_model=False)
+            get_url = model.get_category_absolute_url
+
+            categories_map = [
+                (category_id, category_title, get_url(Category(id=category_id)))
+                for category_id, category_title in
+                    Tie.objects.filter(content_type=content_type).
+                        values_list('category_id', 'category__title').
+                        distinct()[:cls.categories_limit]
+            ]
+            cache.set(cache_key, categories_map, None)
 
-        get_url = model.get_category_absolute_url
+        return categories_map
 
-        for category in categories:
-            category.note = get_url(category)
+    @classmethod
+    def get_categories(cls) -> list[Category]:
 
-        return categories
+        if not issubclass(cls.realm.model, ModelWithCategory):
+            return []
+
+        return [
+            Category(id=category_id, title=category_title, note=url)
+            for category_id, category_title, url in cls.get_categories_map()
+        ]
 
     def get(self, request: HttpRequest, category_id: int = None) -> HttpResponse:
 
@@ -260,15 +506,31 @@ class ListingView(RealmView):
         except (TypeError, ValueError):
             page = 1
 
-        paginator = Paginator(self.get_paginator_objects(), self.get_paginator_per_page(request))
+        objects = self.get_paginator_objects()
+        per_page = self.get_paginator_per_page(request)
 
-        try:
-            page_items = paginator.page(page)
+        keyset = self.get_keyset_paginator(objects, per_page)
+        page_items = None
+
+        if keyset is not None:
+            objects = keyset.objects
+
+            if cursor := request.GET.get('after'):
+                page_items = keyset.page(cursor)
+
+        if page_items is None:
+            paginator = CachedCountPaginator(objects, per_page, model=self.realm.model)
+
+            try:
+                page_items = paginator.page(page)
+
+            except EmptyPage:
+                page_items = paginator.page(1)
 
-        except EmptyPage:
-            page_items = paginator.page(1)
+            self.extend_paginator(page_items)
 
-        self.extend_paginator(page_items)
+            if keyset is not None:
+                self.extend_keyset(page_items, keyset)
 
         category = None
         if category_id is not None:
@@ -290,6 +552,53 @@ class ListingView(RealmView):
 class DetailsView(RealmView):
     """Детальная информация об объекте."""
 
+    use_etag: bool = True
+    """Следует ли выдавать ETag (см. .get_etag()). Отключается для страниц,
+    на которых выводятся также данные других объектов (версия которых в ETag не учитывается).
+
+    """
+
+    _item: RealmBaseModel | None = None
+
+    def get_object_or_404(self, obj_id: int) -> RealmBaseModel:
+        # Объект требуется и для ETag, и для самой страницы. Получаем его единожды.
+        if self._item is None:
+            self._item = super().get_object_or_404(obj_id)
+        return self._item
+
+    def get_etag(self, request: HttpRequest, obj_id: int) -> str | None:
+        """Возвращает слабый ETag для страницы объекта.
+
+        Учитывает версию разметки страниц, версию объекта, поколение
+        привязанных к нему данных (категорий, обсуждений; изменяется и при
+        перекомпиляции текста), а также пользователя и его флаги
+        (закладка, голос) для объекта.
+
+        :param request:
+        :param obj_id:
+
+        """
+        if not self.use_etag or request.headers.get('HX-Request'):
+            # Ajax-ответы отличаются от страницы, хотя адрес у них тот же.
+            return None
+
+        item = self.get_object_or_404(obj_id)
+        user = request.user
+
+        version = item.time_modified or item.time_published or item.time_created
+        generation = cache_get_generation(get_details_generation_name(item.__class__, item.pk))
+
+        flags = ''
+        if user.is_authenticated:
+            flags = ','.join(map(str, sorted(item.get_flags(user).values_list('status', flat=True))))
+
+        return (
+            f'W/"{ETAG_VERSION}-{item.pk}-{version.timestamp()}-{item.status}-{item.supporters_num}-{generation}-'
+            f'{user.pk or 0}-{flags}"'
+        )
+
+    func_etag = get_etag
+
     def _attach_support_data(self, item: RealmBaseModel, request: HttpRequest):
         """Цепляет к объекту данные о поданном за него голосе пользователя.
 
@@ -444,7 +753,7 @@ class TagsView(ListingView):
     def get_paginator_objects(self) -> QuerySet:
         return self.realm.model.get_objects_in_category(self.kwargs['category_id'])
 
-    def get_most_voted_objects(self) -> QuerySet:
+    def get_most_voted_objects(self) -> list:
         return self.realm.model.get_most_voted_objects_in_category(self.kwargs['category_id'])
 
 
@@ -458,10 +767,19 @@ class EditView(RealmView):
     def preview_rst(self, request: HttpRequest, obj_id: int | None = None) -> HttpResponse:
         """Обслуживает ajax-запрос. Обрабатывает запрос на предварительный просмотр текста в формате rst.
 
+        Если в запросе перечислены блоки, уже имеющиеся на странице (preview_blocks),
+        возвращает поблочное описание предпросмотра в JSON (см. TextCompiler.compile_preview()).
+
         :param request:
 
         """
-        return HttpResponse(ModelWithCompiledText.compile_text(request.POST.get('text_src', '')))
+        text_src = request.POST.get('text_src', '')
+        known = request.POST.get('preview_blocks')
+
+        if known is None:
+            return HttpResponse(ModelWithCompiledText.compile_text(text_src))
+
+        return JsonResponse(TextCompiler.compile_preview(text_src, known=filter(None, known.split(','))))
 
     @ajax_dispatch({
         'preview-rst': preview_rst,
@@ -1,13 +1,17 @@
+from collections import Counter
 from functools import lru_cache
+from hashlib import md5
 from pathlib import Path
 from typing import TYPE_CHECKING, Union
 
 import telebot
 from bleach import clean
 from django.conf import settings
+from django.core.cache import cache
 from django.http import HttpRequest
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup, InlineQuery, Message
 
+from ..caching import cache_get_generation, get_search_generation_name
 from ..models import PEP, Reference
 from ..utils import get_logger, truncate_chars
 from ..zen import ZEN
@@ -152,26 +156,147 @@ def compose_entities_inline_result(entities: list[Union['RealmBaseModel', 'Commo
     return results
 
 
-@lru_cache(maxsize=64)
-def get_inline_reference(term: str, items_limit: int = 25) -> list:
+INLINE_MODELS: dict[str, type['RealmBaseModel']] = {
+    'reference': Reference,
+    'pep': PEP,
+}
+"""Модели, по которым производится поиск для встрочных результатов, индексированные видами результатов."""
+
+INLINE_LIMITS: dict[str, int] = {
+    'reference': 25,
+    'pep': 10,
+}
+"""Максимальное кол-во элементов для получения."""
+
+
+class SerializedResult(telebot.types.JsonSerializable):
+    """Заранее сериализованный встрочный результат."""
+
+    def __init__(self, json: str):
+        self.json = json
+
+    def to_json(self) -> str:
+        return self.json
+
+
+INLINE_CACHE_TIMEOUT: int = 60 * 60
+"""Время жизни закешированных встрочных результатов (в секундах)."""
+
+INLINE_WARM_SIZE: int = 100
+"""Количество самых частых запросов, результаты для которых подготавливаются заранее."""
+
+INLINE_STATS_FLUSH_EVERY: int = 20
+"""Через сколько запросов процесс сбрасывает свою статистику запросов в общий кеш."""
+
+INLINE_STATS_KEY: str = 'telegram_inline|stats'
+
+_inline_stats: Counter = Counter()
+"""Статистика запросов текущего процесса, ещё не сброшенная в общий кеш."""
+
+
+def get_inline_cache_key(kind: str, term: str) -> str:
+    """Возвращает ключ кеша для встрочных результатов.
+
+    Ключ включает поколение результатов поиска по области,
+    поэтому изменения в ней делают закешированные результаты недействительными.
+
+    :param kind: Вид результатов: reference, pep.
+    :param term: Текст запроса
+
+    """
+    generation = cache_get_generation(get_search_generation_name(INLINE_MODELS[kind]))
+    term_hash = md5(term.casefold().encode()).hexdigest()
+    return f'telegram_inline|{kind}|{generation}|{term_hash}'
+
+
+def compose_inline(kind: str, term: str) -> list[str]:
+    """Получает из БД и сериализует встрочные результаты.
+
+    :param kind: Вид результатов: reference, pep.
+    :param term: Текст запроса
+
+    """
+    model = INLINE_MODELS[kind]
+    items_limit = INLINE_LIMITS[kind]
+    return [result.to_json() for result in compose_entities_inline_result(model.find(term[:200])[:items_limit])]
+
+
+def get_inline_cached(kind: str, term: str) -> list[SerializedResult]:
+    """Возвращает встрочные результаты, используя общий для процессов кеш.
+
+    :param kind: Вид результатов: reference, pep.
+    :param term: Текст запроса
+
+    """
+    record_inline_query(kind, term)
+
+    cache_key = get_inline_cache_key(kind, term)
+    payload = cache.get(cache_key)
+
+    if payload is None:
+        payload = compose_inline(kind, term)
+        cache.set(cache_key, payload, INLINE_CACHE_TIMEOUT)
+
+    return [SerializedResult(item) for item in payload]
+
+
+def record_inline_query(kind: str, term: str):
+    """Учитывает запрос в статистике, используемой для прогрева кеша.
+
+    Статистика копится в процессе и время от времени сливается в общий кеш.
+
+    :param kind: Вид результатов: reference, pep.
+    :param term: Текст запроса
+
+    """
+    _inline_stats[(kind, term.casefold())] += 1
+
+    if _inline_stats.total() < INLINE_STATS_FLUSH_EVERY:
+        return
+
+    stats = Counter(cache.get(INLINE_STATS_KEY) or {})
+    stats.update(_inline_stats)
+    _inline_stats.clear()
+
+    # Храним лишь ограниченное количество самых частых запросов.
+    cache.set(INLINE_STATS_KEY, dict(stats.most_common(INLINE_WARM_SIZE * 5)), None)
+
+
+def warm_inline_cache() -> int:
+    """Подготавливает встрочные результаты для самых частых запросов,
+    если в кеше их нет (например, после изменения материалов).
+    Возвращает количество подготовленных результатов.
+
+    """
+    stats = Counter(cache.get(INLINE_STATS_KEY) or {})
+    warmed = 0
+
+    for (kind, term), _ in stats.most_common(INLINE_WARM_SIZE):
+        cache_key = get_inline_cache_key(kind, term)
+
+        if cache.get(cache_key) is None:
+            cache.set(cache_key, compose_inline(kind, term), INLINE_CACHE_TIMEOUT)
+            warmed += 1
+
+    return warmed
+
+
+def get_inline_reference(term: str) -> list:
     """Возвращает статьи справочника.
 
     :param term: Текст запроса
-    :param items_limit: Максимальное кол-во элементов для получения.
 
     """
-    return compose_entities_inline_result(Reference.find(term[:200])[:items_limit])
+    return get_inline_cached('reference', term)
 
 
-@lru_cache(maxsize=20)
-def get_inline_pep(term: str, items_limit: int = 10) -> list:
+def get_inline_pep(term: str) -> list:
     """Возвращает ссылки на PEP.
 
     :param term: Текст запроса
-    :param items_limit: Максимальное кол-во элементов для получения.
 
     """
-    return compose_entities_inline_result(PEP.find(term[:200])[:items_limit])
+    return get_inline_cached('pep', term)
 
 
 @lru_cache(maxsize=2)
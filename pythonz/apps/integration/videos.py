@@ -14,8 +14,16 @@ class VideoBroker:
     hostings = dict(sorted(hostings.items(), key=lambda k: k[0]))
 
     @classmethod
-    def get_data_from_vimeo(cls, url: str) -> tuple[str, str]:
+    def get_data_from_vimeo(cls, url: str, *, with_cover: bool = True) -> tuple[str, str]:
+        """Возвращает код для встраивания и адрес обложки видео.
 
+        Код строится по адресу видео, обложка же требует запроса к API Vimeo.
+
+        :param url:
+        :param with_cover: Следует ли получать адрес обложки.
+            Если нет, вместо адреса возвращается пустая строка.
+
+        """
         from ..integration.utils import get_json  # noqa: PLC0415
 
         if 'vimeo.com' not in url:  # http://vimeo.com/{id}
@@ -28,13 +36,23 @@ class VideoBroker:
             f'width="{cls.EMBED_WIDTH}" height="{cls.EMBED_HEIGHT}" frameborder="0" '
             'webkitallowfullscreen mozallowfullscreen allowfullscreen></iframe>')
 
-        json = get_json(f'http://vimeo.com/api/v2/video/{video_id}.json')
-        cover_url = json[0]['thumbnail_small']
+        cover_url = ''
+
+        if with_cover:
+            json = get_json(f'http://vimeo.com/api/v2/video/{video_id}.json')
+            cover_url = json[0]['thumbnail_small']
 
         return embed_code, cover_url
 
     @classmethod
-    def get_data_from_youtube(cls, url: str) -> tuple[str, str]:
+    def get_data_from_youtube(cls, url: str, *, with_cover: bool = True) -> tuple[str, str]:
+        """Возвращает код для встраивания и адрес обложки видео.
+
+        :param url:
+        :param with_cover: Следует ли получать адрес обложки.
+            Адрес обложки YouTube строится без обращения к сети, поэтому флаг не учитывается.
+
+        """
 
         if 'youtu.be' in url:  # http://youtu.be/{id}
             video_id = url.rsplit('/', 1)[-1]
@@ -76,7 +94,20 @@ class VideoBroker:
         return hosting
 
     @classmethod
-    def get_code_and_cover(cls, url: str, *, wrap_responsive: bool = False) -> tuple[str, str]:
+    def get_code_and_cover(
+        cls,
+        url: str,
+        *,
+        wrap_responsive: bool = False,
+        with_cover: bool = True
+    ) -> tuple[str, str]:
+        """Возвращает код для встраивания и адрес обложки видео.
+
+        :param url:
+        :param wrap_responsive: Следует ли обернуть код в блок, подстраивающийся под ширину страницы.
+        :param with_cover: Следует ли получать адрес обложки (может потребовать запроса к сети).
+
+        """
 
         url = url.rstrip('/')
         hid = cls.get_hosting_for_url(url)
@@ -92,9 +123,20 @@ class VideoBroker:
         if method is None:
             raise RemoteSourceError(msg)
 
-        embed_code, cover_url = method(url)
+        embed_code, cover_url = method(url, with_cover=with_cover)
 
         if wrap_responsive:
             embed_code = f'<div class="embed-responsive embed-responsive-16by9">{embed_code}</div>'
 
         return embed_code, cover_url
+
+    @classmethod
+    def get_code(cls, url: str, *, wrap_responsive: bool = False) -> str:
+        """Возвращает код для встраивания видео. Не обращается к сети.
+
+        :param url:
+        :param wrap_responsive: Следует ли обернуть код в блок, подстраивающийся под ширину страницы.
+
+        """
+        embed_code, _ = cls.get_code_and_cover(url, wrap_responsive=wrap_responsive, with_cover=False)
+        return embed_code
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...exceptions import LogicError
+from ...search.benchmark import SearchBenchmark
+
+
+class Command(BaseCommand):
+
+    help = 'Measures search latency and DB queries on a synthetic corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=1000, help='Number of references to seed')
+        parser.add_argument('--iterations', type=int, default=300, help='Number of searches per function')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument(
+            '--baseline', default=str(Path(settings.PROJECT_DIR_STATE) / 'search_benchmark.json'),
+            help='Baseline file to compare with')
+        parser.add_argument('--save', action='store_true', help='Store results as a new baseline')
+
+    def handle(self, *args, **options):
+
+        self.stdout.write('Running search benchmark ...\n')
+
+        try:
+            report = SearchBenchmark(
+                size=options['size'],
+                iterations=options['iterations'],
+                seed=options['seed'],
+            ).run()
+
+        except LogicError as e:
+            raise CommandError(e.message) from e
+
+        baseline_path = Path(options['baseline'])
+
+        for line in SearchBenchmark.compare(report, SearchBenchmark.load_baseline(baseline_path)):
+            self.stdout.write(f'{line}\n')
+
+        if options['save']:
+            SearchBenchmark.save_baseline(baseline_path, report)
+            self.stdout.write(f'Baseline saved: {baseline_path}\n')
+
+        self.stdout.write('Benchmark done. Latency is in milliseconds.\n')
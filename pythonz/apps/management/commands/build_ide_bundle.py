@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ...search.bundle import ReferenceBundle
+
+
+class Command(BaseCommand):
+
+    help = 'Builds offline reference bundle for IDE clients'
+
+    def handle(self, *args, **options):
+
+        self.stdout.write('Building IDE bundle ...\n')
+
+        manifest = ReferenceBundle.build()
+
+        self.stdout.write(f"IDE bundle version: {manifest['version']}. Items: {manifest['count']}.\n")
@@ -32,6 +32,10 @@ class Command(BaseCommand):
                             obj.mark_unmodified()
 
                         self.stdout.write(f'Processing {obj} ...\n')
+
+                        if model_cls.slug_auto and not obj.slug:
+                            obj.slug = obj.generate_slug()
+
                         obj.save()
 
                 else:
@@ -0,0 +1,71 @@
+from heapq import nlargest
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from ...generics.models import CommonEntityModel
+from ...models import Article, Community, Discussion, Event, Person, Reference, Version
+from ...utils import BasicTypograph, TextCompiler, TextProfiler
+
+
+class Command(BaseCommand):
+
+    help = 'Profiles text compilation and typography of all stored texts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10, help='Number of worst documents and rules to list')
+
+    def handle(self, *args, **options):
+
+        self.stdout.write('Profiling texts ...\n')
+
+        models = [
+            Discussion,
+            Community,
+            Article,
+            Version,
+            Reference,
+            Event,
+            Person,
+        ]
+
+        limit = options['limit']
+        timings = []
+
+        with TextProfiler.enable() as profiler:
+
+            for model in models:
+                label = model._meta.label_lower
+                typographed = issubclass(model, CommonEntityModel)
+
+                fields = ['pk', 'text_src']
+
+                if typographed:
+                    fields.extend(('title', 'description'))
+
+                for values in model.objects.order_by('pk').values(*fields).iterator():
+                    started = perf_counter()
+
+                    TextCompiler.compile(values['text_src'])
+
+                    if typographed:
+                        BasicTypograph.apply_to(values['title'])
+                        BasicTypograph.apply_to(values['description'])
+
+                    timings.append((perf_counter() - started, label, values['pk'], len(values['text_src'])))
+
+        self.stdout.write(f'Documents: {len(timings)}. Total: {sum(timing[0] for timing in timings) * 1000:.1f} ms\n')
+
+        self.stdout.write('\nWorst documents:\n')
+
+        for seconds, label, pk, size in nlargest(limit, timings):
+            self.stdout.write(f'  {label} #{pk}: {seconds * 1000:.2f} ms, {size} chars\n')
+
+        self.stdout.write('\nWorst rules (calls, total, average, input -> output chars):\n')
+
+        for name, (calls, seconds, size_in, size_out) in profiler.get_worst(limit):
+            self.stdout.write(
+                f'  {name}: {calls}, {seconds * 1000:.2f} ms, {seconds / calls * 1e6:.1f} µs, '
+                f'{size_in} -> {size_out}\n')
+
+        self.stdout.write('Profiling done.\n')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from ...search.fulltext import FullTextIndex
+
+
+class Command(BaseCommand):
+
+    help = 'Rebuilds full-text search index'
+
+    def handle(self, *args, **options):
+
+        self.stdout.write('Rebuilding search index ...\n')
+
+        if not FullTextIndex.is_available():
+            FullTextIndex.create()
+
+        indexed = FullTextIndex.rebuild()
+
+        self.stdout.write(f'Search index rebuilt. Objects indexed: {indexed}.\n')
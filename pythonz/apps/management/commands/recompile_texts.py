@@ -1,12 +1,21 @@
+from pathlib import Path
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
 from ...models import Article, Community, Discussion, Event, Person, Reference, Version
+from ...recompiler import TextRecompiler
 
 
 class Command(BaseCommand):
 
     help = 'Recompiles rst-like texts into html.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Number of objects per batch')
+        parser.add_argument('--workers', type=int, default=None, help='Number of compiling processes')
+        parser.add_argument('--restart', action='store_true', help='Ignore checkpoint of an interrupted run')
+
     def handle(self, *args, **options):
 
         self.stdout.write('Recompiling texts ...\n')
@@ -21,11 +30,21 @@ class Command(BaseCommand):
             Person,
         ]
 
-        for model in models:
+        recompiler = TextRecompiler(
+            models,
+            checkpoint=Path(settings.PROJECT_DIR_STATE) / 'recompile_texts.json',
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+        )
+
+        def progress(label: str, rows: int, updated: int):
+            self.stdout.write(f'{label}: {rows} processed, {updated} updated\n')
+
+        report = recompiler.run(resume=not options['restart'], progress=progress)
 
-            for item in model.objects.all():
-                item.text_src = item.text_src.rstrip('-_')
-                item.mark_unmodified()
-                item.save()
+        for label, summary in report.items():
+            rate = summary['rows'] / summary['seconds'] if summary['seconds'] else 0
+            self.stdout.write(
+                f"{label}: {summary['rows']} rows, {summary['updated']} updated, {rate:.1f} rows/s\n")
 
         self.stdout.write('Texts recompiled.\n')
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+INDEX_FIELDS = {
+    ('sitecats', 'category'): {'title': ('title',), 'description': ('note',)},
+    ('apps', 'person'): {'title': ('name',), 'terms': ('name_en', 'aka')},
+    ('apps', 'app'): {'terms': ('slug',)},
+    ('apps', 'pep'): {'title': ('title',), 'terms': ('slug',), 'description': ('description',)},
+    ('apps', 'reference'): {'title': ('title',), 'terms': ('search_terms',)},
+}
+"""Раскладка полей моделей по колонкам индекса на момент миграции."""
+
+
+def create_index(apps, schema_editor):
+    from pythonz.apps.search.fulltext import FullTextIndex
+
+    conn = schema_editor.connection
+    FullTextIndex.create(conn)
+
+    content_types = apps.get_model('contenttypes', 'ContentType').objects.db_manager(conn.alias)
+    indexed = []
+
+    for (app_label, model_name), fields in INDEX_FIELDS.items():
+        content_type, _ = content_types.get_or_create(app_label=app_label, model=model_name)
+        indexed.append((apps.get_model(app_label, model_name), content_type.id, fields))
+
+    FullTextIndex.rebuild(conn=conn, indexed=indexed)
+
+
+def drop_index(apps, schema_editor):
+    from pythonz.apps.search.fulltext import FullTextIndex
+
+    FullTextIndex.drop(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0059_preferences_remove_user_comments_enabled_and_more'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('sitecats', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+def fill_name_sort(apps, schema_editor):
+    model = apps.get_model('apps', 'Person')
+
+    persons = list(model.objects.only('id', 'name'))
+
+    for person in persons:
+        # Копия Person.get_name_sort(): миграция не должна зависеть от текущего кода модели.
+        person.name_sort = ' '.join(reversed(person.name.strip().rsplit(' ', 1)))
+
+    model.objects.bulk_update(persons, ['name_sort'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0060_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='name_sort',
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=90, verbose_name='Имя для сортировки',
+                help_text='Имя, начинающееся с фамилии. Заполняется автоматически.'),
+        ),
+        migrations.RunPython(fill_name_sort, migrations.RunPython.noop),
+    ]
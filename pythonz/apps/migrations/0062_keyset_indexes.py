@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps', '0061_person_name_sort'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vacancy',
+            index=models.Index(fields=['status', '-time_created', '-id'], name='vacancy_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pep',
+            index=models.Index(fields=['-time_created', '-id'], name='pep_keyset_idx'),
+        ),
+    ]
@@ -2,13 +2,14 @@ from random import choice
 from time import sleep
 
 from django.db import models
-from django.db.models import Q, QuerySet
+from django.db.models import QuerySet
 from etc.models import InheritedModel
 from simple_history.models import HistoricalRecords
 from sitecats.models import ModelWithCategory
 
 from ..generics.models import CommonEntityModel, ModelWithAuthorAndTranslator, ModelWithCompiledText, RealmBaseModel
 from ..integration.pypistats import get_for_package
+from ..search.fulltext import FullTextIndex
 from .discussion import ModelWithDiscussions
 from .person import PersonsLinked
 
@@ -35,6 +36,7 @@ class App(
     history = HistoricalRecords()
 
     persons_fields: list[str] = ['authors']
+    search_index_fields: dict[str, tuple[str, ...]] = {'terms': ('slug',)}
 
     class Meta:
 
@@ -62,16 +64,8 @@ class App(
         :param search_terms: Строка для поиска.
 
         """
-        q = Q()
-
-        for term in search_terms:
-
-            if not term:
-                continue
-
-            q |= Q(slug__icontains=term)
-
-        return cls.objects.published().filter(q).order_by('time_published')
+        return cls.objects.published().filter(
+            FullTextIndex.get_filter(cls, *search_terms)).order_by('time_published')
 
     @classmethod
     def actualize_downloads(cls, qs: QuerySet = None) -> int:
@@ -119,6 +113,8 @@ class App(
 
         return repo.replace(prefix, '', 1).rstrip('/')
 
+    publish_update_fields: tuple[str, ...] = ('downloads',)
+
     def on_publish(self):
         self.update_downloads()
 
@@ -1,7 +1,9 @@
-from django.db.models import Q, QuerySet
+from django.db.models import QuerySet
 from django.urls import reverse
 from sitecats.models import Category as Category_
 
+from ..search.fulltext import FullTextIndex
+
 
 class Category(Category_):
     """Посредник для мимикрии под области."""
@@ -10,6 +12,9 @@ class Category(Category_):
 
         proxy = True
 
+    search_index_fields: dict[str, tuple[str, ...]] = {'title': ('title',), 'description': ('note',)}
+    search_boost: float = 1.2
+
     @classmethod
     def find(cls, *search_terms: str) -> QuerySet:
         """Ищет указанный текст в категориях. Возвращает QuerySet.
@@ -17,13 +22,7 @@ class Category(Category_):
         :param search_terms: Строки для поиска.
 
         """
-        q = Q()
-
-        for term in search_terms:
-            if term:
-                q |= Q(title__icontains=term) | Q(note__icontains=term)
-
-        return Category.objects.filter(q).order_by('time_created')
+        return Category.objects.filter(FullTextIndex.get_filter(cls, *search_terms)).order_by('time_created')
 
     @property
     def description(self) -> str:
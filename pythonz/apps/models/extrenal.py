@@ -5,6 +5,7 @@ from django.db import IntegrityError, models
 
 from ..generics.models import RealmBaseModel
 from ..integration.resources import PyDigestResource
+from ..utils import BasicTypograph
 from .shared import UtmReady
 
 
@@ -55,6 +56,13 @@ class ExternalResource(UtmReady, RealmBaseModel):
             if not entries:
                 return
 
+            # Типограф обрабатывает заголовки и описания всех записей разом.
+            for name in ('title', 'description'):
+                values = BasicTypograph.apply_many([entry_data[name] for entry_data in entries])
+
+                for entry_data, value in zip(entries, values, strict=True):
+                    entry_data[name] = value
+
             added = []
             existing = []
 
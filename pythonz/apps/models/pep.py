@@ -1,10 +1,11 @@
 from enum import unique
 
 from django.db import models
-from django.db.models import Q, QuerySet
+from django.db.models import QuerySet
 
 from ..generics.models import CommonEntityModel, RealmBaseModel
 from ..integration.peps import sync as sync_peps
+from ..search.fulltext import FullTextIndex
 from .discussion import ModelWithDiscussions
 from .version import Version
 
@@ -61,7 +62,10 @@ class PEP(RealmBaseModel, CommonEntityModel, ModelWithDiscussions):
     slug_pick: bool = True
     slug_auto: bool = True
     items_per_page: int = 40
+    paginator_keyset: bool = True
     details_related: list[str] = []
+    search_index_fields: dict[str, tuple[str, ...]] = {
+        'title': ('title',), 'terms': ('slug',), 'description': ('description',)}
 
     # Далее отключаем общую логику работы с удалёнными.
     is_published: bool = True
@@ -99,6 +103,10 @@ class PEP(RealmBaseModel, CommonEntityModel, ModelWithDiscussions):
 
         verbose_name = 'PEP'
         verbose_name_plural = 'PEP'
+        indexes = [
+            # Для постраничной навигации по ключу: order_by('-time_created', '-pk').
+            models.Index(fields=['-time_created', '-id'], name='pep_keyset_idx'),
+        ]
 
     def __str__(self):
         return f'PEP {self.num} — {self.title}'
@@ -162,13 +170,4 @@ class PEP(RealmBaseModel, CommonEntityModel, ModelWithDiscussions):
         :param search_terms: Строка для поиска.
 
         """
-        q = Q()
-
-        for term in search_terms:
-
-            if not term:
-                continue
-
-            q |= Q(slug__icontains=term) | Q(title__icontains=term) | Q(description__icontains=term)
-
-        return cls.get_actual().filter(q)
+        return cls.get_actual().filter(FullTextIndex.get_filter(cls, *search_terms))
@@ -2,10 +2,11 @@ from functools import partial
 
 from django.conf import settings
 from django.db import models
-from django.db.models import Q, QuerySet
+from django.db.models import QuerySet
 from etc.models import InheritedModel
 
 from ..generics.models import ModelWithCompiledText, RealmBaseModel
+from ..search.fulltext import FullTextIndex
 from ..utils import PersonName, sync_many_to_many
 from .shared import UtmReady
 from .user import User
@@ -82,8 +83,9 @@ class Person(UtmReady, InheritedModel, RealmBaseModel, ModelWithCompiledText):
     """
     details_related: list[str] = ['submitter', 'last_editor', 'user']
     paginator_related: list[str] = []
-    paginator_order: str = 'name'
+    paginator_order: str = 'name_sort'
     items_per_page: int = 1000
+    search_index_fields: dict[str, tuple[str, ...]] = {'title': ('name',), 'terms': ('name_en', 'aka')}
 
     user = models.OneToOneField(
         User, verbose_name='Пользователь', related_name='person', null=True, blank=True,
@@ -95,6 +97,10 @@ class Person(UtmReady, InheritedModel, RealmBaseModel, ModelWithCompiledText):
 
     aka = models.CharField('Другие имена', max_length=255, blank=True)  # Разделены ;
 
+    name_sort = models.CharField(
+        'Имя для сортировки', max_length=90, blank=True, editable=False, db_index=True,
+        help_text='Имя, начинающееся с фамилии. Заполняется автоматически.')
+
     class Meta:
 
         verbose_name = 'Персона'
@@ -112,6 +118,25 @@ class Person(UtmReady, InheritedModel, RealmBaseModel, ModelWithCompiledText):
     def title(self) -> str:
         return self.get_display_name()
 
+    @classmethod
+    def get_name_sort(cls, name: str) -> str:
+        """Возвращает имя, начинающееся с фамилии (используется для сортировки).
+
+        :param name:
+
+        """
+        return ' '.join(reversed(name.strip().rsplit(' ', 1)))
+
+    def save(self, *args, **kwargs):
+        self.name_sort = self.get_name_sort(self.name)
+
+        update_fields = kwargs.get('update_fields')
+
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_sort'}
+
+        super().save(*args, **kwargs)
+
     @classmethod
     def get_known_persons(cls) -> dict[str, list['Person']]:
         """Возвращает словарь, индексированный именами персон.
@@ -164,16 +189,7 @@ class Person(UtmReady, InheritedModel, RealmBaseModel, ModelWithCompiledText):
         :param search_terms: Строка для поиска.
 
         """
-        q = Q()
-
-        for term in search_terms:
-
-            if not term:
-                continue
-
-            q |= Q(name__icontains=term) | Q(name_en__icontains=term) | Q(aka__icontains=term)
-
-        return cls.get_actual().filter(q)
+        return cls.get_actual().filter(FullTextIndex.get_filter(cls, *search_terms))
 
     @classmethod
     def create(cls, name: str, *, save: bool = False, publish: bool = True) -> 'Person':
@@ -197,20 +213,6 @@ class Person(UtmReady, InheritedModel, RealmBaseModel, ModelWithCompiledText):
 
         return person
 
-    @classmethod
-    def get_paginator_objects(cls) -> list:
-        persons = super().get_paginator_objects()
-
-        def sort_by_surname(person):
-            split = person.name.rsplit(' ', 1)
-            name = ' '.join(reversed(split))
-            person.name = name
-            return name
-
-        result = sorted(persons, key=sort_by_surname)
-
-        return result
-
     def get_materials(self) -> dict:
         """Возвращает словарь с матералами, созданными персоной.
 
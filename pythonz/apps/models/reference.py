@@ -1,12 +1,17 @@
+from collections import defaultdict
 from enum import unique
 
-from django.db import models
-from django.db.models import Q, QuerySet
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F, Q, QuerySet
 from django.utils.functional import cached_property
 from etc.models import InheritedModel
 from simple_history.models import HistoricalRecords
+from uwsgiconf import uwsgi
 
 from ..generics.models import CommonEntityModel, ModelWithCompiledText, RealmBaseModel
+from ..search.fulltext import FullTextIndex
+from ..search.prefix import TermIndex
 from .discussion import ModelWithDiscussions
 from .version import Version
 
@@ -28,28 +33,138 @@ class ReferenceMissing(models.Model):
     def __str__(self):
         return self.term
 
+    buffer_key: str = 'reference_missing'
+    """Префикс ключей кеша, в котором копятся промахи до их сброса в БД."""
+
+    buffer_timeout: int = 86400
+    """Время жизни (в секундах) записи журнала промахов в кеше.
+    Ограничивает жизнь записей, которые по какой-то причине не попали в сброс.
+
+    """
+
     @classmethod
-    def add(cls, search_term: str) -> bool:
+    def add(cls, search_term: str):
         """Добавляет данные по указанному термину в реестр промахов.
-        Возвращает True, если была добавлена новая запись.
+
+        Промахи не пишутся в БД сразу, а копятся в кеше и периодически
+        сбрасываются в БД пачкой (см. flush()).
+
+        Под uWSGI запись в журнал передаётся в спулер: и запись, и сброс
+        журнала выполняются там последовательно, в одном процессе,
+        поэтому журнал не теряется между рабочими процессами.
 
         :param search_term: Термин для поиска.
 
         """
-        obj = cls.objects.filter(
-            Q(term__icontains=search_term) |
-            Q(synonyms__icontains=search_term)
+        if uwsgi.is_stub:
+            cls.buffer(search_term)
+            return
 
-        ).first()
+        from ..uwsgiinit import spool_missing_ref  # noqa: PLC0415
 
-        if obj:
-            obj.hits += 1
-            obj.save()
+        spool_missing_ref(search_term)
 
-        else:
-            cls(term=search_term, hits=1).save()
+    @classmethod
+    def buffer(cls, search_term: str):
+        """Заносит термин в журнал промахов в кеше.
+
+        Позиция в журнале выделяется атомарным инкрементом. Сначала пишется
+        сама запись, и только затем публикуется номер позиции, до которого
+        журнал читает flush().
+
+        :param search_term: Термин для поиска.
+
+        """
+        buffer_key = cls.buffer_key
+        key_idx = f'{buffer_key}|idx'
+
+        try:
+            idx = cache.incr(key_idx)
+
+        except ValueError:
+            idx = 1 if cache.add(key_idx, 1, None) else cache.incr(key_idx)
+
+        cache.set(f'{buffer_key}|{idx}', search_term[:255], cls.buffer_timeout)
+        cache.set(f'{buffer_key}|seq', idx, None)
+
+    @classmethod
+    def flush(cls) -> int:
+        """Сбрасывает накопленные в кеше промахи в БД.
+        Возвращает количество учтённых обращений.
+
+        Счётчики существующих записей увеличиваются атомарно (F('hits') + n),
+        записи для новых терминов создаются одним запросом.
+
+        """
+        buffer_key = cls.buffer_key
+        lock_key = f'{buffer_key}|lock'
+
+        if not cache.add(lock_key, 1, 300):
+            # Сброс уже выполняется другим процессом.
+            return 0
+
+        try:
+            flushed = cache.get(f'{buffer_key}|flushed', 0)
+            seq = cache.get(f'{buffer_key}|seq', 0)
+
+            if seq < flushed:
+                # Счётчик журнала был вытеснен из кеша и начат заново.
+                flushed = 0
 
-        return obj is None
+            keys = [f'{buffer_key}|{idx}' for idx in range(flushed + 1, seq + 1)]
+
+            hits_by_term = defaultdict(int)
+            terms = {}
+
+            for term in cache.get_many(keys).values():
+                term_normalized = term.casefold()
+                hits_by_term[term_normalized] += 1
+                terms.setdefault(term_normalized, term)
+
+            hits_by_id = defaultdict(int)
+
+            for obj in cls.objects.filter(term__in=terms.values()):
+                term_normalized = obj.term.casefold()
+
+                if term_normalized in hits_by_term:
+                    hits_by_id[obj.id] += hits_by_term.pop(term_normalized)
+
+            new = []
+
+            for term_normalized, hits in hits_by_term.items():
+                term = terms[term_normalized]
+
+                obj_id = cls.objects.filter(
+                    Q(term__icontains=term) |
+                    Q(synonyms__icontains=term)
+
+                ).values_list('id', flat=True).first()
+
+                if obj_id:
+                    hits_by_id[obj_id] += hits
+
+                else:
+                    new.append(cls(term=term, hits=hits))
+
+            ids_by_hits = defaultdict(list)
+
+            for obj_id, hits in hits_by_id.items():
+                ids_by_hits[hits].append(obj_id)
+
+            with transaction.atomic():
+
+                for hits, ids in ids_by_hits.items():
+                    cls.objects.filter(id__in=ids).update(hits=F('hits') + hits)
+
+                cls.objects.bulk_create(new, ignore_conflicts=True)
+
+            cache.set(f'{buffer_key}|flushed', seq, None)
+            cache.delete_many(keys)
+
+        finally:
+            cache.delete(lock_key)
+
+        return len(keys)
 
 
 class Reference(InheritedModel, RealmBaseModel, CommonEntityModel, ModelWithDiscussions, ModelWithCompiledText):
@@ -60,6 +175,11 @@ class Reference(InheritedModel, RealmBaseModel, CommonEntityModel, ModelWithDisc
     allow_linked: bool = False
     allow_edit_published: bool = True
     details_related: list[str] = ['parent', 'submitter']
+    search_index_fields: dict[str, tuple[str, ...]] = {'title': ('title',), 'terms': ('search_terms',)}
+    search_rank_fields: dict[str, tuple[str, ...]] = {**search_index_fields, 'description': ('description',)}
+    search_boost: float = 1.5
+
+    term_index = TermIndex(fields=('title', 'search_terms'))
 
     @unique
     class Type(models.IntegerChoices):
@@ -209,13 +329,12 @@ class Reference(InheritedModel, RealmBaseModel, CommonEntityModel, ModelWithDisc
         :param search_terms: Строка для поиска.
 
         """
-        q = Q()
-
-        for term in search_terms:
+        ids = cls.term_index.find_ids(*search_terms)
 
-            if not term:
-                continue
-
-            q |= Q(title__icontains=term) | Q(search_terms__icontains=term)
+        if ids is None:
+            # Совпадений слишком много, пусть их отбирает БД.
+            flt = FullTextIndex.get_filter(cls, *search_terms)
+        else:
+            flt = Q(id__in=ids)
 
-        return cls.objects.published().filter(q).order_by('time_published')
+        return cls.objects.published().filter(flt).order_by('time_published')
@@ -15,6 +15,7 @@ class Vacancy(UtmReady, WithPlace):
 
     paginator_related: list[str] = ['place']
     items_per_page: int = 15
+    paginator_keyset: bool = True
     notify_on_publish: bool = False
 
     source_group = VacancySource
@@ -38,6 +39,10 @@ class Vacancy(UtmReady, WithPlace):
         verbose_name = 'Вакансия'
         verbose_name_plural = 'Работа'
         unique_together = ('src_alias', 'src_id')
+        indexes = [
+            # Для постраничной навигации по ключу: published().order_by('-time_created', '-pk').
+            models.Index(fields=['status', '-time_created', '-id'], name='vacancy_keyset_idx'),
+        ]
 
     @property
     def cover(self) -> str:
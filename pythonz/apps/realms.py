@@ -10,6 +10,14 @@ from sitetree.models import TreeItemBase
 from sitetree.sitetreeapp import compose_dynamic_tree, register_dynamic_trees
 from sitetree.utils import item, tree
 
+from .caching import (
+    categories_map_invalidate,
+    categories_map_invalidate_all,
+    details_cache_invalidate_linked,
+    listing_cache_invalidate_deleted,
+    listing_cache_invalidate_tie,
+    search_cache_connect,
+)
 from .forms.forms import (
     AppForm,
     ArticleForm,
@@ -43,6 +51,8 @@ from .models import (
     Version,
     Video,
 )
+from .search.fulltext import FullTextIndex
+from .search.ranking import TermStats
 from .signals import sig_support_changed
 from .views import (
     CategoryListingView,
@@ -57,6 +67,7 @@ from .views import (
     VacancyListingView,
     VersionDetailsView,
     ide,
+    ide_bundle,
 )
 from .zen import register_zen_siteblock
 
@@ -89,6 +100,23 @@ def connect_signals():
     sig_support_changed.connect(RealmBaseModel.cache_delete_most_voted_objects)
     signals.post_save.connect(ReferenceRealm.build_sitetree, sender=Reference)
     signals.post_delete.connect(ReferenceRealm.build_sitetree, sender=Reference)
+    FullTextIndex.connect()
+    Reference.term_index.connect()
+    TermStats.connect()
+    search_cache_connect(Category, Person, Reference, App, PEP)
+
+    tie_model = get_tie_model()
+    signals.post_save.connect(listing_cache_invalidate_tie, sender=tie_model)
+    signals.post_delete.connect(listing_cache_invalidate_tie, sender=tie_model)
+    signals.post_save.connect(RealmBaseModel.cache_delete_most_voted_objects, sender=tie_model)
+    signals.post_delete.connect(RealmBaseModel.cache_delete_most_voted_objects, sender=tie_model)
+
+    for sender in (tie_model, Discussion):
+        signals.post_save.connect(details_cache_invalidate_linked, sender=sender)
+        signals.post_delete.connect(details_cache_invalidate_linked, sender=sender)
+
+    for sender in get_realms_models():
+        signals.post_delete.connect(listing_cache_invalidate_deleted, sender=sender)
 
 
 def register_realms(*classes: type[RealmBase]):
@@ -151,6 +179,8 @@ def get_realms_urls() -> list:
 
     url_patterns = [
         path('references/ide/', ide),
+        path('references/ide/bundle/', ide_bundle),
+        path('references/ide/bundle/<str:name>', ide_bundle),
     ]
 
     for realm in get_realms().values():
@@ -447,6 +477,14 @@ class CategoryRealm(RealmBase):
         # url-синдикации будут обновлены в случае добавления/удаления связи сущности с категорией.
         signals.post_save.connect(cls.update_syndication_urls, sender=tie_model)
         signals.post_delete.connect(cls.update_syndication_urls, sender=tie_model)
+        # Перечни категорий областей (см. ListingView.get_categories()) строятся заново
+        # при изменении связей и самих категорий.
+        signals.post_save.connect(categories_map_invalidate, sender=tie_model)
+        signals.post_delete.connect(categories_map_invalidate, sender=tie_model)
+
+        for sender in {Category, Category._meta.concrete_model}:
+            signals.post_save.connect(categories_map_invalidate_all, sender=sender)
+            signals.post_delete.connect(categories_map_invalidate_all, sender=sender)
 
     @classmethod
     def get_urls(cls) -> list:
@@ -0,0 +1,165 @@
+import json
+import os
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+import django
+from django.db.models import Model
+
+from .caching import cache_bump_generation, get_details_generation_name, listing_watermark_touch
+from .utils import TextCompiler
+
+
+class TextRecompiler:
+    """Перекомпиляция текстов (rst -> html) объектов моделей пачками.
+
+    Объекты выбираются по возрастанию идентификаторов пачками,
+    тексты компилируются в пуле процессов (с использованием кеша результатов
+    компиляции, см. TextCompiler.compile_cached()), в БД одним запросом на пачку
+    (bulk_update) записываются лишь изменившиеся. Методы save() моделей
+    и сигналы не задействуются, поэтому закешированные страницы изменившихся
+    объектов и отметки об изменении списков инвалидируются здесь же.
+
+    После каждой пачки в файл отметки записывается последний обработанный
+    идентификатор, поэтому прерванную перекомпиляцию можно продолжить.
+    По завершении всех моделей файл отметки удаляется.
+
+    """
+    def __init__(
+        self,
+        models: list[type[Model]],
+        *,
+        checkpoint: Path,
+        chunk_size: int = 500,
+        workers: int | None = None
+    ):
+        """
+        :param models: Модели с полями text и text_src.
+        :param checkpoint: Файл отметки.
+        :param chunk_size: Количество объектов в пачке.
+        :param workers: Количество процессов для компиляции. Если не указано —
+            по количеству процессоров. При 1 компиляция выполняется в текущем процессе.
+
+        """
+        self.models = models
+        self.checkpoint = checkpoint
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+
+    def load_checkpoint(self) -> dict[str, int]:
+        """Возвращает последние обработанные идентификаторы, индексированные метками моделей."""
+
+        if not self.checkpoint.exists():
+            return {}
+
+        return json.loads(self.checkpoint.read_text())
+
+    def save_checkpoint(self, state: dict[str, int]):
+        """Записывает последние обработанные идентификаторы в файл отметки.
+
+        :param state:
+
+        """
+        checkpoint_tmp = self.checkpoint.with_suffix('.tmp')
+        checkpoint_tmp.write_text(json.dumps(state))
+        checkpoint_tmp.replace(self.checkpoint)
+
+    def iter_chunks(self, model: type[Model], pk_after: int):
+        """Генерирует пачки строк (идентификатор, исходный текст, текст)
+        объектов с идентификаторами больше указанного.
+
+        :param model:
+        :param pk_after:
+
+        """
+        qs = model.objects.order_by('pk').values_list('pk', 'text_src', 'text')
+
+        while chunk := list(qs.filter(pk__gt=pk_after)[:self.chunk_size]):
+            yield chunk
+            pk_after = chunk[-1][0]
+
+    def process(self, model: type[Model], chunk: list[tuple], compile_map: Callable) -> int:
+        """Компилирует тексты пачки и записывает изменившиеся.
+        Возвращает количество обновлённых объектов.
+
+        :param model:
+        :param chunk:
+        :param compile_map: Функция, применяющая компиляцию к последовательности текстов.
+
+        """
+        sources = [text_src.rstrip('-_') for _, text_src, _ in chunk]
+
+        changed = []
+        fields = {'text'}
+
+        for (pk, text_src, text_old), source, text in zip(chunk, sources, compile_map(sources), strict=True):
+
+            if text == text_old and source == text_src:
+                continue
+
+            if source != text_src:
+                fields.add('text_src')
+
+            changed.append(model(pk=pk, text_src=source, text=text))
+
+        if changed:
+            model.objects.bulk_update(changed, sorted(fields))
+
+            for obj in changed:
+                cache_bump_generation(get_details_generation_name(model, obj.pk))
+
+            listing_watermark_touch(model)
+
+        return len(changed)
+
+    def run(self, *, resume: bool = True, progress: Callable | None = None) -> dict[str, dict]:
+        """Перекомпилирует тексты. Возвращает сводки по моделям:
+        количество обработанных и обновлённых объектов, время в секундах.
+
+        :param resume: Следует ли продолжить с последней отметки.
+        :param progress: Функция, вызываемая после каждой пачки
+            с меткой модели и количествами обработанных и обновлённых объектов.
+
+        """
+        state = self.load_checkpoint() if resume else {}
+        report = {}
+
+        pool = None
+
+        if self.workers > 1:
+            pool = ProcessPoolExecutor(self.workers, initializer=django.setup)
+
+        def compile_map(sources: list[str]) -> list[str]:
+            if pool is None:
+                return list(map(TextCompiler.compile_cached, sources))
+
+            chunksize = max(len(sources) // (self.workers * 4), 1)
+            return list(pool.map(TextCompiler.compile_cached, sources, chunksize=chunksize))
+
+        try:
+            for model in self.models:
+                label = model._meta.label_lower
+                rows = updated = 0
+                started = perf_counter()
+
+                for chunk in self.iter_chunks(model, state.get(label, 0)):
+                    rows += len(chunk)
+                    updated += self.process(model, chunk, compile_map)
+
+                    state[label] = chunk[-1][0]
+                    self.save_checkpoint(state)
+
+                    if progress:
+                        progress(label, rows, updated)
+
+                report[label] = {'rows': rows, 'updated': updated, 'seconds': perf_counter() - started}
+
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.checkpoint.unlink(missing_ok=True)
+
+        return report
@@ -0,0 +1,342 @@
+import json
+from collections.abc import Callable
+from pathlib import Path
+from random import Random
+from statistics import mean, quantiles
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, transaction
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from ..caching import cache_bump_generation, get_search_generation_name
+from ..exceptions import LogicError
+from ..integration import telegram
+from ..models import PEP, App, Category, Person, Reference, User
+from ..utils import search_models
+from ..views.ide import ide
+from .fulltext import FullTextIndex
+from .ranking import TermStats
+from .suggest import SUGGESTER
+
+WORDS_EN = (
+    'list', 'dict', 'tuple', 'set', 'str', 'bytes', 'asyncio', 'threading', 'socket', 'json',
+    'pathlib', 'datetime', 'collections', 'itertools', 'functools', 'typing', 'dataclasses',
+    'logging', 'subprocess', 'unittest', 'sqlite3', 'decimal', 'random', 'math', 'csv', 'zipfile',
+)
+
+WORDS_RU = (
+    'список', 'словарь', 'кортеж', 'множество', 'строка', 'байты', 'поток', 'сокет', 'путь',
+    'дата и время', 'коллекции', 'итераторы', 'функции', 'типизация', 'классы данных',
+    'журналирование', 'процессы', 'тестирование', 'исключения', 'генераторы', 'декораторы',
+)
+
+MEMBERS = ('append', 'get', 'open', 'read', 'join', 'split', 'sort', 'copy', 'update', 'run', 'loads', 'dumps')
+
+NAMES_FIRST = ('Гвидо', 'Тим', 'Раймонд', 'Барри', 'Ник', 'Brett', 'Łukasz', 'Carol', 'Victor', 'Алекс')
+
+NAMES_LAST = ('ван Россум', 'Питерс', 'Хеттингер', 'Варшава', 'Коглан', 'Cannon', 'Langa', 'Willing', 'Stinner')
+
+TERMS: tuple[tuple[str, int], ...] = (
+    ('list', 30),
+    ('dict', 20),
+    ('str', 12),
+    ('asyncio', 10),
+    ('список', 8),
+    ('словарь', 6),
+    ('json.loads', 6),
+    ('дата и время', 4),
+    ('pathlib', 4),
+    ('Россум', 3),
+    ('дшые', 2),  # list в русской раскладке
+    ('dcit', 2),
+    ('несуществующее', 1),
+)
+"""Распределение поисковых запросов: термин и его относительная частота."""
+
+TERMS_PEP: tuple[tuple[str, int], ...] = (
+    ('0008', 20),
+    ('typing', 12),
+    ('0484', 8),
+    ('асинхронные', 6),
+    ('pattern matching', 4),
+    ('несуществующее', 1),
+)
+"""Распределение запросов к PEP: термин и его относительная частота."""
+
+PEP_TITLES = (
+    ('Руководство по стилю кода', 'Style Guide for Python Code'),
+    ('Аннотации типов', 'Type Hints'),
+    ('Асинхронные генераторы', 'Asynchronous Generators'),
+    ('Сопоставление с образцом', 'Structural Pattern Matching'),
+    ('Классы данных', 'Data Classes'),
+    ('Модуль typing', 'Literal Types'),
+)
+
+BENCHMARK_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}}
+"""Кеш, используемый во время замеров вместо общего кеша сайта."""
+
+
+class SearchBenchmark:
+    """Замер производительности поиска на синтетическом наборе данных.
+
+    Наполняет БД материалами областей, затем выполняет поиск
+    (search_models(), страницу подсказок для IDE, встрочные результаты Telegram)
+    по терминам, выбираемым согласно распределению TERMS.
+    Для каждой из функций подсчитываются перцентили задержки и количество запросов к БД.
+
+    Все изменения в БД производятся в транзакции, которая затем откатывается.
+    Кеш используется отдельный (см. BENCHMARK_CACHES), общий кеш сайта не затрагивается.
+    В боевом окружении замеры не производятся: транзакция с наполнением
+    удерживает блокировку БД на всё время замеров.
+
+    """
+    def __init__(self, *, size: int = 1000, iterations: int = 300, seed: int = 0):
+        """
+        :param size: Количество статей справочника. Прочих материалов — в 10 раз меньше.
+        :param iterations: Количество поисковых запросов к каждой из функций.
+        :param seed: Затравка генератора случайных чисел (для воспроизводимости).
+
+        """
+        self.size = size
+        self.iterations = iterations
+        self.seed = seed
+
+    def seed_corpus(self):
+        """Наполняет БД синтетическими материалами."""
+
+        rnd = Random(self.seed)
+        now = timezone.now()
+        status = Reference.Status.PUBLISHED
+
+        user, _ = User.objects.get_or_create(username='benchmark')
+
+        references = []
+
+        for idx in range(self.size):
+            word_en = rnd.choice(WORDS_EN)
+            word_ru = rnd.choice(WORDS_RU)
+
+            if idx % 3:
+                title = f'{word_en}.{rnd.choice(MEMBERS)}'
+            else:
+                title = word_en if idx < len(WORDS_EN) * 3 else f'{word_en} {word_ru}'
+
+            references.append(Reference(
+                title=title,
+                slug=f'benchmark-{idx}',
+                search_terms=f'{word_ru}, {rnd.choice(WORDS_RU)}',
+                description=f'Описание {word_ru} для {word_en}.',
+                status=status,
+                submitter=user,
+                time_published=now,
+            ))
+
+        Reference.objects.bulk_create(references, batch_size=500)
+
+        others_count = max(self.size // 10, 1)
+
+        Person.objects.bulk_create((
+            Person(
+                name=f'{rnd.choice(NAMES_FIRST)} {rnd.choice(NAMES_LAST)}',
+                name_en=f'Person {idx}',
+                status=status,
+                submitter=user,
+                time_published=now,
+            )
+            for idx in range(others_count)
+
+        ), batch_size=500)
+
+        App.objects.bulk_create((
+            App(
+                title=f'{rnd.choice(WORDS_EN)}-{rnd.choice(MEMBERS)}',
+                slug=f'benchmark-{idx}',
+                description=rnd.choice(WORDS_RU),
+                status=status,
+                submitter=user,
+                time_published=now,
+            )
+            for idx in range(others_count)
+
+        ), batch_size=500)
+
+        Category.objects.bulk_create((
+            Category(title=rnd.choice(WORDS_RU), note=rnd.choice(WORDS_EN), creator=user, sort_order=idx)
+            for idx in range(others_count)
+
+        ), batch_size=500)
+
+        peps = []
+
+        for num in range(1, others_count + 1):
+            title, title_en = rnd.choice(PEP_TITLES)
+
+            peps.append(PEP(
+                title=title,
+                description=title_en,
+                num=num,
+                slug=f'{num:04}',
+                status=PEP.Status.FINAL,
+                time_published=now,
+            ))
+
+        PEP.objects.bulk_create(peps, batch_size=500)
+
+        # Массовое создание не порождает сигналов, поэтому актуализируем индексы самостоятельно.
+        FullTextIndex.rebuild()
+        self.invalidate()
+
+    @classmethod
+    def invalidate(cls):
+        """Помечает устаревшими закешированные результаты поиска и индексы в памяти."""
+
+        for model in (Category, Person, Reference, App, PEP):
+            cache_bump_generation(get_search_generation_name(model))
+
+        cache_bump_generation(Reference.term_index.generation_name)
+        Reference.term_index.reset()
+        TermStats.reset_all()
+        SUGGESTER.reset()
+
+    def get_terms(self, distribution: tuple[tuple[str, int], ...]) -> list[str]:
+        """Возвращает последовательность терминов согласно распределению.
+
+        :param distribution:
+
+        """
+        rnd = Random(self.seed)
+        terms, weights = zip(*distribution, strict=True)
+        return rnd.choices(terms, weights=weights, k=self.iterations)
+
+    def get_targets(self) -> dict[str, tuple[Callable, tuple[tuple[str, int], ...]]]:
+        """Возвращает замеряемые функции и распределения терминов для них."""
+
+        request_factory = RequestFactory()
+
+        def run_search(term: str):
+            search_models(term, search_in=(Category, Person, Reference, App))
+
+        def run_ide(term: str):
+            request = request_factory.get('/references/ide/', {'term': term}, headers={
+                'Ide-Name': 'PyCharm',
+                'Ide-Version': '2024.1',
+            })
+            request.user = AnonymousUser()
+            ide(request)
+
+        return {
+            'search': (run_search, TERMS),
+            'ide': (run_ide, TERMS),
+            'telegram': (telegram.get_inline_reference, TERMS),
+            'telegram_pep': (telegram.get_inline_pep, TERMS_PEP),
+        }
+
+    def measure(self, func: Callable, terms: list[str]) -> dict:
+        """Вызывает функцию для каждого из терминов. Возвращает сводку замеров.
+
+        :param func:
+        :param terms:
+
+        """
+        timings = []
+        queries = []
+
+        for term in terms:
+            with CaptureQueriesContext(connection) as captured:
+                started = perf_counter()
+                func(term)
+                timings.append((perf_counter() - started) * 1000)
+
+            queries.append(len(captured))
+
+        percentiles = quantiles(timings, n=100, method='inclusive')
+
+        return {
+            'calls': len(terms),
+            'p50': round(percentiles[49], 3),
+            'p95': round(percentiles[94], 3),
+            'queries': round(mean(queries), 2),
+        }
+
+    def run(self) -> dict[str, dict]:
+        """Выполняет замеры. Возвращает сводки, индексированные именами функций."""
+
+        if settings.IN_PRODUCTION:
+            raise LogicError('Замеры поиска не производятся в боевом окружении.')
+
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            return self._run()
+
+    def _run(self) -> dict[str, dict]:
+        report = {}
+
+        try:
+            with transaction.atomic():
+                self.seed_corpus()
+
+                for name, (func, distribution) in self.get_targets().items():
+                    # Общий кеш сбрасываем перед каждой функцией, чтобы они были в равных условиях.
+                    self.invalidate()
+                    report[name] = self.measure(func, self.get_terms(distribution))
+
+                transaction.set_rollback(True)
+
+        finally:
+            # Данные откатились, всё построенное по ним в памяти и кеше более не действительно.
+            self.invalidate()
+
+        return report
+
+    @classmethod
+    def compare(cls, report: dict[str, dict], baseline: dict[str, dict]) -> list[str]:
+        """Возвращает строки отчёта со сравнением замеров с базовыми.
+
+        :param report:
+        :param baseline:
+
+        """
+        lines = []
+
+        for name, current in report.items():
+            base = baseline.get(name)
+            chunks = []
+
+            for key in ('p50', 'p95', 'queries'):
+                value = current[key]
+                chunk = f'{key}={value}'
+
+                if base and base.get(key):
+                    change = (value - base[key]) / base[key] * 100
+                    chunk += f' ({change:+.1f}%)'
+
+                chunks.append(chunk)
+
+            lines.append(f"{name}: {' '.join(chunks)}")
+
+        return lines
+
+    @classmethod
+    def load_baseline(cls, path: Path) -> dict[str, dict]:
+        """Загружает базовые замеры из файла.
+
+        :param path:
+
+        """
+        if not path.exists():
+            return {}
+
+        return json.loads(path.read_text())
+
+    @classmethod
+    def save_baseline(cls, path: Path, report: dict[str, dict]):
+        """Сохраняет замеры в файл в качестве базовых.
+
+        :param path:
+        :param report:
+
+        """
+        path.write_text(json.dumps(report, indent=2, sort_keys=True))
@@ -0,0 +1,205 @@
+import gzip
+import json
+import re
+from hashlib import sha256
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Reference
+from ..utils import get_logger, truncate_chars
+
+LOGGER = get_logger('search')
+
+RE_FILENAME = re.compile(r'^(bundle-\d+|delta-\d+-\d+)\.json\.gz$')
+
+
+class ReferenceBundle:
+    """Выгрузка опубликованных статей справочника для автономного поиска в IDE.
+
+    В каталоге выгрузки хранятся:
+        * manifest.json — описание текущей версии;
+        * bundle-<версия>.json.gz — полная выгрузка версии;
+        * delta-<из>-<в>.json.gz — изменения между одной из предыдущих версий и текущей.
+
+    Клиенту достаточно периодически запрашивать манифест и,
+    если версия изменилась, загружать изменения относительно своей версии
+    (либо полную выгрузку, если подходящих изменений нет).
+
+    """
+    fields: tuple[str, ...] = ('id', 'parent', 'type', 'title', 'proto', 'description', 'url')
+    """Поля записи выгрузки. Записи хранятся в виде списков значений в этом порядке."""
+
+    description_len: int = 200
+    """Максимальная длина описания."""
+
+    keep: int = 10
+    """Количество предыдущих версий, относительно которых формируются изменения."""
+
+    @classmethod
+    def get_dir(cls) -> Path:
+        """Возвращает каталог выгрузки."""
+        return Path(settings.PROJECT_DIR_STATE) / 'ide_bundle'
+
+    @classmethod
+    def get_manifest(cls) -> dict:
+        """Возвращает манифест текущей версии, либо пустой словарь, если выгрузки нет."""
+
+        path = cls.get_dir() / 'manifest.json'
+
+        if not path.exists():
+            return {}
+
+        return json.loads(path.read_text())
+
+    @classmethod
+    def get_file(cls, name: str) -> Path | None:
+        """Возвращает путь к файлу выгрузки с указанным именем, либо None.
+
+        :param name:
+
+        """
+        if not RE_FILENAME.match(name):
+            return None
+
+        path = cls.get_dir() / name
+
+        if not path.exists():
+            return None
+
+        return path
+
+    @classmethod
+    def get_items(cls) -> dict[int, list]:
+        """Возвращает записи выгрузки, индексированные идентификаторами статей."""
+
+        items = {}
+
+        qs = Reference.objects.published().only(
+            'id', 'parent_id', 'type', 'title', 'slug', 'func_proto', 'description'
+        ).order_by('id')
+
+        for reference in qs.iterator():
+            items[reference.id] = [
+                reference.id,
+                reference.parent_id,
+                reference.type,
+                reference.title,
+                reference.func_proto or '',
+                truncate_chars(reference.description, cls.description_len),
+                reference.get_absolute_url(with_prefix=True),
+            ]
+
+        return items
+
+    @classmethod
+    def dump(cls, data: dict) -> bytes:
+        """Сериализует и сжимает данные.
+
+        :param data:
+
+        """
+        return gzip.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode(), mtime=0)
+
+    @classmethod
+    def load(cls, path: Path) -> dict:
+        """Загружает данные из файла выгрузки.
+
+        :param path:
+
+        """
+        return json.loads(gzip.decompress(path.read_bytes()))
+
+    @classmethod
+    def get_delta(cls, old: dict[int, list], new: dict[int, list]) -> dict:
+        """Возвращает изменения между двумя наборами записей.
+
+        :param old:
+        :param new:
+
+        """
+        return {
+            'upsert': [item for item_id, item in new.items() if old.get(item_id) != item],
+            'delete': sorted(old.keys() - new.keys()),
+        }
+
+    @classmethod
+    def build(cls) -> dict:
+        """Формирует новую версию выгрузки, если данные изменились.
+        Возвращает манифест текущей версии.
+
+        """
+        manifest = cls.get_manifest()
+        items = cls.get_items()
+
+        checksum = sha256(json.dumps(list(items.values()), ensure_ascii=False).encode()).hexdigest()
+
+        if manifest.get('sha256') == checksum:
+            return manifest
+
+        version = manifest.get('version', 0) + 1
+
+        target_dir = cls.get_dir()
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        bundle_name = f'bundle-{version}.json.gz'
+        (target_dir / bundle_name).write_bytes(cls.dump({
+            'version': version,
+            'fields': cls.fields,
+            'items': list(items.values()),
+        }))
+
+        deltas = {}
+
+        for prev_version in range(max(version - cls.keep, 1), version):
+            prev_path = target_dir / f'bundle-{prev_version}.json.gz'
+
+            if not prev_path.exists():
+                continue
+
+            prev_items = {item[0]: item for item in cls.load(prev_path)['items']}
+
+            delta_name = f'delta-{prev_version}-{version}.json.gz'
+            (target_dir / delta_name).write_bytes(cls.dump({
+                'from': prev_version,
+                'version': version,
+                'fields': cls.fields,
+                **cls.get_delta(prev_items, items),
+            }))
+            deltas[str(prev_version)] = delta_name
+
+        manifest = {
+            'version': version,
+            'created': timezone.now().isoformat(),
+            'count': len(items),
+            'sha256': checksum,
+            'bundle': bundle_name,
+            'deltas': deltas,
+        }
+
+        manifest_path = target_dir / 'manifest.json'
+        manifest_tmp = manifest_path.with_suffix('.tmp')
+        manifest_tmp.write_text(json.dumps(manifest, indent=2))
+        manifest_tmp.replace(manifest_path)
+
+        cls.cleanup(version)
+
+        LOGGER.info('IDE bundle version %s built: %s items.', version, len(items))
+
+        return manifest
+
+    @classmethod
+    def cleanup(cls, version: int):
+        """Удаляет файлы версий, более не используемых для формирования изменений.
+
+        :param version: Текущая версия.
+
+        """
+        min_version = version - cls.keep
+
+        for path in cls.get_dir().glob('*.json.gz'):
+            versions = [int(chunk) for chunk in re.findall(r'\d+', path.name)]
+
+            if versions[0] < min_version or (path.name.startswith('delta-') and versions[-1] != version):
+                path.unlink(missing_ok=True)
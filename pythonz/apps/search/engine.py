@@ -0,0 +1,162 @@
+from typing import NamedTuple
+
+from django.db.models import Case, IntegerField, Model, QuerySet, Value, When
+
+SEARCH_LIMIT = 50
+"""Максимальное количество результатов поиска по всем областям."""
+
+
+class SearchResult(NamedTuple):
+    """Строка результата поиска."""
+
+    realm: str
+    """Метка модели области (app_label.model_name)."""
+
+    id: int
+
+    title: str
+
+    url: str
+    """Адрес страницы объекта. Заполняется при получении объектов (см. SearchEngine.hydrate())."""
+
+    score: int
+    """Оценка соответствия. Чем выше, тем раньше в выдаче."""
+
+
+class SearchResults(list):
+    """Результаты поиска.
+
+    Помимо самих результатов хранит количество найденных,
+    но отброшенных при ранжировании как малорелевантные.
+
+    """
+    dropped: int = 0
+
+
+class SearchEngine:
+    """Поиск сразу по нескольким областям одним запросом к БД.
+
+    Выборки, возвращаемые методами .find() моделей областей,
+    объединяются (UNION ALL) в один запрос, возвращающий
+    лишь необходимые для ранжирования данные. Сами объекты затем
+    получаются пачками и только для попавших в выдачу строк.
+
+    """
+    score_exact: int = 3
+    """Оценка для точного совпадения заголовка с термином."""
+
+    score_prefix: int = 2
+    """Оценка для заголовка, начинающегося с термина."""
+
+    score_other: int = 1
+    """Оценка для прочих совпадений."""
+
+    @classmethod
+    def get_title_field(cls, model: type[Model]) -> str:
+        """Возвращает имя поля модели, хранящего заголовок.
+
+        :param model:
+
+        """
+        return model.search_index_fields.get('title', ('title',))[0]
+
+    @classmethod
+    def get_queryset(cls, model: type[Model], realm_idx: int, *search_terms: str) -> QuerySet:
+        """Возвращает выборку строк результата поиска для указанной модели.
+
+        :param model:
+        :param realm_idx: Порядковый номер области, используется для упорядочивания.
+        :param search_terms:
+
+        """
+        title_field = cls.get_title_field(model)
+
+        whens = []
+
+        for term in filter(None, search_terms):
+            whens.extend((
+                When(**{f'{title_field}__iexact': term}, then=Value(cls.score_exact)),
+                When(**{f'{title_field}__istartswith': term}, then=Value(cls.score_prefix)),
+            ))
+
+        return model.find(*search_terms).order_by().annotate(
+            search_realm=Value(realm_idx, output_field=IntegerField()),
+            search_score=Case(*whens, default=Value(cls.score_other), output_field=IntegerField()),
+        ).values_list('search_realm', 'id', title_field, 'search_score')
+
+    @classmethod
+    def find(
+        cls,
+        search_in: tuple[type[Model], ...],
+        *search_terms: str,
+        limit: int = SEARCH_LIMIT
+    ) -> list[SearchResult]:
+        """Ищет термины в указанных областях. Возвращает строки результатов,
+        упорядоченные по убыванию оценки, а затем по порядку областей в search_in.
+
+        :param search_in: Модели областей.
+        :param search_terms:
+        :param limit: Максимальное количество результатов.
+
+        """
+        querysets = [
+            cls.get_queryset(model, realm_idx, *search_terms)
+            for realm_idx, model in enumerate(search_in)
+        ]
+
+        if not querysets:
+            return []
+
+        qs = querysets[0]
+
+        if len(querysets) > 1:
+            qs = qs.union(*querysets[1:], all=True)
+
+        qs = qs.order_by('-search_score', 'search_realm', 'id')[:limit]
+
+        return [
+            SearchResult(
+                realm=search_in[realm_idx]._meta.label_lower,
+                id=obj_id,
+                title=title,
+                url='',
+                score=score,
+            )
+            for realm_idx, obj_id, title, score in qs
+        ]
+
+    @classmethod
+    def hydrate(
+        cls,
+        search_in: tuple[type[Model], ...],
+        results: list[SearchResult]
+    ) -> list[tuple[SearchResult, Model]]:
+        """Получает объекты для строк результатов (по одному запросу на область).
+        Возвращает пары из строки с заполненным адресом и объекта в исходном порядке.
+
+        Строки, объекты которых успели исчезнуть, отбрасываются.
+
+        :param search_in: Модели областей.
+        :param results:
+
+        """
+        models = {model._meta.label_lower: model for model in search_in}
+        ids = {}
+
+        for result in results:
+            ids.setdefault(result.realm, []).append(result.id)
+
+        objects = {
+            realm: models[realm].objects.in_bulk(realm_ids)
+            for realm, realm_ids in ids.items()
+        }
+
+        hydrated = []
+
+        for result in results:
+            obj = objects[result.realm].get(result.id)
+
+            if obj is not None:
+                hydrated.append((result._replace(url=obj.get_absolute_url()), obj))
+
+        return hydrated
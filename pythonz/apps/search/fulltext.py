@@ -0,0 +1,454 @@
+import re
+from collections.abc import Iterable
+from itertools import chain
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, connection, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import Model, Q, signals
+from django.db.models.expressions import RawSQL
+
+from ..caching import is_update_relevant
+from ..utils import get_logger
+from .prefix import RE_WORDS, TermIndex
+
+LOGGER = get_logger('search')
+
+INDEX_TABLE = 'apps_search_index'
+"""Таблица полнотекстового индекса."""
+
+INDEX_COLUMNS = ('title', 'terms', 'description')
+"""Колонки индекса. Модели раскладывают по ним свои поля (см. search_index_fields)."""
+
+REALM_SHIFT = 32
+"""Сдвиг, которым идентификатор области (типа содержимого) упаковывается в rowid записи индекса."""
+
+OBJ_ID_MASK = (1 << REALM_SHIFT) - 1
+
+
+class IndexBackend:
+    """Базовый класс реализации полнотекстового индекса для конкретной СУБД."""
+
+    vendor: str = ''
+    """Псевдоним СУБД (см. connection.vendor)."""
+
+    min_term_len: int = 1
+    """Минимальная длина термина, который индекс способен найти."""
+
+    def get_create_sql(self) -> list[str]:
+        """Возвращает инструкции для создания индекса."""
+        raise NotImplementedError  # pragma: nocover
+
+    def get_drop_sql(self) -> list[str]:
+        """Возвращает инструкции для удаления индекса."""
+        return [f'DROP TABLE IF EXISTS {INDEX_TABLE}']
+
+    def get_upsert_sql(self) -> str:
+        """Возвращает инструкцию для добавления (замены) записи индекса.
+        Параметры: rowid, title, terms, description.
+
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    def get_delete_sql(self) -> str:
+        """Возвращает инструкцию для удаления записи индекса. Параметр: rowid."""
+        return f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s'
+
+    def get_match_sql(self, realm_id: int, terms: list[str]) -> tuple[str, list]:
+        """Возвращает запрос (и его параметры), выбирающий идентификаторы
+        объектов указанной области, в которых встречается хотя бы один из терминов.
+
+        :param realm_id:
+        :param terms:
+
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    def supports(self, terms: list[str]) -> bool:
+        """Возвращает флаг, указывающий на то, может ли индекс обработать указанные термины.
+
+        :param terms:
+
+        """
+        return all(len(term) >= self.min_term_len for term in terms)
+
+
+class SqliteBackend(IndexBackend):
+    """Индекс на основе FTS5 с триграммным токенизатором.
+
+    Триграммы позволяют искать вхождение подстроки (как icontains),
+    но без полного просмотра таблиц.
+
+    """
+    vendor: str = 'sqlite'
+    min_term_len: int = 3
+
+    def get_create_sql(self) -> list[str]:
+        return [
+            (
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+                f"{', '.join(INDEX_COLUMNS)}, tokenize='trigram')"
+            ),
+        ]
+
+    def get_upsert_sql(self) -> str:
+        return f"INSERT OR REPLACE INTO {INDEX_TABLE} (rowid, {', '.join(INDEX_COLUMNS)}) VALUES (%s, %s, %s, %s)"
+
+    def get_match_sql(self, realm_id: int, terms: list[str]) -> tuple[str, list]:
+        quoted = [term.replace('"', '""') for term in terms]
+        expression = ' OR '.join(f'"{term}"' for term in quoted)
+        realm_min = realm_id << REALM_SHIFT
+
+        return (
+            (
+                f'SELECT rowid & {OBJ_ID_MASK} FROM {INDEX_TABLE} '
+                f'WHERE {INDEX_TABLE} MATCH %s AND rowid BETWEEN %s AND %s'
+            ),
+            [expression, realm_min, realm_min | OBJ_ID_MASK]
+        )
+
+
+class PostgresBackend(IndexBackend):
+    """Индекс на основе tsvector с GIN.
+
+    Ищет по префиксам слов, а не по произвольным подстрокам.
+
+    """
+    vendor: str = 'postgresql'
+
+    def get_create_sql(self) -> list[str]:
+        document = ' || '.join(
+            f"setweight(to_tsvector('simple', coalesce({column}, '')), '{weight}')"
+            for column, weight in zip(INDEX_COLUMNS, 'ABC', strict=True)
+        )
+        return [
+            (
+                f'CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ('
+                'rowid bigint PRIMARY KEY, title text, terms text, description text, '
+                f'document tsvector GENERATED ALWAYS AS ({document}) STORED)'
+            ),
+            f'CREATE INDEX IF NOT EXISTS {INDEX_TABLE}_document ON {INDEX_TABLE} USING GIN (document)',
+        ]
+
+    def get_upsert_sql(self) -> str:
+        return (
+            f"INSERT INTO {INDEX_TABLE} (rowid, {', '.join(INDEX_COLUMNS)}) VALUES (%s, %s, %s, %s) "
+            'ON CONFLICT (rowid) DO UPDATE SET '
+            f"{', '.join(f'{column} = EXCLUDED.{column}' for column in INDEX_COLUMNS)}"
+        )
+
+    def get_match_sql(self, realm_id: int, terms: list[str]) -> tuple[str, list]:
+        query = ' | '.join(
+            f"({' & '.join(f'{word}:*' for word in words)})"
+            for term in terms
+            if (words := re.findall(r'\w+', term))
+        )
+        realm_min = realm_id << REALM_SHIFT
+
+        return (
+            (
+                f'SELECT rowid & {OBJ_ID_MASK} FROM {INDEX_TABLE} '
+                "WHERE document @@ to_tsquery('simple', %s) AND rowid BETWEEN %s AND %s"
+            ),
+            [query, realm_min, realm_min | OBJ_ID_MASK]
+        )
+
+    def supports(self, terms: list[str]) -> bool:
+        return all(re.search(r'\w', term) for term in terms)
+
+
+BACKENDS: dict[str, type[IndexBackend]] = {backend.vendor: backend for backend in (SqliteBackend, PostgresBackend)}
+"""Реализации индекса, индексированные псевдонимами СУБД."""
+
+
+class FullTextIndex:
+    """Полнотекстовый индекс по моделям областей.
+
+    Модели, желающие попасть в индекс, описывают атрибут search_index_fields.
+    Записи индекса обновляются при сохранении и удалении объектов.
+
+    """
+    _available: bool | None = None
+    """Кеш признака наличия таблицы индекса в БД."""
+
+    @classmethod
+    def get_backend(cls, conn: BaseDatabaseWrapper = connection) -> IndexBackend | None:
+        """Возвращает реализацию индекса для указанного соединения, либо None,
+        если СУБД не поддерживается.
+
+        :param conn:
+
+        """
+        backend_cls = BACKENDS.get(conn.vendor)
+        return backend_cls() if backend_cls else None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """Возвращает флаг, указывающий на то, что индексом можно пользоваться."""
+
+        available = cls._available
+
+        if available is None:
+            available = cls.get_backend() is not None and INDEX_TABLE in connection.introspection.table_names()
+            cls._available = available
+
+        return available
+
+    @classmethod
+    def reset(cls):
+        """Сбрасывает кеш признака наличия индекса."""
+        cls._available = None
+
+    @classmethod
+    def create(cls, conn: BaseDatabaseWrapper = connection):
+        """Создаёт таблицу индекса, если СУБД это поддерживает.
+
+        :param conn:
+
+        """
+        backend = cls.get_backend(conn)
+
+        if backend is None:
+            LOGGER.warning('Full-text index is not supported for `%s`', conn.vendor)
+            return
+
+        with conn.cursor() as cursor:
+            for sql in backend.get_create_sql():
+                cursor.execute(sql)
+
+        cls.reset()
+
+    @classmethod
+    def drop(cls, conn: BaseDatabaseWrapper = connection):
+        """Удаляет таблицу индекса.
+
+        :param conn:
+
+        """
+        if backend := cls.get_backend(conn):
+
+            with conn.cursor() as cursor:
+                for sql in backend.get_drop_sql():
+                    cursor.execute(sql)
+
+        cls.reset()
+
+    @classmethod
+    def get_models(cls) -> dict[type[Model], dict[str, tuple[str, ...]]]:
+        """Возвращает индексируемые модели (конкретные, а не прокси)
+        и раскладку их полей по колонкам индекса.
+
+        """
+        indexed = {}
+
+        for model in apps.get_models():
+            if fields := getattr(model, 'search_index_fields', None):
+                indexed[model._meta.concrete_model] = fields
+
+        return indexed
+
+    @classmethod
+    def get_realm_id(cls, model: type[Model]) -> int:
+        """Возвращает идентификатор области, используемый в индексе.
+
+        :param model:
+
+        """
+        return ContentType.objects.get_for_model(model).id
+
+    @classmethod
+    def get_document(cls, obj: Model | dict, fields: dict[str, tuple[str, ...]]) -> list[str]:
+        """Возвращает значения колонок индекса для указанного объекта.
+
+        :param obj: Объект модели, либо словарь со значениями его полей.
+        :param fields: Раскладка полей по колонкам индекса.
+
+        """
+        get_value = obj.get if isinstance(obj, dict) else lambda field: getattr(obj, field, '')
+
+        return [
+            '\n'.join(filter(None, (get_value(field) or '' for field in fields.get(column, ()))))
+            for column in INDEX_COLUMNS
+        ]
+
+    @classmethod
+    def get_filter(cls, model: type[Model], *search_terms: str) -> Q:
+        """Возвращает фильтр, отбирающий объекты модели, содержащие хотя бы один из терминов.
+
+        Если индекс недоступен, либо не способен обработать термины,
+        используется поиск вхождения подстроки в полях модели. Короткие термины
+        при этом ищутся по началам слов, как и в TermIndex, чтобы результаты
+        поиска во всех областях понимались одинаково.
+
+        :param model:
+        :param search_terms:
+
+        """
+        terms = [term for term in search_terms if term]
+
+        if not terms:
+            return Q()
+
+        if cls.is_available() and (backend := cls.get_backend()).supports(terms):
+            return Q(id__in=RawSQL(*backend.get_match_sql(cls.get_realm_id(model), terms)))
+
+        q = Q()
+
+        for term in terms:
+
+            if len(term) < TermIndex.min_trigram_len:
+                words = '|'.join(map(re.escape, RE_WORDS.findall(term) or [term]))
+                lookup, value = 'iregex', rf'(^|\W)({words})'
+
+            else:
+                lookup, value = 'icontains', term
+
+            for field in chain(*model.search_index_fields.values()):
+                q |= Q(**{f'{field}__{lookup}': value})
+
+        return q
+
+    @classmethod
+    def update(cls, obj: Model):
+        """Добавляет (обновляет) запись индекса для указанного объекта.
+
+        :param obj:
+
+        """
+        if not cls.is_available():
+            return
+
+        model = obj._meta.concrete_model
+        fields = cls.get_models().get(model)
+
+        if not fields:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                cls.get_backend().get_upsert_sql(),
+                [(cls.get_realm_id(model) << REALM_SHIFT) | obj.pk, *cls.get_document(obj, fields)]
+            )
+
+    @classmethod
+    def remove(cls, obj: Model):
+        """Удаляет запись индекса для указанного объекта.
+
+        :param obj:
+
+        """
+        if not cls.is_available():
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                cls.get_backend().get_delete_sql(),
+                [(cls.get_realm_id(obj._meta.concrete_model) << REALM_SHIFT) | obj.pk]
+            )
+
+    @classmethod
+    def get_indexed(cls) -> list[tuple[type[Model], int, dict[str, tuple[str, ...]]]]:
+        """Возвращает индексируемые модели, их идентификаторы областей
+        и раскладку их полей по колонкам индекса.
+
+        """
+        return [(model, cls.get_realm_id(model), fields) for model, fields in cls.get_models().items()]
+
+    @classmethod
+    def rebuild(
+        cls,
+        chunk_size: int = 500,
+        *,
+        conn: BaseDatabaseWrapper = connection,
+        indexed: list[tuple[type[Model], int, dict[str, tuple[str, ...]]]] | None = None
+    ) -> int:
+        """Заполняет индекс заново данными всех индексируемых моделей.
+        Возвращает количество проиндексированных объектов.
+
+        :param chunk_size: Количество записей, вставляемых за раз.
+        :param conn: Соединение с БД.
+        :param indexed: Индексируемые модели (см. .get_indexed()).
+            Миграции передают здесь исторические модели.
+
+        """
+        if indexed is None:
+
+            if not cls.is_available():
+                return 0
+
+            indexed = cls.get_indexed()
+
+        backend = cls.get_backend(conn)
+
+        if backend is None:
+            return 0
+
+        total = 0
+
+        with conn.cursor() as cursor:
+
+            for model, realm_id, fields in indexed:
+
+                realm_min = realm_id << REALM_SHIFT
+                cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE rowid BETWEEN %s AND %s', [
+                    realm_min, realm_min | OBJ_ID_MASK])
+
+                values = model._default_manager.db_manager(conn.alias).values(
+                    'pk', *chain(*fields.values())).order_by('pk')
+                rows = []
+
+                for item in values.iterator(chunk_size=chunk_size):
+                    rows.append([realm_min | item['pk'], *cls.get_document(item, fields)])
+
+                    if len(rows) >= chunk_size:
+                        cursor.executemany(backend.get_upsert_sql(), rows)
+                        total += len(rows)
+                        rows = []
+
+                if rows:
+                    cursor.executemany(backend.get_upsert_sql(), rows)
+                    total += len(rows)
+
+        return total
+
+    @classmethod
+    def on_save(cls, *, instance: Model, update_fields: Iterable[str] | None = None, **kwargs):
+        """Обработчик сигнала post_save индексируемых моделей."""
+        fields = cls.get_models().get(instance._meta.concrete_model, {})
+
+        if not is_update_relevant(update_fields, chain(*fields.values())):
+            return
+
+        try:
+            # Точка сохранения не даёт ошибке испортить внешнюю транзакцию (PostgreSQL).
+            with transaction.atomic():
+                cls.update(instance)
+
+        except DatabaseError:
+            LOGGER.exception('Unable to update full-text index for %s', instance)
+
+    @classmethod
+    def on_delete(cls, *, instance: Model, **kwargs):
+        """Обработчик сигнала post_delete индексируемых моделей."""
+        try:
+            with transaction.atomic():
+                cls.remove(instance)
+
+        except DatabaseError:
+            LOGGER.exception('Unable to remove %s from full-text index', instance)
+
+    @classmethod
+    def connect(cls):
+        """Подключает обработчики сигналов, поддерживающие индекс в актуальном состоянии."""
+
+        for model in apps.get_models():
+
+            if not getattr(model, 'search_index_fields', None):
+                continue
+
+            # Прокси-модели (например, категории) сохраняются и от своего имени, и от имени исходной модели.
+            for sender in {model, model._meta.concrete_model}:
+                uid = f'search_index_{sender._meta.label_lower}'
+                signals.post_save.connect(cls.on_save, sender=sender, dispatch_uid=uid)
+                signals.post_delete.connect(cls.on_delete, sender=sender, dispatch_uid=uid)
@@ -0,0 +1,295 @@
+import re
+from array import array
+from bisect import bisect_left, insort
+from collections.abc import Iterable
+from functools import partial
+from threading import RLock
+
+from django.db import transaction
+from django.db.models import Model, signals
+
+from ..caching import cache_bump_generation, cache_get_generation, is_update_relevant
+from ..utils import get_logger
+
+LOGGER = get_logger('search')
+
+RE_WORDS = re.compile(r'\w+')
+
+
+def get_trigrams(text: str) -> set[str]:
+    """Возвращает множество триграмм указанной строки.
+
+    :param text:
+
+    """
+    return {text[idx:idx + 3] for idx in range(len(text) - 2)}
+
+
+class TermIndex:
+    """Компактный индекс опубликованных объектов модели, живущий в памяти процесса.
+
+    Хранит отсортированный массив слов (для поиска по началам слов)
+    и списки вхождений триграмм (для поиска подстрок).
+    Строится лениво при первом обращении, далее поддерживается
+    в актуальном состоянии сигналами сохранения и удаления объектов.
+    Об изменениях, внесённых в других процессах, узнаёт по поколению в общем кеше.
+
+    Объявляется в теле модели:
+
+        term_index = TermIndex(fields=('title', 'search_terms'))
+
+    """
+    min_trigram_len: int = 3
+    """Термины короче этого ищутся по началам слов, а не по триграммам."""
+
+    max_ids: int = 1000
+    """Если совпадений больше, индекс отказывается отвечать (см. find_ids())."""
+
+    compact_ratio: float = 0.2
+    """Доля устаревших записей, после которой индекс перестраивается целиком."""
+
+    def __init__(self, *, fields: tuple[str, ...]):
+        self.fields = fields
+        self.model: type[Model] | None = None
+
+        self._lock = RLock()
+        self._generation: int | None = None
+        self._stale: int = 0
+
+        self._entries: dict[int, str] = {}
+        """Нормализованный текст полей, индексированный идентификаторами объектов."""
+
+        self._words: list[tuple[str, int]] = []
+        """Отсортированный массив пар (слово, идентификатор)."""
+
+        self._trigrams: dict[str, array] = {}
+        """Списки идентификаторов, индексированные триграммами."""
+
+    def contribute_to_class(self, model: type[Model], name: str):
+        self.model = model
+        setattr(model, name, self)
+
+    @property
+    def generation_name(self) -> str:
+        return f'term_index|{self.model._meta.label_lower}'
+
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        """Приводит текст к виду, в котором он хранится в индексе.
+
+        :param text:
+
+        """
+        return text.casefold()
+
+    def get_text(self, values: list[str]) -> str:
+        """Возвращает нормализованный текст для индексирования по значениям полей.
+
+        :param values:
+
+        """
+        return self.normalize('\n'.join(filter(None, values)))
+
+    def reset(self):
+        """Сбрасывает индекс. Он будет построен заново при следующем обращении."""
+        with self._lock:
+            self._generation = None
+            self._stale = 0
+            self._entries = {}
+            self._words = []
+            self._trigrams = {}
+
+    def build(self):
+        """Строит индекс заново по данным из БД."""
+
+        with self._lock:
+            generation = cache_get_generation(self.generation_name)
+
+            entries = {}
+            words = []
+            trigrams = {}
+
+            for obj_id, *values in self.model.objects.published().values_list('id', *self.fields).iterator():
+                text = self.get_text(values)
+                entries[obj_id] = text
+                words.extend((word, obj_id) for word in set(RE_WORDS.findall(text)))
+
+                for trigram in get_trigrams(text):
+                    trigrams.setdefault(trigram, array('I')).append(obj_id)
+
+            words.sort()
+
+            self._entries = entries
+            self._words = words
+            self._trigrams = trigrams
+            self._stale = 0
+            self._generation = generation
+
+    def actualize(self):
+        """Перестраивает индекс, если он не построен, либо устарел."""
+
+        if self._generation != cache_get_generation(self.generation_name):
+            self.build()
+
+    def _add(self, obj_id: int, text: str):
+        self._entries[obj_id] = text
+
+        for word in set(RE_WORDS.findall(text)):
+            insort(self._words, (word, obj_id))
+
+        for trigram in get_trigrams(text):
+            self._trigrams.setdefault(trigram, array('I')).append(obj_id)
+
+    def update(self, obj: Model, *, remove: bool = False):
+        """Обновляет данные указанного объекта в индексе.
+
+        Старые записи объекта не вычищаются немедленно: при поиске
+        кандидаты сверяются с актуальным текстом, а накопившийся мусор
+        устраняется периодическим перестроением индекса.
+
+        :param obj:
+        :param remove: Следует ли удалить объект из индекса.
+
+        """
+        with self._lock:
+
+            if self._generation is None:
+                # Индекс ещё не строился, построится при первом обращении.
+                cache_bump_generation(self.generation_name)
+                return
+
+            generation = cache_bump_generation(self.generation_name)
+
+            if generation != self._generation + 1:
+                # Пропустили изменения из других процессов.
+                self._generation = None
+                return
+
+            self._generation = generation
+
+            obj_id = obj.pk
+
+            if self._entries.pop(obj_id, None) is not None:
+                self._stale += 1
+
+            if not remove and obj.is_published:
+                self._add(obj_id, self.get_text([getattr(obj, field) for field in self.fields]))
+
+            if self._stale > len(self._entries) * self.compact_ratio:
+                self._generation = None
+
+    def _find_prefix(self, term: str) -> set[int]:
+        words = self._words
+        found = set()
+
+        for word in RE_WORDS.findall(term) or [term]:
+            idx = bisect_left(words, (word, 0))
+
+            while idx < len(words) and words[idx][0].startswith(word):
+                found.add(words[idx][1])
+                idx += 1
+
+        return found
+
+    def _find_substring(self, term: str) -> set[int]:
+        postings = []
+
+        for trigram in get_trigrams(term):
+            posting = self._trigrams.get(trigram)
+
+            if posting is None:
+                return set()
+
+            postings.append(posting)
+
+        postings.sort(key=len)
+
+        found = set(postings[0])
+
+        for posting in postings[1:]:
+            found.intersection_update(posting)
+
+            if not found:
+                break
+
+        return found
+
+    def _matches(self, term: str, text: str) -> bool:
+        """Проверяет, содержит ли актуальный текст объекта термин
+        (короткие термины — в начале какого-либо из слов).
+
+        :param term:
+        :param text:
+
+        """
+        if len(term) >= self.min_trigram_len:
+            return term in text
+
+        words = RE_WORDS.findall(text)
+
+        return any(
+            word.startswith(term_word)
+            for term_word in RE_WORDS.findall(term) or [term]
+            for word in words
+        )
+
+    def find_ids(self, *search_terms: str) -> set[int] | None:
+        """Возвращает идентификаторы объектов, содержащих хотя бы один из терминов.
+
+        Длинные термины ищутся как подстроки (аналогично icontains),
+        короткие — по началам слов.
+
+        Возвращает None, если совпадений слишком много для того,
+        чтобы передавать их идентификаторы в запрос к БД.
+
+        :param search_terms:
+
+        """
+        self.actualize()
+
+        entries = self._entries
+        found = set()
+
+        for term in search_terms:
+
+            term = self.normalize(term)
+
+            if not term:
+                continue
+
+            if len(term) < self.min_trigram_len:
+                candidates = self._find_prefix(term)
+
+            else:
+                candidates = self._find_substring(term)
+
+            for obj_id in candidates:
+                # Сверяемся с актуальным текстом, т.к. в индексе могут оставаться устаревшие записи.
+                text = entries.get(obj_id)
+
+                if text is not None and self._matches(term, text):
+                    found.add(obj_id)
+
+            if len(found) > self.max_ids:
+                return None
+
+        return found
+
+    def on_save(self, *, instance: Model, update_fields: Iterable[str] | None = None, **kwargs):
+        """Обработчик сигнала post_save."""
+        if not is_update_relevant(update_fields, (*self.fields, 'status')):
+            return
+
+        # Другие процессы узнают об изменении по поколению и перечитают БД,
+        # поэтому поколение увеличиваем только после фиксации транзакции.
+        transaction.on_commit(partial(self.update, instance))
+
+    def on_delete(self, *, instance: Model, **kwargs):
+        """Обработчик сигнала post_delete."""
+        transaction.on_commit(partial(self.update, instance, remove=True))
+
+    def connect(self):
+        """Подключает обработчики сигналов, поддерживающие индекс в актуальном состоянии."""
+        uid = f'term_index_{self.model._meta.label_lower}'
+        signals.post_save.connect(self.on_save, sender=self.model, dispatch_uid=uid, weak=False)
+        signals.post_delete.connect(self.on_delete, sender=self.model, dispatch_uid=uid, weak=False)
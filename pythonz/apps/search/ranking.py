@@ -0,0 +1,314 @@
+import math
+from collections import Counter
+from collections.abc import Iterable
+from functools import partial
+from itertools import chain
+from threading import RLock
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Model, signals
+
+from ..caching import cache_bump_generation, cache_get_generation, is_update_relevant
+from .engine import SearchResult, SearchResults
+from .fulltext import INDEX_COLUMNS, FullTextIndex
+from .prefix import RE_WORDS
+
+
+def tokenize(text: str) -> list[str]:
+    """Разбивает текст на нормализованные слова.
+
+    :param text:
+
+    """
+    return RE_WORDS.findall(text.casefold())
+
+
+def get_rank_fields(model: type[Model]) -> dict[str, tuple[str, ...]]:
+    """Возвращает раскладку полей модели по колонкам, учитываемым при ранжировании.
+
+    :param model:
+
+    """
+    return getattr(model, 'search_rank_fields', None) or model.search_index_fields
+
+
+class TermStats:
+    """Статистика терминов объектов модели, необходимая для ранжирования BM25.
+
+    Хранит в памяти процесса частоты слов в колонках каждого документа,
+    документную частоту слов и суммарные длины колонок. Строится лениво,
+    далее обновляется сигналами сохранения и удаления объектов.
+    Об изменениях, внесённых в других процессах, узнаёт по поколению в общем кеше.
+
+    """
+    registry: dict[str, 'TermStats'] = {}
+
+    def __init__(self, model: type[Model]):
+        self.model = model
+        self.fields = get_rank_fields(model)
+
+        self._lock = RLock()
+        self._generation: int | None = None
+
+        self.docs: dict[int, tuple[Counter, ...]] = {}
+        """Частоты слов в колонках, индексированные идентификаторами объектов."""
+
+        self.df: Counter = Counter()
+        """Количество документов, содержащих слово."""
+
+        self.lengths: list[int] = [0] * len(INDEX_COLUMNS)
+        """Суммарные длины колонок (в словах) по всем документам."""
+
+    @classmethod
+    def get(cls, model: type[Model]) -> 'TermStats':
+        """Возвращает статистику для указанной модели.
+
+        :param model: Модель, описывающая поля для ранжирования
+            (для прокси-моделей статистика общая с исходной моделью).
+
+        """
+        label = model._meta.concrete_model._meta.label_lower
+
+        stats = cls.registry.get(label)
+
+        if stats is None:
+            stats = cls.registry.setdefault(label, cls(model))
+
+        return stats
+
+    @classmethod
+    def reset_all(cls):
+        """Сбрасывает статистику всех моделей."""
+        cls.registry.clear()
+
+    @property
+    def generation_name(self) -> str:
+        return f'term_stats|{self.model._meta.label_lower}'
+
+    def _add(self, obj_id: int, document: list[str]):
+        counters = tuple(Counter(tokenize(value)) for value in document)
+        self.docs[obj_id] = counters
+        self.df.update(set(chain(*counters)))
+
+        for idx, counter in enumerate(counters):
+            self.lengths[idx] += counter.total()
+
+    def _remove(self, obj_id: int):
+        counters = self.docs.pop(obj_id, None)
+
+        if counters is None:
+            return
+
+        self.df.subtract(set(chain(*counters)))
+
+        for idx, counter in enumerate(counters):
+            self.lengths[idx] -= counter.total()
+
+    def build(self):
+        """Собирает статистику заново по данным из БД."""
+
+        with self._lock:
+            generation = cache_get_generation(self.generation_name)
+
+            self.docs = {}
+            self.df = Counter()
+            self.lengths = [0] * len(INDEX_COLUMNS)
+
+            fields = self.fields
+            values = self.model._default_manager.values('pk', *chain(*fields.values())).order_by()
+
+            for item in values.iterator():
+                self._add(item['pk'], FullTextIndex.get_document(item, fields))
+
+            self._generation = generation
+
+    def actualize(self):
+        """Пересобирает статистику, если она не собрана, либо устарела."""
+
+        if self._generation != cache_get_generation(self.generation_name):
+            self.build()
+
+    def update(self, obj: Model, *, remove: bool = False):
+        """Обновляет статистику по указанному объекту.
+
+        :param obj:
+        :param remove: Следует ли исключить объект из статистики.
+
+        """
+        with self._lock:
+            generation = cache_bump_generation(self.generation_name)
+
+            if self._generation is None or generation != self._generation + 1:
+                # Статистика ещё не собиралась, либо пропущены изменения из других процессов.
+                self._generation = None
+                return
+
+            self._generation = generation
+            self._remove(obj.pk)
+
+            if not remove:
+                self._add(obj.pk, FullTextIndex.get_document(obj, self.fields))
+
+    @classmethod
+    def on_save(cls, model: type[Model], *, instance: Model, update_fields: Iterable[str] | None = None, **kwargs):
+        """Обработчик сигнала post_save."""
+        stats = cls.get(model)
+
+        if is_update_relevant(update_fields, chain(*stats.fields.values())):
+            # Другие процессы узнают об изменении по поколению и перечитают БД,
+            # поэтому поколение увеличиваем только после фиксации транзакции.
+            transaction.on_commit(partial(stats.update, instance))
+
+    @classmethod
+    def on_delete(cls, model: type[Model], *, instance: Model, **kwargs):
+        """Обработчик сигнала post_delete."""
+        transaction.on_commit(partial(cls.get(model).update, instance, remove=True))
+
+    @classmethod
+    def connect(cls):
+        """Подключает обработчики сигналов, поддерживающие статистику в актуальном состоянии."""
+
+        for model in apps.get_models():
+
+            if not getattr(model, 'search_index_fields', None):
+                continue
+
+            # Прокси-модели (например, категории) сохраняются и от своего имени, и от имени исходной модели.
+            for sender in {model, model._meta.concrete_model}:
+                uid = f'term_stats_{sender._meta.label_lower}'
+                signals.post_save.connect(partial(cls.on_save, model), sender=sender, dispatch_uid=uid, weak=False)
+                signals.post_delete.connect(partial(cls.on_delete, model), sender=sender, dispatch_uid=uid, weak=False)
+
+
+class Ranker:
+    """Ранжирование результатов поиска по BM25F.
+
+    Частоты слов в колонках (заголовок, термины, описание) взвешиваются,
+    нормализуются по длине колонки и суммируются, после чего к сумме
+    применяется насыщение BM25. Итоговая оценка умножается на коэффициент
+    области (см. атрибут search_boost моделей).
+
+    """
+    k1: float = 1.2
+    """Насыщение частоты слова."""
+
+    b: float = 0.75
+    """Степень нормализации по длине колонки."""
+
+    column_weights: tuple[float, ...] = (3.0, 2.0, 1.0)
+    """Веса колонок (title, terms, description)."""
+
+    prefix_weight: float = 0.5
+    """Вес слова документа, лишь начинающегося со слова запроса."""
+
+    exact_title_boost: float = 2.0
+    """Коэффициент для документа, заголовок которого совпадает с запросом."""
+
+    min_score_ratio: float = 0.5
+    """Результаты с оценкой ниже этой доли от лучшей отбрасываются."""
+
+    @classmethod
+    def get_score(cls, stats: TermStats, obj_id: int, tokens: list[str]) -> float:
+        """Возвращает оценку BM25F документа для слов запроса.
+
+        :param stats:
+        :param obj_id:
+        :param tokens: Слова запроса.
+
+        """
+        counters = stats.docs.get(obj_id)
+
+        if counters is None:
+            return 0.0
+
+        docs_count = len(stats.docs)
+        avg_lengths = [(length / docs_count) or 1 for length in stats.lengths]
+
+        score = 0.0
+
+        for token in tokens:
+            tf = 0.0
+
+            for idx, counter in enumerate(counters):
+                if not counter:
+                    continue
+
+                column_tf = counter.get(token, 0)
+
+                if not column_tf:
+                    column_tf = cls.prefix_weight * sum(
+                        count for word, count in counter.items() if word.startswith(token))
+
+                if column_tf:
+                    norm = 1 - cls.b + cls.b * counter.total() / avg_lengths[idx]
+                    tf += cls.column_weights[idx] * column_tf / norm
+
+            if tf:
+                df = stats.df.get(token, 0)
+                idf = math.log(1 + (docs_count - df + 0.5) / (df + 0.5))
+                score += idf * tf / (cls.k1 + tf)
+
+        return score
+
+    @classmethod
+    def rank(
+        cls,
+        search_in: tuple[type[Model], ...],
+        results: list[SearchResult],
+        *search_terms: str,
+        limit: int
+    ) -> SearchResults:
+        """Упорядочивает результаты поиска по убыванию релевантности,
+        отбрасывает слабые и возвращает не более указанного количества.
+        Количество отброшенных слабых результатов указывается в .dropped.
+
+        :param search_in: Модели областей.
+        :param results:
+        :param search_terms:
+        :param limit:
+
+        """
+        models = {model._meta.label_lower: model for model in search_in}
+        terms = [term for term in search_terms if term]
+        terms_normalized = {' '.join(tokenize(term)) for term in terms}
+
+        stats_by_realm = {}
+
+        for realm in {result.realm for result in results}:
+            stats = TermStats.get(models[realm])
+            stats.actualize()
+            stats_by_realm[realm] = stats
+
+        scored = []
+
+        for position, result in enumerate(results):
+            model = models[result.realm]
+            stats = stats_by_realm[result.realm]
+
+            score = max(cls.get_score(stats, result.id, tokenize(term)) for term in terms)
+            score *= getattr(model, 'search_boost', 1.0)
+
+            if ' '.join(tokenize(result.title)) in terms_normalized:
+                score *= cls.exact_title_boost
+
+            scored.append((score, position, result))
+
+        ranked = SearchResults()
+
+        if not scored:
+            return ranked
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        threshold = scored[0][0] * cls.min_score_ratio
+
+        for score, _, result in scored[:limit]:
+
+            if score >= threshold:
+                ranked.append(result._replace(score=round(score * 1000)))
+
+            else:
+                ranked.dropped += 1
+
+        return ranked
@@ -0,0 +1,251 @@
+from threading import Lock, Thread
+
+from django.apps import apps
+from django.db import connection
+
+from ..caching import cache_get_generations, get_search_generation_name
+from .prefix import RE_WORDS
+
+
+def get_deletes(word: str, distance: int) -> set[str]:
+    """Возвращает варианты слова, получаемые удалением не более указанного количества символов.
+
+    :param word:
+    :param distance:
+
+    """
+    deletes = {word}
+    edge = {word}
+
+    for _ in range(distance):
+        edge = {
+            variant[:idx] + variant[idx + 1:]
+            for variant in edge
+            for idx in range(len(variant))
+        } - deletes
+
+        if not edge:
+            break
+
+        deletes.update(edge)
+
+    return deletes
+
+
+def get_distance(left: str, right: str, limit: int) -> int:
+    """Возвращает расстояние Дамерау-Левенштейна (без повторного редактирования подстрок)
+    между строками. Если оно превышает limit, возвращает limit + 1.
+
+    :param left:
+    :param right:
+    :param limit:
+
+    """
+    if abs(len(left) - len(right)) > limit:
+        return limit + 1
+
+    prev_prev = None
+    prev = list(range(len(right) + 1))
+
+    for idx_left, char_left in enumerate(left, 1):
+        current = [idx_left] + [0] * len(right)
+
+        for idx_right, char_right in enumerate(right, 1):
+            cost = char_left != char_right
+            current[idx_right] = min(
+                prev[idx_right] + 1,
+                current[idx_right - 1] + 1,
+                prev[idx_right - 1] + cost,
+            )
+
+            if (
+                prev_prev is not None and idx_right > 1 and
+                char_left == right[idx_right - 2] and left[idx_left - 2] == char_right
+            ):
+                current[idx_right] = min(current[idx_right], prev_prev[idx_right - 2] + 1)
+
+        if min(current) > limit:
+            return limit + 1
+
+        prev_prev, prev = prev, current
+
+    return min(prev[-1], limit + 1)
+
+
+class Suggester:
+    """Подсказки вида «возможно, вы имели в виду» для поисковых промахов.
+
+    Словарь составляется из слов и коротких фраз из указанных полей опубликованных
+    объектов. Для поиска с опечатками используется индекс удалений (в духе SymSpell):
+    и слова словаря, и запрос раскладываются на варианты без одного-двух символов,
+    совпавшие варианты дают кандидатов, которые затем проверяются точным расстоянием.
+    Поиск не зависит от размера словаря и не обращается к БД.
+
+    Словарь строится в памяти процесса при первом обращении и заново —
+    при изменении поколения результатов поиска по исходным моделям.
+    Перестроение идёт в фоновом потоке, а до его завершения подсказки
+    выдаются по прежнему словарю, чтобы запросы не ждали построения.
+
+    """
+    max_distance: int = 2
+    """Максимальное расстояние редактирования до подсказки."""
+
+    max_phrase_len: int = 24
+    """Фразы (значения полей целиком) длиннее этого не попадают в словарь."""
+
+    min_word_len: int = 3
+    """Слова короче этого не попадают в словарь."""
+
+    def __init__(self, *, sources: dict[str, tuple[str, ...]]):
+        """
+        :param sources: Поля моделей, из которых составляется словарь,
+            индексированные метками моделей (app_label.model_name).
+
+        """
+        self.sources = sources
+
+        self._lock = Lock()
+        self._building: bool = False
+        self._generations: list[int] | None = None
+        self._words: dict[str, tuple[str, int]] = {}
+        """Словарь: нормализованное слово -> (слово для вывода, частота)."""
+
+        self._deletes: dict[str, list[str]] = {}
+        """Индекс удалений: вариант -> слова словаря."""
+
+    def get_generations(self) -> list[int]:
+        return cache_get_generations(*(
+            get_search_generation_name(apps.get_model(label)) for label in self.sources))
+
+    def reset(self):
+        """Сбрасывает словарь. Он будет построен заново при следующем обращении."""
+        self._generations = None
+        self._building = False
+        self._words = {}
+        self._deletes = {}
+
+    def iter_values(self):
+        """Генерирует значения полей, из которых составляется словарь."""
+
+        for label, fields in self.sources.items():
+            model = apps.get_model(label)
+
+            for values in model.objects.published().values_list(*fields).iterator():
+                yield from filter(None, values)
+
+    def build(self):
+        """Строит словарь и индекс удалений заново по данным из БД."""
+
+        generations = self.get_generations()
+        words = {}
+
+        def add(word: str):
+            key = word.casefold()
+            display, frequency = words.get(key, (word, 0))
+            words[key] = (display, frequency + 1)
+
+        for value in self.iter_values():
+
+            # Значения могут содержать несколько фраз через запятую (например, термины поиска).
+            for phrase in value.split(','):
+                phrase = ' '.join(phrase.split())
+
+                if len(phrase) <= self.max_phrase_len:
+                    add(phrase)
+
+                for word in set(RE_WORDS.findall(phrase)):
+                    if len(word) >= self.min_word_len and word != phrase:
+                        add(word)
+
+        deletes = {}
+
+        for key in words:
+            for variant in get_deletes(key, self.max_distance):
+                deletes.setdefault(variant, []).append(key)
+
+        self._words = words
+        self._deletes = deletes
+        self._generations = generations
+
+    def actualize(self):
+        """Строит словарь, если он ещё не построен, либо запускает
+        его перестроение в фоне, если он устарел.
+
+        """
+        if self._generations == self.get_generations():
+            return
+
+        with self._lock:
+
+            if self._generations is None:
+                # Прежнего словаря нет, отвечать не по чему.
+                self.build()
+                return
+
+            if self._building:
+                return
+
+            self._building = True
+
+        self.schedule_build()
+
+    def schedule_build(self):
+        """Запускает перестроение словаря в фоновом потоке."""
+        Thread(target=self._build_background, daemon=True).start()
+
+    def _build_background(self):
+        try:
+            self.build()
+
+        finally:
+            self._building = False
+            # Соединение с БД открывалось для фонового потока, больше оно не понадобится.
+            connection.close()
+
+    def suggest(self, term: str, *, limit: int = 5) -> list[str]:
+        """Возвращает подсказки для указанного термина, лучшие первыми.
+
+        :param term:
+        :param limit: Максимальное количество подсказок.
+
+        """
+        term = ' '.join(term.split())
+        key = term.casefold()
+
+        if len(key) < self.min_word_len or len(key) > self.max_phrase_len:
+            return []
+
+        self.actualize()
+
+        words = self._words
+        deletes = self._deletes
+
+        # Для коротких терминов допускаем лишь одну ошибку, иначе подсказки случайны.
+        max_distance = 1 if len(key) <= 4 else self.max_distance
+
+        candidates = set()
+
+        for variant in get_deletes(key, max_distance):
+            candidates.update(deletes.get(variant, ()))
+
+        candidates.discard(key)
+
+        scored = []
+
+        for candidate in candidates:
+            distance = get_distance(key, candidate, max_distance)
+
+            if distance <= max_distance:
+                display, frequency = words[candidate]
+                scored.append((distance, -frequency, display))
+
+        scored.sort()
+
+        return [display for _, _, display in scored[:limit]]
+
+
+SUGGESTER = Suggester(sources={
+    'apps.reference': ('title', 'search_terms'),
+    'apps.person': ('name', 'name_en'),
+})
+"""Подсказки по справочнику и персонам."""
@@ -1 +1 @@
-var pythonz={bootstrap:function(){"use strict";$(function(){pythonz.makeGeopatterns(),pythonz.markUser(),pythonz.toggleTags(),sitecats.bootstrap(),sitecats.make_cloud("box-tags"),$(".sticky").sticky({topSpacing:80,zIndex:1}),$(".tooltipped").tooltip()})},toggleTags:function(){"use strict";$.each($(".tags_box"),function(t,e){var n=$(e);0===$(".categories_box",n).length&&n.hide()})},makeGeopatterns:function(){"use strict";$.each($("[data-geopattern]"),function(t,e){var n=$(e);n.css("background-image",GeoPattern.generate(n.data("geopattern")+"a").toDataUrl())})},markUser:function(){"use strict";$(".py_user").each(function(t,e){var n=e.innerHTML.replace(/\[u:(\d+):\s*([^\]]+)\s*\]/g,'<a href="https://pythonz.net/users/$1" title="Профиль на pythonz">$2</a>');$(e).html(n)})},activateCommentsTab:function(t){"use strict";setTimeout(function(){var t=0;$.each(["comments_vk"],function(e,n){var a=parseInt($("#"+n+"_cnt").text());a>t&&($('a[href="#'+n+'"]',"#tabs-comments").tab("show"),t=a)})},t)},initEditor:function(t){"use strict";if(t)return new SimpleMDE({element:t,forceSync:!0,indentWithTabs:!1,spellChecker:!1,toolbar:["bold","italic",e("accent","flag","Акцент"),e("quote","quote-left","Цитата"),e("list_ul","list-ul","Маркированный список"),e("table","table","Таблица"),"|","image","link","|",e("note","flag-o","На заметку"),e("warning","exclamation-triangle","Внимание"),e("code","code","Код"),"|",e("gist","github","Gist"),e("podster","headphones","Подкаст с podster.fm"),"|","fullscreen"],insertTexts:{image:[".. image:: ",""],gist:[".. gist:: ",""],note:[".. note:: ",""],warning:[".. warning:: ",""],podster:[".. podster:: ",""],link:["`","<>`_"],accent:["``","``"],table:["\n.. table::\n ","|\n\n\n"],code:["\n.. code::\n","\n\n\n"],quote:["\n```\n","\n```"],list_ul:["\n* ","\n\n"]}});function e(t,e,n){return{name:t,action:function(e){!function(t,e){!function(t,e,n,a){if(!/editor-preview-active/.test(t.getWrapperElement().lastChild.className)){var s,o=n[0],i=n[1],r=t.getCursor("start"),c=t.getCursor("end");a&&(i=i.replace("#url#",a)),e?(o=(s=t.getLine(r.line)).slice(0,r.ch),i=s.slice(r.ch),t.replaceRange(o+i,{line:r.line,ch:0})):(s=t.getSelection(),t.replaceSelection(o+s+i),r.ch+=o.length,r!==c&&(c.ch+=o.length)),t.setSelection(r,c),t.focus()}}(t.codemirror,t.getState()[e],t.options.insertTexts[e])}(e,t)},className:"fa fa-"+e,title:n}}},Reference:{RULE_PYVERSION_ADDED:[/\+py([\w\.]+)/g,'<small><div class="badge badge-info" title="Актуально с версии"><a href="/versions/named/$1/">$1</a></div></small>'],RULE_PYVERSION_REMOVED:[/-py([\w\.]+)/g,'<small><div class="badge badge-danger" title="Устрело в версии"><a href="/versions/named/$1/">$1</a></div></small>'],RULE_LITERAL:[/'([^']+)'/g,'<strong class="cl__green">$1</strong>'],RULE_UNDERMETHOD:[/(__[^\s]+__)/g,"<i>$1</i>"],RULE_EMDASH:[/\s+-\s+/g," &#8212; "],decorateDescription:function(t){"use strict";this.decorateArea(t,[this.RULE_PYVERSION_REMOVED,this.RULE_PYVERSION_ADDED,this.RULE_EMDASH])},decorateFuncResult:function(t){"use strict";this.decorateArea(t,[this.RULE_PYVERSION_REMOVED,this.RULE_PYVERSION_ADDED,this.RULE_EMDASH])},decorateFuncParams:function(t){"use strict";this.decorateArea(t,[[/([^->]+)(\s--)/g,function(t,e,n){return'<span class="fa fa-certificate text-muted"></span> <b>'+(e=e.replace(/([^\s]+)(\s.+)/g,'$1<span class="text-muted">$2</span>'))+"</b>"+n}],[/--/g,":"],this.RULE_PYVERSION_REMOVED,this.RULE_PYVERSION_ADDED,this.RULE_LITERAL,this.RULE_UNDERMETHOD,this.RULE_EMDASH])},decorateArea:function(t,e){"use strict";var n=$("#"+t),a=n.html();void 0!==a&&$.each(e,function(t,e){a=a.replace(e[0],e[1])}),n.html(a)}},Map:function(t,e){"use strict";var n=this,a=$("#"+t),s=e;this.getBoundsForCoords=function(t){return ymaps.util.bounds.getCenterAndZoom(t,[a.width(),a.height()])},this.getPlacemarksFromMapObjects=function(t){var e=[],n=0;return void 0===t&&(t=s),$.each(t,function(t,a){var s=a.coords,o=a.title,i=a.descr,r=a.link;e[n]=new ymaps.Placemark(s,{balloonContentHeader:o,balloonContentBody:i,balloonContentFooter:r,clusterCaption:o,place_id:t},{hideIconOnBalloonOpen:!1,preset:"islands#darkBlueCircleDotIcon"}),n++}),e},this.getClusterer=function(){var t=n.getPlacemarksFromMapObjects(),e=new ymaps.Clusterer({preset:"islands#darkBlueClusterIcons",clusterDisableClickZoom:!0,clusterBalloonPanelMaxMapArea:0,clusterBalloonContentLayoutWidth:250,clusterBalloonContentLayoutHeight:100,clusterBalloonLeftColumnWidth:100});return e.add(t),e},this.initMap=function(){ymaps.ready(function(){var t=n.getClusterer(),e=n.getBoundsForCoords(t.getBounds());$.extend(e,{controls:["zoomControl"]}),new ymaps.Map(a.attr("id"),e).geoObjects.add(t)})},n.initMap()}};pythonz.bootstrap();
+var pythonz={bootstrap:function(){"use strict";$(function(){pythonz.makeGeopatterns();pythonz.markUser();pythonz.toggleTags();sitecats.bootstrap();sitecats.make_cloud('box-tags');$('.sticky').sticky({topSpacing:80,zIndex:1});$('.tooltipped').tooltip();});},toggleTags:function(){"use strict";$.each($('.tags_box'),function(c,b){var a=$(b);if($('.categories_box',a).length===0){a.hide();}});},makeGeopatterns:function(){"use strict";$.each($('[data-geopattern]'),function(c,b){var a=$(b);a.css('background-image',GeoPattern.generate(a.data('geopattern')+'a').toDataUrl());});},markUser:function(){"use strict";$('.py_user').each(function(c,a){var b=a.innerHTML.replace(/\[u:(\d+):\s*([^\]]+)\s*\]/g,'<a href="https://pythonz.net/users/$1" title="Профиль на pythonz">$2</a>');$(a).html(b);});},activateCommentsTab:function(a){"use strict";setTimeout(function(){var a=0,b=['comments_vk'];$.each(b,function(d,b){var c=parseInt($('#'+b+'_cnt').text());if(c>a){$('a[href="#'+b+'"]','#tabs-comments').tab('show');a=c;}});},a);},initPreview:function(c){"use strict";var b={};function a(b){return b.detail.elt.id==='preview-rst';}document.body.addEventListener('htmx:configRequest',function(c){if(!a(c)){return;}c.detail.parameters.preview_blocks=Object.keys(b).join(',');});document.body.addEventListener('htmx:beforeSwap',function(d){if(!a(d)){return;}var f=JSON.parse(d.detail.xhr.responseText),e={};var g=$.map(f.blocks,function(c){var a=f.html[c];if(a===undefined){a=b[c];}e[c]=a;return a;}).join('');b=e;$(c).html(g);d.detail.shouldSwap=false;});},initEditor:function(b){"use strict";if(!b){return;}function d(a,j,i,h){if(/editor-preview-active/.test(a.getWrapperElement().lastChild.className)){return;}var c;var e=i[0];var f=i[1];var b=a.getCursor("start");var g=a.getCursor("end");if(h){f=f.replace("#url#",h);}if(j){c=a.getLine(b.line);e=c.slice(0,b.ch);f=c.slice(b.ch);a.replaceRange(e+f,{line:b.line,ch:0});}else{c=a.getSelection();a.replaceSelection(e+c+f);b.ch+=e.length;if(b!==g){g.ch+=e.length;}}a.setSelection(b,g);a.focus();}function c(a,b){d(a.codemirror,a.getState()[b],a.options.insertTexts[b]);}function a(b,e,d){return{name:b,action:function(a){c(a,b);},className:'fa fa-'+e,title:d};}return new SimpleMDE({element:b,forceSync:true,indentWithTabs:false,spellChecker:false,toolbar:['bold','italic',a('accent','flag','Акцент'),a('quote','quote-left','Цитата'),a('list_ul','list-ul','Маркированный список'),a('table','table','Таблица'),'|','image','link','|',a('note','flag-o','На заметку'),a('warning','exclamation-triangle','Внимание'),a('code','code','Код'),'|',a('gist','github','Gist'),a('podster','headphones','Подкаст с podster.fm'),'|','fullscreen'],insertTexts:{image:['.. image:: ',''],gist:['.. gist:: ',''],note:['.. note:: ',''],warning:['.. warning:: ',''],podster:['.. podster:: ',''],link:['`','<>`_'],accent:['``','``'],table:['\n.. table::\n ','|\n\n\n'],code:['\n.. code::\n','\n\n\n'],quote:['\n```\n','\n```'],list_ul:['\n* ','\n\n']}});},Reference:{RULE_PYVERSION_ADDED:[/\+py([\w\.]+)/g,'<small><div class="badge badge-info" title="Актуально с версии"><a href="/versions/named/$1/">$1</a></div></small>'],RULE_PYVERSION_REMOVED:[/-py([\w\.]+)/g,'<small><div class="badge badge-danger" title="Устрело в версии"><a href="/versions/named/$1/">$1</a></div></small>'],RULE_LITERAL:[/'([^']+)'/g,'<strong class="cl__green">$1</strong>'],RULE_UNDERMETHOD:[/(__[^\s]+__)/g,'<i>$1</i>'],RULE_EMDASH:[/\s+-\s+/g,' &#8212; '],decorateDescription:function(a){"use strict";this.decorateArea(a,[this.RULE_PYVERSION_REMOVED,this.RULE_PYVERSION_ADDED,this.RULE_EMDASH]);},decorateFuncResult:function(a){"use strict";this.decorateArea(a,[this.RULE_PYVERSION_REMOVED,this.RULE_PYVERSION_ADDED,this.RULE_EMDASH]);},decorateFuncParams:function(b){"use strict";var a=function(c,a,b){a=a.replace(/([^\s]+)(\s.+)/g,'$1<span class="text-muted">$2</span>');return'<span class="fa fa-certificate text-muted"></span> <b>'+a+'</b>'+b;};this.decorateArea(b,[[/([^->]+)(\s--)/g,a],[/--/g,':'],this.RULE_PYVERSION_REMOVED,this.RULE_PYVERSION_ADDED,this.RULE_LITERAL,this.RULE_UNDERMETHOD,this.RULE_EMDASH]);},decorateArea:function(d,c){"use strict";var b=$('#'+d),a=b.html();if(a!==undefined){$.each(c,function(c,b){a=a.replace(b[0],b[1]);});}b.html(a);}},Map:function(d,c){"use strict";var a=this,b=$('#'+d),e=c;this.getBoundsForCoords=function(a){return ymaps.util.bounds.getCenterAndZoom(a,[b.width(),b.height()]);};this.getPlacemarksFromMapObjects=function(a){var c=[],b=0;if(a===undefined){a=e;}$.each(a,function(f,a){var h=a.coords,d=a.title,g=a.descr,e=a.link;c[b]=new ymaps.Placemark(h,{balloonContentHeader:d,balloonContentBody:g,balloonContentFooter:e,clusterCaption:d,place_id:f},{hideIconOnBalloonOpen:false,preset:'islands#darkBlueCircleDotIcon'});b++;});return c;};this.getClusterer=function(){var c=a.getPlacemarksFromMapObjects(),b=new ymaps.Clusterer({preset:'islands#darkBlueClusterIcons',clusterDisableClickZoom:true,clusterBalloonPanelMaxMapArea:0,clusterBalloonContentLayoutWidth:250,clusterBalloonContentLayoutHeight:100,clusterBalloonLeftColumnWidth:100});b.add(c);return b;};this.initMap=function(){ymaps.ready(function(){var d=a.getClusterer(),c=a.getBoundsForCoords(d.getBounds());$.extend(c,{controls:['zoomControl']});var e=new ymaps.Map(b.attr('id'),c);e.geoObjects.add(d);});};a.initMap();}};pythonz.bootstrap();
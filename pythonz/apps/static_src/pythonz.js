@@ -66,6 +66,51 @@ var pythonz = {
         }, timeout);
     },
 
+    initPreview: function(previewSel) {
+        "use strict";
+
+        // Предпросмотр обновляется поблочно: сервер присылает разметку
+        // лишь тех блоков текста, которых ещё нет на странице.
+        // Разметка блоков склеивается и выводится целиком, без обёрток,
+        // поэтому совпадает с разметкой всего текста.
+
+        var blocksHtml = {};
+
+        function isPreview(evt) {
+            return evt.detail.elt.id === 'preview-rst';
+        }
+
+        document.body.addEventListener('htmx:configRequest', function(evt) {
+            if (!isPreview(evt)) {return;}
+
+            evt.detail.parameters.preview_blocks = Object.keys(blocksHtml).join(',');
+        });
+
+        document.body.addEventListener('htmx:beforeSwap', function(evt) {
+            if (!isPreview(evt)) {return;}
+
+            var diff = JSON.parse(evt.detail.xhr.responseText),
+                known = {};
+
+            var html = $.map(diff.blocks, function(blockId) {
+                var blockHtml = diff.html[blockId];
+
+                if (blockHtml === undefined) {
+                    blockHtml = blocksHtml[blockId];
+                }
+
+                known[blockId] = blockHtml;
+
+                return blockHtml;
+            }).join('');
+
+            blocksHtml = known;
+
+            $(previewSel).html(html);
+            evt.detail.shouldSwap = false;
+        });
+    },
+
     initEditor: function(textareaEl) {
         "use strict";
 
@@ -1,21 +1,29 @@
 import logging
 import re
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
+from functools import partial, wraps
+from hashlib import md5
 from textwrap import wrap
+from time import perf_counter
 from typing import Any
 from urllib.parse import parse_qs, urlencode, urlparse, urlsplit, urlunparse, urlunsplit
 
 from bleach import clean
 from django.contrib import messages
+from django.core.cache import cache
 from django.db import models
 from django.db.models import Model
 from django.http import HttpRequest
 from django.utils import timezone
 from django.utils.text import Truncator
 
+from .caching import cache_get_generations, get_search_generation_name
 from .exceptions import RemoteSourceError
 from .integration.videos import VideoBroker
+from .search.engine import SEARCH_LIMIT, SearchEngine, SearchResults
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -280,6 +288,105 @@ class UTM:
         return cls.add_to_url(url, source, 'link', 'promo')
 
 
+class TextProfiler:
+    """Замеры времени и размеров входа и выхода по правилам
+    компиляции текстов (TextCompiler) и типографики (BasicTypograph).
+
+    Замеры ведутся лишь внутри блока with TextProfiler.enable() as profiler,
+    в остальное время инструментированный код только проверяет переменную контекста.
+    Профилировщик виден лишь в потоке (контексте), где он включён, так что
+    компиляция текстов в соседних потоках в замеры не попадает.
+    Время вложенных правил (например, bleach внутри prepare) входит и во время объемлющих.
+
+    """
+    current: ContextVar['TextProfiler | None'] = ContextVar('text_profiler', default=None)
+    """Включённый в текущем контексте профилировщик."""
+
+    def __init__(self):
+        self.rules: dict[str, list] = {}
+        """Замеры, индексированные именами правил: [вызовы, секунды, размер входа, размер выхода]."""
+
+    @classmethod
+    @contextmanager
+    def enable(cls):
+        """Включает профилировщик на время блока with."""
+
+        profiler = cls()
+        token = cls.current.set(profiler)
+
+        try:
+            yield profiler
+
+        finally:
+            cls.current.reset(token)
+
+    def record(self, name: str, seconds: float, size_in: int, size_out: int):
+        """Учитывает вызов правила.
+
+        :param name: Имя правила.
+        :param seconds: Время выполнения.
+        :param size_in: Размер входных данных (символов).
+        :param size_out: Размер результата (символов).
+
+        """
+        stats = self.rules.setdefault(name, [0, 0.0, 0, 0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] += size_in
+        stats[3] += size_out
+
+    def get_worst(self, limit: int) -> list[tuple[str, list]]:
+        """Возвращает правила с наибольшим суммарным временем выполнения.
+
+        :param limit:
+
+        """
+        return sorted(self.rules.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+
+
+def profiled(name: str, func: Callable[[str], str], text: str) -> str:
+    """Применяет функцию к тексту. Если включён профилировщик, учитывает вызов в нём.
+
+    :param name: Имя правила.
+    :param func:
+    :param text:
+
+    """
+    if (profiler := TextProfiler.current.get()) is None:
+        return func(text)
+
+    started = perf_counter()
+    result = func(text)
+    profiler.record(name, perf_counter() - started, len(text), len(result))
+
+    return result
+
+
+def profiled_rule(func: Callable) -> Callable:
+    """Декоратор, учитывающий вызовы функции в профилировщике (если он включён).
+    Размером входа считается суммарная длина строковых аргументов.
+
+    :param func:
+
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args):
+
+        if (profiler := TextProfiler.current.get()) is None:
+            return func(*args)
+
+        started = perf_counter()
+        result = func(*args)
+        size_in = sum(len(arg) for arg in args if isinstance(arg, str))
+        profiler.record(name, perf_counter() - started, size_in, len(result))
+
+        return result
+
+    return wrapper
+
+
 class BasicTypograph:
     """Содержит базовые правила типографики.
     Позволяет применить эти правила к строке.
@@ -302,10 +409,41 @@ class BasicTypograph:
         'QUOTES_CYR_CLOSE': (re.compile(r'(\S+)"', re.UNICODE), '\\g<1>»'),
         'QUOTES_CYR_OPEN': (re.compile(r'"(\S+)', re.UNICODE), '«\\g<1>'),
     }
+    """Правила в порядке применения. Используются эталонной реализацией (см. .apply_to_reference())."""
+
+    RE_NORMALIZE = re.compile(r"[„“”]|''|[\xad–—―−]|[ \t]{2,}|\t")
+    """Объединение правил QUOTES_REPLACE, DASH_REPLACE и SEQUENTIAL_SPACES."""
+
+    RE_REPLACE = re.compile(
+        r'(?P<em>[ ,]-[ ])'
+        r'|(?P<en>\d+)(?:-[ ]*|[ ]+-(?=\d))(?P<en_tail>\d+)'
+        r'|\.{2,3}|\([cс]\)|\(tm\)|\(r\)'
+    )
+    """Объединение правил DASH_EM, DASH_EN, HELLIP, COPYRIGHT, TRADEMARK и TRADEMARK_R.
+    Тире, окружённое пробелами, относится к DASH_EM, так как оно применяется раньше DASH_EN."""
+
+    RE_QUOTED = re.compile(r'\S*"\S*')
+    """Слово (последовательность непробельных символов) с кавычками. См. QUOTES_CYR_*."""
+
+    SUBSTITUTES = {
+        '„': '"', '“': '"', '”': '"', "''": '"',
+        '\xad': '-', '–': '-', '—': '-', '―': '-', '−': '-',
+        '\t': ' ',
+        '..': '…', '...': '…',
+        '(c)': '©', '(с)': '©', '(tm)': '™', '(r)': '®',
+    }
+    """Таблица замен для совпадений объединённых правил."""
+
+    BATCH_SEPARATOR = ' \x00 '
+    """Разделитель строк при пакетной обработке (см. .apply_many())."""
 
     @classmethod
-    def apply_to(cls, input_str: str) -> str:
+    def apply_to_reference(cls, input_str: str) -> str:
+        """Эталонная реализация .apply_to(): правила последовательно применяются к строке.
+
+        :param input_str:
 
+        """
         input_str = f' {input_str.strip()} '
 
         for regexp, replacement in cls.rules.values():
@@ -313,6 +451,80 @@ class BasicTypograph:
 
         return input_str.strip()
 
+    @classmethod
+    def apply_raw(cls, input_str: str) -> str:
+        """Применяет правила к подготовленной (обрамлённой пробелами) строке.
+
+        Вместо одиннадцати последовательных замен выполняется три прохода:
+        нормализация символов, замены по объединённым правилам и расстановка кавычек.
+        Результат совпадает с результатом последовательного применения правил.
+
+        :param input_str:
+
+        """
+        substitutes = cls.SUBSTITUTES
+
+        def normalize(match: re.Match) -> str:
+            matched = match.group(0)
+            return substitutes.get(matched, ' ')
+
+        def replace(match: re.Match) -> str:
+            if match.group('em'):
+                return f'{match.group(0)[0]}— '
+
+            if en := match.group('en'):
+                return f"{en}–{match.group('en_tail')}"
+
+            return substitutes[match.group(0)]
+
+        def quote(match: re.Match) -> str:
+            word = match.group(0)
+
+            # QUOTES_CYR_CLOSE: последняя кавычка слова, если она не первый его символ.
+            if (idx := word.rfind('"')) > 0:
+                word = f'{word[:idx]}»{word[idx + 1:]}'
+
+            # QUOTES_CYR_OPEN: первая кавычка слова, если она не последний его символ.
+            if -1 < (idx := word.find('"')) < len(word) - 1:
+                word = f'{word[:idx]}«{word[idx + 1:]}'
+
+            return word
+
+        input_str = profiled('typograph_normalize', partial(cls.RE_NORMALIZE.sub, normalize), input_str)
+        input_str = profiled('typograph_replace', partial(cls.RE_REPLACE.sub, replace), input_str)
+
+        if '"' in input_str:
+            input_str = profiled('typograph_quotes', partial(cls.RE_QUOTED.sub, quote), input_str)
+
+        return input_str
+
+    @classmethod
+    def apply_to(cls, input_str: str) -> str:
+        """Применяет правила типографики к строке.
+
+        :param input_str:
+
+        """
+        return cls.apply_raw(f' {input_str.strip()} ').strip()
+
+    @classmethod
+    def apply_many(cls, input_strs: list[str]) -> list[str]:
+        """Применяет правила типографики к нескольким строкам разом
+        (например, при массовом добавлении объектов): строки склеиваются
+        через разделитель и обрабатываются за одни и те же три прохода.
+
+        :param input_strs:
+
+        """
+        separator = cls.BATCH_SEPARATOR
+
+        if not input_strs or any('\x00' in input_str for input_str in input_strs):
+            return [cls.apply_to(input_str) for input_str in input_strs]
+
+        joined = separator.join(input_str.strip() for input_str in input_strs)
+
+        return [chunk.strip() for chunk in cls.apply_raw(f' {joined} ').split('\x00')]
+
 
 def get_simple_directive(name: str) -> str:
     """Возвращает регулярку простой однострочной директивы для TextCompiler.
@@ -323,8 +535,28 @@ def get_simple_directive(name: str) -> str:
     return fr'\.{{2}}\s*{name}::\s*([^\n]+)[/]*\n'
 
 
+COMPILED_CACHE_TIMEOUT: int = 60 * 60 * 24 * 7
+"""Время жизни закешированных результатов компиляции текстов (в секундах)."""
+
+
+class _ScanFallback(Exception):
+    """Сигнализирует, что документ следует обработать эталонной реализацией TextCompiler."""
+
+
 class TextCompiler:
-    """Предоставляет инструменты для RST-подобного форматирования в HTML."""
+    """Предоставляет инструменты для RST-подобного форматирования в HTML.
+
+    Основная реализация (.compile()) разбирает документ на блоки за один проход
+    и применяет строчные правила лишь к фрагментам, содержащим их маркеры.
+    Эталонная реализация (.compile_reference()) последовательно применяет
+    все правила ко всему документу. Результаты обеих совпадают; документы,
+    в которых правила пересекаются нетривиально (например, директива внутри
+    блока кода), основная реализация передаёт эталонной.
+
+    """
+    VERSION: int = 1
+    """Версия правил форматирования. Входит в ключ кеша результатов (см. .compile_cached()),
+    поэтому должна увеличиваться при любом изменении результатов компиляции."""
 
     RE_CODE = re.compile(r'\.{2}\s*code::([^\n]+)?\n{1,2}(.+?)\n{3}((?=\S)|$)', re.DOTALL)
 
@@ -360,79 +592,373 @@ class TextCompiler:
 
     RE_UL = re.compile(r'^\*\s+([^\n]+)\n', re.MULTILINE)
 
+    RE_BLOCK = re.compile(
+        r'(?P<li>(?<![^\n])\*\s+(?P<li_text>[^\n]+)\n)'
+        r'|(?P<quote>```\n+(?P<quote_text>[^`]+)\n+```)'
+        r'|(?P<fenced>\.{2}\s*(?P<fenced_name>code|table)::(?P<fenced_arg>[^\n]+)?\n{1,2}'
+        r'(?P<fenced_text>(?s:.+?))\n{3}(?:(?=\S)|(?=\n?\Z)))'
+        r'|(?P<directive>\.{2}\s*(?P<directive_name>gist|poll|video|title|note|warning|podster|image)::\s*'
+        r'(?P<directive_arg>[^\n]+)[/]*\n)'
+    )
+    """Блоки, выделяемые при однопроходном разборе: элемент списка, цитата,
+    код или таблица, однострочная директива."""
+
+    RE_BLOCK_INNER = re.compile(
+        r'^\*(?:\s|$)|```|\.{2}\s*(?:code|table|gist|poll|video|title|note|warning|podster|image)::', re.MULTILINE)
+    """Признаки блоков внутри других блоков. Такие документы обрабатываются эталонной реализацией."""
+
+    RE_FENCED_START = re.compile(r'\.{2}\s*(?:code|table)::')
+    """Начало блока кода или таблицы, который может содержать пустые строки."""
+
+    RE_FENCED = re.compile(r'\.{2}\s*(?:code|table)::[^\n]*\n{1,2}(?P<text>(?s:.+?))\n{3}(?:(?=\S)|(?=\n?\Z))')
+    """Блок кода или таблицы (см. RE_BLOCK)."""
+
+    RE_OPEN_TAIL = re.compile(
+        r'(?:(?<![^\n])\*|\.{2}(?:\s*(?:code|table|gist|poll|video|title|note|warning|podster|image)::)?)\s*\Z')
+    """Незавершённое начало элемента списка или директивы в конце блока.
+    Пробельные символы после него (в том числе пустые строки) разбором поглощаются,
+    и элемент продолжается в следующем блоке."""
+
+    RE_ESCAPE = re.compile(r'<ht|</|>`|[<>]')
+
+    RE_CLEAN_REQUIRED = re.compile(r'[&\x00-\x08\x0b-\x1f]')
+    """Символы исходного текста, которые может заменить bleach.
+    Если их нет, очистка экранированного текста ничего не изменит."""
+
+    ESCAPE_MAP = {
+        # Некоторые символы заменяем для правила RE_URL_WITH_TITLE, чтобы их не устранил bleach.
+        '<ht': '◀ht',
+        '</': '◀/',
+        '>`': '▶`',
+        '<': '&lt;',
+        '>': '&gt;',
+    }
+
+    DIRECTIVES = {
+        'gist': '<script src="https://gist.github.com/{0}.js"></script>',
+        'poll': (
+            '<div class="card bg-light p-2 m-2"><div class="card-body">'
+            '<script src="https://yastatic.net/q/forms-frontend-ext/_/embed.js"></script>'
+            '<iframe src="https://forms.yandex.ru/u/{0}/?iframe=1" '
+            'frameborder="0" width="100%" name="ya-form-{0}">'
+            '</iframe></div></div>'
+        ),
+        'title': '<h4 data-geopattern="{0}" class="subtitle">{0}</h4>',
+        'note': (
+            '<div class="card mb-3"><div class="card-header text-white bg-success">На заметку</div>'
+            '<div class="card-body">{0}</div></div>'
+        ),
+        'warning': (
+            '<div class="card mb-3"><div class="card-header text-white bg-danger">Внимание</div>'
+            '<div class="card-body">{0}</div></div>'
+        ),
+        'podster': (
+            '<iframe width="100%" height="85" src="{0}/embed/13?link=1" frameborder="0" allowtransparency="true">'
+            '</iframe>'
+        ),
+        'image': '<img alt="{0}" src="{0}" data-canonical-src="{0}" style="max-width:100%;">',
+    }
+    """Шаблоны однострочных директив (кроме видео)."""
+
+    TABLE_BG_MAP = {
+        'i': 'info',
+        's': 'success',
+        'w': 'warning',
+        'd': 'danger',
+    }
+
+    @classmethod
+    @profiled_rule
+    def render_href(cls, url: str) -> str:
+        """Возвращает ссылку для адреса, встреченного в тексте.
+
+        :param url:
+
+        """
+        return f'<a href="{url}">{url_mangle(url)}</a>'
+
+    @classmethod
+    @profiled_rule
+    def render_code(cls, lang: str | None, code: str) -> str:
+        """Возвращает разметку блока кода.
+
+        :param lang: Язык. Если не указан, то python.
+        :param code:
+
+        """
+        lang = (lang or 'python').strip()
+        return f'<pre><code class="{lang}">{code}</code></pre>\n'
+
+    @classmethod
+    @profiled_rule
+    def render_video(cls, url: str) -> str:
+        """Возвращает код для встраивания видео.
+        Код строится по адресу видео, без обращения к сети.
+
+        :param url:
+
+        """
+        try:
+            code = VideoBroker.get_code(url, wrap_responsive=True)
+
+        except RemoteSourceError:
+            code = '<b>Ошибка встраивания видео: неподдерживаемый сервис.</b>'
+
+        return code
+
+    @classmethod
+    @profiled_rule
+    def render_directive(cls, name: str, arg: str) -> str:
+        """Возвращает разметку однострочной директивы.
+
+        :param name: Имя директивы.
+        :param arg: Аргумент директивы.
+
+        """
+        if name == 'video':
+            return cls.render_video(arg)
+
+        return cls.DIRECTIVES[name].format(arg)
+
+    @classmethod
+    @profiled_rule
+    def render_table(cls, body: str) -> str:
+        """Возвращает разметку таблицы.
+
+        :param body: Строки таблицы.
+
+        """
+        rows = []
+        bg_map = cls.TABLE_BG_MAP
+
+        for line in body.splitlines():
+
+            if line.startswith('! '):
+                # Заголовок таблицы.
+                rows.append(
+                    f"<thead><tr><th>{'</th><th>'.join(line.lstrip(' !').split(' | '))}</th></tr></thead>")
+            else:
+                attrs_row = ''
+                cells = []
+
+                for value in map(str.strip, line.split(' | ')):
+
+                    attrs_cell = ''
+
+                    # Подсветка. Например, !b:d+ для всего ряда или !b:d ячейки.
+                    if value.startswith('!b:'):
+                        bg_letter, row_sign = value[3:5]
+                        value = value[5:].strip()
+
+                        if bg_class := bg_map.get(bg_letter, ''):
+                            attr = f' class="{bg_class}"'
+
+                            if row_sign == '+':
+                                attrs_row = attr
+                            else:
+                                attrs_cell = attr
+
+                    cells.append(f'<td{attrs_cell}>{value}</td>')
+
+                rows.append(f"<tr{attrs_row}>{''.join(cells)}</tr>")
+
+        rows = ''.join(rows)
+
+        return (
+            '<div class="table-responsive"><table class="table table-striped table-bordered table-hover">'
+            f'{rows}</table></div>\n')
+
     @classmethod
     def compile(cls, text: str) -> str:
-        """Преобразует rst-подобное форматичрование в html.
+        """Преобразует rst-подобное форматирование в html.
 
         :param text:
 
         """
-        def replace_href(match):
-            return f'<a href="{match.group(1)}">{url_mangle(match.group(1))}</a>'
+        text = profiled('prepare', cls.prepare, text)
 
-        def replace_code(match):
-            lang = (match.group(1) or 'python').strip()
-            code = match.group(2)
-            return f'<pre><code class="{lang}">{code}</code></pre>\n'
+        try:
+            return profiled('compile_blocks', cls.compile_blocks, text)
 
-        def replace_video(match):
+        except _ScanFallback:
+            return profiled('apply_rules', cls.apply_rules, text)
 
-            try:
-                code, _ = VideoBroker.get_code_and_cover(match.group(1), wrap_responsive=True)
+    @classmethod
+    def get_cache_key(cls, text: str) -> str:
+        """Возвращает ключ кеша для результата компиляции указанного текста.
 
-            except RemoteSourceError:
-                code = '<b>Ошибка встраивания видео: неподдерживаемый сервис.</b>'
+        :param text:
 
-            return code
+        """
+        return f'compiled|{cls.VERSION}|{md5(text.encode()).hexdigest()}'
 
-        def replace_table(match):
-            body = match.group(2)
-            rows = []
+    @classmethod
+    def compile_cached(cls, text: str) -> str:
+        """То же, что и .compile(), но результат для уже встречавшегося текста берётся из кеша.
 
-            bg_map = {
-                'i': 'info',
-                's': 'success',
-                'w': 'warning',
-                'd': 'danger',
-            }
+        :param text:
 
-            for line in body.splitlines():
+        """
+        if not text:
+            return ''
 
-                if line.startswith('! '):
-                    # Заголовок таблицы.
-                    rows.append(
-                        f"<thead><tr><th>{'</th><th>'.join(line.lstrip(' !').split(' | '))}</th></tr></thead>")
-                else:
-                    attrs_row = ''
-                    cells = []
+        cache_key = cls.get_cache_key(text)
+        compiled = cache.get(cache_key)
+
+        if compiled is None:
+            compiled = cls.compile(text)
+            cache.set(cache_key, compiled, COMPILED_CACHE_TIMEOUT)
+
+        return compiled
+
+    @classmethod
+    def split_blocks(cls, text: str) -> list[str]:
+        """Разбивает исходный текст на блоки верхнего уровня, разделённые пустыми строками.
+        Цитаты, блоки кода и таблиц (в том числе начинающиеся посреди абзаца)
+        могут содержать пустые строки, поэтому не разрываются. Не разрываются
+        и блоки, цитата, ссылка, элемент списка или директива в которых
+        может продолжиться в следующем блоке.
+        Следующие за блоком переводы строк относятся к нему, так что склейка блоков
+        даёт исходный текст (с переводами строк, приведёнными к \\n).
+
+        :param text:
+
+        """
+        text = text.replace('\r\n', '\n')
+        length = len(text)
+        blocks = []
+        pos = 0
+
+        while pos < length:
+            cursor = pos
+
+            while True:
+                end = text.find('\n\n', cursor)
+                end = length if end == -1 else end
+                fenced_end = None
+
+                for start in cls.RE_FENCED_START.finditer(text, cursor, end):
+                    fenced = cls.RE_FENCED.match(text, start.start())
+
+                    if (
+                        fenced
+                        and not cls.RE_BLOCK_INNER.search(fenced.group('text'))
+                        and not cls.is_tick_pending(text[pos:start.start()])
+                    ):
+                        fenced_end = fenced.end()
+
+                    else:
+                        # Незавершённый блок кода или таблицы не должен завершиться в конце
+                        # блока предпросмотра, а блок с другими блоками внутри или внутри
+                        # незакрытой цитаты может обрабатываться иначе,
+                        # поэтому текст далее не разбивается.
+                        fenced_end = length
+
+                    break
+
+                if fenced_end is not None:
+                    # Пустые строки внутри блока кода не завершают блок.
+                    cursor = fenced_end
+                    continue
+
+                if end < length and cls.RE_OPEN_TAIL.search(text, pos, end):
+                    # Элемент списка или директива продолжаются в следующем блоке.
+                    cursor = end + 1
+                    continue
+
+                if end < length and cls.is_tick_pending(text[pos:end]):
+                    # Незакрытая цитата или обратный апостроф, с которого
+                    # может начаться ссылка, продолжаются в следующем блоке.
+                    cursor = end + 1
+                    continue
+
+                break
+
+            while end < length and text[end] == '\n':
+                end += 1
+
+            blocks.append(text[pos:end])
+            pos = end
+
+        return blocks
+
+    @classmethod
+    def is_tick_pending(cls, text: str) -> bool:
+        """Проверяет, может ли цитата либо ссылка, начавшаяся в тексте,
+        продолжиться за его пределами: остаётся ли в тексте после применения
+        правил для цитат, акцентов и ссылок обратный апостроф.
+
+        :param text:
+
+        """
+        if '`' not in text:
+            return False
 
-                    for value in map(str.strip, line.split(' | ')):
+        if text.count('```') % 2:
+            return True
 
-                        attrs_cell = ''
+        # Элемент списка поглощает перевод строки, без которого цитата не распознаётся.
+        text = cls.RE_UL.sub('<li>\\g<1></li>', text)
+        text = cls.RE_QUOTE.sub('', text)
 
-                        # Подсветка. Например, !b:d+ для всего ряда или !b:d ячейки.
-                        if value.startswith('!b:'):
-                            bg_letter, row_sign = value[3:5]
-                            value = value[5:].strip()
+        if '<' in text or '>' in text:
+            escape_map = cls.ESCAPE_MAP
+            text = cls.RE_ESCAPE.sub(lambda match: escape_map[match.group(0)], text)
 
-                            if bg_class := bg_map.get(bg_letter, ''):
-                                attr = f' class="{bg_class}"'
+        text = cls.RE_ACCENT.sub('', text)
+        text = cls.RE_URL_WITH_TITLE.sub('', text)
 
-                                if row_sign == '+':
-                                    attrs_row = attr
-                                else:
-                                    attrs_cell = attr
+        return '`' in text
 
-                        cells.append(f'<td{attrs_cell}>{value}</td>')
+    @classmethod
+    def compile_preview(cls, text: str, *, known: Iterable[str] = ()) -> dict:
+        """Компилирует текст для предпросмотра поблочно.
+
+        Разметка каждого из блоков кешируется (см. .compile_cached()),
+        поэтому при очередном предпросмотре компилируются лишь изменившиеся блоки.
+
+        Блок, следующий за другими, компилируется с предваряющим его переводом строки
+        (как в тексте целиком: от этого зависит, например, открытие списка),
+        а соответствующий переводу строки <br> из разметки удаляется. Так склейка
+        разметки блоков совпадает с результатом компиляции всего текста.
+
+        Возвращает словарь с ключами:
+            * blocks — идентификаторы блоков по порядку;
+            * html — разметка блоков, индексированная идентификаторами
+                (кроме блоков, уже известных клиенту).
+
+        :param text:
+        :param known: Идентификаторы блоков, разметка которых уже есть у клиента.
+
+        """
+        known = set(known)
+        blocks = []
+        html = {}
 
-                    rows.append(f"<tr{attrs_row}>{''.join(cells)}</tr>")
+        for idx, block in enumerate(cls.split_blocks(text)):
+            # Разметка первого блока может отличаться от разметки такого же блока
+            # в другом месте текста, поэтому идентификаторы у них разные.
+            following = int(idx > 0)
+            block_id = md5(f'{following}|{block}'.encode()).hexdigest()[:16]
+            blocks.append(block_id)
 
-            rows = ''.join(rows)
+            if block_id not in known and block_id not in html:
 
-            return (
-                '<div class="table-responsive"><table class="table table-striped table-bordered table-hover">'
-                f'{rows}</table></div>\n')
+                if following:
+                    html[block_id] = cls.compile_cached(f'\n{block}').removeprefix('<br>')
 
+                else:
+                    html[block_id] = cls.compile_cached(block)
+
+        return {'blocks': blocks, 'html': html}
+
+    @classmethod
+    def compile_reference(cls, text: str) -> str:
+        """Эталонная реализация .compile(): все правила последовательно применяются ко всему тексту.
+
+        :param text:
+
+        """
         # Заменяем некоторые символы для правила RE_URL_WITH_TITLE, чтобы их не устранил bleach.
         text = text.replace('<ht', '◀ht')
         text = text.replace('</', '◀/')
@@ -445,53 +971,225 @@ class TextCompiler:
 
         text = text.replace('\r\n', '\n')
 
-        text = re.sub(cls.RE_UL, '<li>\\g<1></li>', text)
-        text = text.replace('\n<li>', '\n<ul><li>').replace('</li>\n', '</li></ul>\n')
+        return cls.apply_rules(text)
 
-        text = re.sub(cls.RE_BOLD, '<b>\\g<1></b>', text)
-        text = re.sub(cls.RE_ITALIC, '<i>\\g<1></i>', text)
-        text = re.sub(cls.RE_QUOTE, '<blockquote>\\g<1></blockquote>', text)
-        text = re.sub(cls.RE_ACCENT, '<code>\\g<1></code>', text)
-        text = re.sub(cls.RE_CODE, replace_code, text)
-        text = re.sub(cls.RE_URL_WITH_TITLE, '<a href="\\g<2>">\\g<1></a>', text)
-        text = re.sub(cls.RE_GIST, '<script src="https://gist.github.com/\\g<1>.js"></script>', text)
+    @classmethod
+    def prepare(cls, text: str) -> str:
+        """Экранирует разметку и очищает текст перед применением правил.
 
-        text = re.sub(
-            cls.RE_POLL,
-            '<div class="card bg-light p-2 m-2"><div class="card-body">'
-            '<script src="https://yastatic.net/q/forms-frontend-ext/_/embed.js"></script>'
-            '<iframe src="https://forms.yandex.ru/u/\\g<1>/?iframe=1" '
-            'frameborder="0" width="100%" name="ya-form-\\g<1>">'
-            '</iframe></div></div>',
-            text)
+        :param text:
 
-        text = re.sub(cls.RE_VIDEO, replace_video, text)
+        """
+        clean_required = cls.RE_CLEAN_REQUIRED.search(text)
 
-        text = re.sub(cls.RE_TABLE, replace_table, text)
+        if '<' in text or '>' in text:
+            escape_map = cls.ESCAPE_MAP
+            text = cls.RE_ESCAPE.sub(lambda match: escape_map[match.group(0)], text)
 
-        text = re.sub(cls.RE_TITLE, '<h4 data-geopattern="\\g<1>" class="subtitle">\\g<1></h4>', text)
+        if clean_required:
+            text = profiled('bleach', clean, text)
 
-        text = re.sub(
-            cls.RE_NOTE, '<div class="card mb-3"><div class="card-header text-white bg-success">На заметку</div>'
-                         '<div class="card-body">\\g<1></div></div>', text)
-        text = re.sub(
-            cls.RE_WARNING, '<div class="card mb-3"><div class="card-header text-white bg-danger">Внимание</div>'
-                            '<div class="card-body">\\g<1></div></div>', text)
+        return text.replace('\r\n', '\n')
 
-        text = re.sub(
-            cls.RE_PODSTER,
-            '<iframe width="100%" height="85" src="\\g<1>/embed/13?link=1" frameborder="0" allowtransparency="true">'
-            '</iframe>',
-            text
-        )
-        text = re.sub(
-            cls.RE_IMAGE, '<img alt="\\g<1>" src="\\g<1>" data-canonical-src="\\g<1>" style="max-width:100%;">', text)
-        text = re.sub(cls.RE_URL, replace_href, text)
+    @classmethod
+    def apply_rules(cls, text: str) -> str:
+        """Последовательно применяет правила форматирования ко всему подготовленному тексту.
+
+        :param text:
+
+        """
+        def replace_directive(name: str) -> Callable:
+            return lambda match: cls.render_directive(name, match.group(1))
+
+        def sub(name: str, replacement: str | Callable, text: str) -> str:
+            return profiled(name, partial(getattr(cls, name).sub, replacement), text)
+
+        text = sub('RE_UL', '<li>\\g<1></li>', text)
+        text = text.replace('\n<li>', '\n<ul><li>').replace('</li>\n', '</li></ul>\n')
+
+        text = sub('RE_BOLD', '<b>\\g<1></b>', text)
+        text = sub('RE_ITALIC', '<i>\\g<1></i>', text)
+        text = sub('RE_QUOTE', '<blockquote>\\g<1></blockquote>', text)
+        text = sub('RE_ACCENT', '<code>\\g<1></code>', text)
+        text = sub('RE_CODE', lambda match: cls.render_code(match.group(1), match.group(2)), text)
+        text = sub('RE_URL_WITH_TITLE', '<a href="\\g<2>">\\g<1></a>', text)
+        text = sub('RE_GIST', replace_directive('gist'), text)
+        text = sub('RE_POLL', replace_directive('poll'), text)
+        text = sub('RE_VIDEO', replace_directive('video'), text)
+        text = sub('RE_TABLE', lambda match: cls.render_table(match.group(2)), text)
+        text = sub('RE_TITLE', replace_directive('title'), text)
+        text = sub('RE_NOTE', replace_directive('note'), text)
+        text = sub('RE_WARNING', replace_directive('warning'), text)
+        text = sub('RE_PODSTER', replace_directive('podster'), text)
+        text = sub('RE_IMAGE', replace_directive('image'), text)
+        text = sub('RE_URL', lambda match: cls.render_href(match.group(1)), text)
 
         text = text.replace('\n', '<br>')
 
         return text
 
+    @classmethod
+    def compile_blocks(cls, text: str) -> str:
+        """Однопроходная реализация правил форматирования для подготовленного текста.
+
+        Текст разбирается на блоки (см. RE_BLOCK), строчные правила
+        (полужирный, курсив, код, ссылки) применяются к промежуткам между блоками
+        и к содержимому блоков, причём только при наличии в них соответствующих маркеров.
+
+        Если документ не может быть гарантированно обработан так же,
+        как эталонной реализацией, бросает _ScanFallback.
+
+        :param text:
+
+        """
+        # Остался ли в уже обработанной части обратный апостроф, с которого может начаться ссылка.
+        pending_tick = False
+
+        def replace_link(match):
+            if '\n' in match.group(0):
+                # Ссылка захватывает перевод строки, а значит может пересекаться с блоками.
+                raise _ScanFallback
+
+            return f'<a href="{match.group(2)}">{match.group(1)}</a>'
+
+        def apply_head(chunk: str) -> str:
+            # Правила, применяемые эталонной реализацией до блоков кода.
+            if '*' in chunk:
+                chunk = cls.RE_BOLD.sub('<b>\\g<1></b>', chunk)
+                chunk = cls.RE_ITALIC.sub('<i>\\g<1></i>', chunk)
+
+            if '``' in chunk:
+                chunk = cls.RE_ACCENT.sub('<code>\\g<1></code>', chunk)
+
+            return chunk
+
+        def apply_link(chunk: str) -> str:
+            nonlocal pending_tick
+
+            if '◀' in chunk:
+
+                if pending_tick:
+                    raise _ScanFallback
+
+                chunk = cls.RE_URL_WITH_TITLE.sub(replace_link, chunk)
+
+                if '◀' in chunk and '`' in chunk:
+                    raise _ScanFallback
+
+            if not pending_tick:
+                pending_tick = '`' in chunk
+
+            return chunk
+
+        def apply_url(chunk: str) -> str:
+            if 'http' in chunk:
+                chunk = cls.RE_URL.sub(lambda match: cls.render_href(match.group(1)), chunk)
+
+            return chunk
+
+        def apply_inline(chunk: str) -> str:
+            return apply_url(apply_link(apply_head(chunk)))
+
+        def check_inner(*chunks: str | None):
+            for chunk in chunks:
+                if chunk and cls.RE_BLOCK_INNER.search(chunk):
+                    raise _ScanFallback
+
+        out = []
+        pos = 0
+        li_end = -1
+        li_leftover = False
+
+        for match in cls.RE_BLOCK.finditer(text):
+            start, end = match.span()
+
+            if start > pos:
+                out.append(apply_inline(text[pos:start]).replace('\n', '<br>'))
+
+            pos = end
+            kind = match.lastgroup
+
+            if kind == 'li':
+                content = match.group('li_text')
+                check_inner(content)
+
+                opening = '<ul>' if start and start != li_end and text[start - 1] == '\n' else ''
+                closing = '</ul>' if text[end:end + 1] == '\n' else ''
+
+                # Элемент списка поглощает перевод строки, поэтому в эталонной реализации
+                # он сливается в одну строку с последующими. Строчное правило может захватить
+                # соседний элемент, только если в предыдущем остались неиспользованные маркеры.
+                if start != li_end:
+                    li_leftover = False
+
+                if li_leftover and ('*' in content or '`' in content):
+                    raise _ScanFallback
+
+                content = apply_head(content)
+                li_leftover = li_leftover or '*' in content or '`' in content
+
+                if li_leftover and not closing:
+                    following = cls.RE_BLOCK.match(text, end)
+
+                    if not following or following.lastgroup != 'li':
+                        line_end = text.find('\n', end)
+                        rest = text[end:] if line_end == -1 else text[end:line_end]
+
+                        if '*' in rest or '`' in rest:
+                            raise _ScanFallback
+
+                out.append(f'{opening}<li>{apply_url(apply_link(content))}</li>{closing}')
+
+                li_end = end
+                continue
+
+            if start and text[start - 1] != '\n':
+                # Блоки посреди строки могут пересекаться со строчными правилами.
+                raise _ScanFallback
+
+            if kind == 'quote':
+                content = match.group('quote_text')
+                check_inner(content)
+                content = apply_inline(content).replace('\n', '<br>')
+                out.append(f'<blockquote>{content}</blockquote>')
+
+            elif kind == 'fenced':
+                arg = match.group('fenced_arg')
+                content = match.group('fenced_text')
+                check_inner(arg, content)
+
+                if '\n' in text[start:match.start('fenced_name')]:
+                    raise _ScanFallback
+
+                if match.group('fenced_name') == 'code':
+                    html = cls.render_code(apply_head(arg) if arg else arg, apply_head(content))
+                    html = apply_link(html)
+
+                else:
+                    if arg and ('`' in arg or '◀' in arg):
+                        # Аргумент таблицы не выводится, но участвует в поиске ссылок.
+                        raise _ScanFallback
+
+                    html = cls.render_table(apply_link(apply_head(content)))
+
+                out.append(apply_url(html).replace('\n', '<br>'))
+
+            else:
+                arg = match.group('directive_arg')
+                check_inner(arg)
+
+                if '\n' in text[start:match.start('directive_arg')]:
+                    # Директива с переводами строк до аргумента может пересекаться с другими блоками.
+                    raise _ScanFallback
+
+                html = cls.render_directive(match.group('directive_name'), apply_link(apply_head(arg)))
+                out.append(apply_url(html))
+
+        if pos < len(text):
+            out.append(apply_inline(text[pos:]).replace('\n', '<br>'))
+
+        return ''.join(out)
+
 
 def url_mangle(url: str) -> str:
     """Усекает длинные URL практически до неузноваемости, делая нефункциональным, но коротким.
@@ -578,9 +1276,27 @@ def swap_layout(src_text: str) -> str:
     return src_text.translate(TRANSLATION_DICT)
 
 
-def search_models(term: str, *, search_in=list[type[models.Model]]) -> tuple[str, list[models.Model]]:
+SEARCH_CACHE_TIMEOUT: int = 60 * 60 * 24
+"""Время жизни закешированных результатов поиска (в секундах)."""
+
+SEARCH_CANDIDATES_LIMIT: int = 200
+"""Количество строк, отбираемых из БД для последующего ранжирования."""
+
+
+def search_models(term: str, *, search_in=list[type[models.Model]]) -> tuple[str, SearchResults]:
     """Производит поиск указанной строки в указанных областях.
-    Возвращает результаты поиска.
+    Возвращает результаты поиска (количество отброшенных
+    при ранжировании малорелевантных результатов указывается в .dropped).
+
+    Поиск по всем областям производится одним запросом (см. SearchEngine),
+    найденные строки ранжируются по релевантности (см. Ranker),
+    объекты затем получаются пачками только для попавших в выдачу строк.
+    Термины короче трёх символов во всех областях ищутся по началам слов,
+    более длинные — как подстроки.
+
+    Строки результатов кешируются. Ключ кеша
+    включает поколения областей, которые увеличиваются при изменении
+    их объектов (см. search_cache_connect()).
 
     :param term: Строка для посика.
     :param search_in: Области иска.
@@ -589,13 +1305,35 @@ def search_models(term: str, *, search_in=list[type[models.Model]]) -> tuple[str
     search_term = term.strip(' ()')[:200]
 
     if not search_term:
-        return search_term, []
+        return search_term, SearchResults()
+
+    generations = cache_get_generations(*(get_search_generation_name(model_cls) for model_cls in search_in))
+
+    # Термин в ключе не нормализуется: сравнение без учёта регистра в БД
+    # (например, icontains и iexact в SQLite для кириллицы) может отличаться от casefold().
+    key_source = '|'.join((
+        search_term,
+        *(model_cls._meta.label_lower for model_cls in search_in),
+        *map(str, generations),
+    ))
+    cache_key = f'search|{md5(key_source.encode()).hexdigest()}'
 
-    swapped = swap_layout(search_term)
+    found = cache.get(cache_key)
 
-    results = []
+    if found is None:
+        from .search.ranking import Ranker  # noqa: PLC0415
+
+        search_terms = (search_term, swap_layout(search_term))
+
+        found = Ranker.rank(
+            search_in,
+            SearchEngine.find(search_in, *search_terms, limit=SEARCH_CANDIDATES_LIMIT),
+            *search_terms,
+            limit=SEARCH_LIMIT,
+        )
+        cache.set(cache_key, found, SEARCH_CACHE_TIMEOUT)
 
-    for model_cls in search_in:
-        results.extend(model_cls.find(search_term, swapped))
+    results = SearchResults(obj for _, obj in SearchEngine.hydrate(search_in, found))
+    results.dropped = getattr(found, 'dropped', 0)
 
     return search_term, results
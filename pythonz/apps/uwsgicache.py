@@ -0,0 +1,108 @@
+import pickle
+from struct import Struct
+from typing import Any
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from uwsgiconf import uwsgi
+from uwsgiconf.contrib.django.uwsgify.cache import UwsgiCache
+
+NUMBER = Struct('=q')
+"""Представление целых чисел в кеше uWSGI (64 бита), с которым работают uwsgi.cache_inc() и uwsgi.cache_num()."""
+
+
+class SharedCache(UwsgiCache):
+    """Кеш в разделяемой памяти uWSGI, общий для всех рабочих процессов и спулера.
+
+    Отличия от исходного бэкенда uwsgiconf:
+
+        * set() перезаписывает значение (uwsgi.cache_set() существующие ключи не трогает);
+        * add() атомарен: значение добавляется uwsgi.cache_set(), только если ключа ещё нет;
+        * incr() атомарен: целые числа хранятся 64-битными значениями, которые
+          увеличивает сам uWSGI (uwsgi.cache_inc()), а не парой get() и set().
+
+    Блокировки uWSGI не используются: они недоступны в спулере.
+
+    Пример настройки (кеш должен быть объявлен и в конфигурации uWSGI):
+
+        CACHES = {
+            'default': {
+                'BACKEND': 'pythonz.apps.uwsgicache.SharedCache',
+                'LOCATION': 'pythonz',
+            }
+        }
+
+    """
+    def __init__(self, name: str, params: dict):
+        super().__init__(name, params)
+        self._name = name
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return NUMBER.pack(value)
+
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+        if len(data) == NUMBER.size:
+            # Длина зарезервирована за числами. Данные после конца pickle игнорируются при загрузке.
+            data += b'.'
+
+        return data
+
+    @staticmethod
+    def _decode(data: bytes) -> Any:
+
+        if len(data) == NUMBER.size:
+            return NUMBER.unpack(data)[0]
+
+        return pickle.loads(data)
+
+    def _get_expires(self, timeout) -> int:
+        # uWSGI: 0 - хранить бессрочно.
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+
+        return 0 if timeout is None else max(int(timeout), 1)
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        uwsgi.cache_update(
+            self.make_and_validate_key(key, version=version),
+            self._encode(value),
+            self._get_expires(timeout),
+            self._name,
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None) -> bool:
+        return bool(uwsgi.cache_set(
+            self.make_and_validate_key(key, version=version),
+            self._encode(value),
+            self._get_expires(timeout),
+            self._name,
+        ))
+
+    def get(self, key, default=None, version=None) -> Any:
+        data = uwsgi.cache_get(self.make_and_validate_key(key, version=version), self._name)
+
+        if data is None:
+            return default
+
+        return self._decode(data)
+
+    def incr(self, key, delta=1, version=None) -> int:
+        """Атомарно увеличивает значение. Возвращает значение, прочитанное сразу после увеличения:
+        оно может включать и увеличения, одновременно сделанные другими процессами.
+
+        :param key:
+        :param delta:
+        :param version:
+
+        """
+        key = self.make_and_validate_key(key, version=version)
+        name = self._name
+
+        # uwsgi.cache_inc() создаёт отсутствующий ключ, а Django ожидает в этом случае исключения.
+        if not uwsgi.cache_exists(key, name) or not uwsgi.cache_inc(key, delta, 0, name):
+            raise ValueError(f"Key '{key}' not found or is not a number")
+
+        return uwsgi.cache_num(key, name)
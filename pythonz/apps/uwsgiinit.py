@@ -1,9 +1,16 @@
 from django.utils import timezone
 from sitemessage.toolbox import check_undelivered, cleanup_sent_messages, send_scheduled_messages
 from uwsgiconf.runtime.scheduling import register_cron, register_timer
-
-from .commands import clean_missing_refs, publish_postponed
-from .models import PEP, App, Event, ExternalResource, Summary, Vacancy
+from uwsgiconf.runtime.spooler import Spooler
+
+from .commands import (
+    build_ide_bundle,
+    clean_missing_refs,
+    flush_missing_refs,
+    publish_postponed,
+    warm_telegram_inline,
+)
+from .models import PEP, App, Event, ExternalResource, ReferenceMissing, Summary, Vacancy
 from .sitemessages import PythonzEmailDigest
 
 
@@ -22,6 +29,35 @@ def task_send_messages(sig_num):
     send_scheduled_messages(priority=1)
 
 
+@Spooler.task()
+def spool_missing_ref(search_term: str):
+    """Занесение промаха справочника в журнал.
+    Выполняется в спулере, там же, где и сброс журнала в БД.
+
+    :param search_term:
+
+    """
+    ReferenceMissing.buffer(search_term)
+
+
+@register_timer(300, target='spooler')
+def task_flush_missing_refs(sig_num):
+    """Сброс накопленных промахов справочника в БД."""
+    flush_missing_refs()
+
+
+@register_timer(600)
+def task_warm_telegram_inline(sig_num):
+    """Прогрев кеша встрочных результатов Telegram."""
+    warm_telegram_inline()
+
+
+@register_cron(hour=-1, minute=45)
+def task_build_ide_bundle(sig_num):
+    """Обновление выгрузки справочника для IDE."""
+    build_ide_bundle()
+
+
 @register_cron(hour=-4, minute=30)
 def task_get_vacancies(sig_num):
     """Синхронизация вакансий."""
@@ -1,7 +1,7 @@
 from .basic import login, page_not_found, permission_denied, server_error
 from .callback import telebot
 from .categories import CategoryListingView
-from .ide import ide
+from .ide import ide, ide_bundle
 from .index import index
 from .peps import PepListingView
 from .persons import PersonDetailsView
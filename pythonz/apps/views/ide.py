@@ -1,8 +1,9 @@
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
 
 from ..generics.views import HttpRequest
 from ..models import Reference
+from ..search.bundle import ReferenceBundle
 from ..utils import search_models
 
 
@@ -25,3 +26,32 @@ def ide(request: HttpRequest) -> HttpResponse:
             error = f'Используемая вами среда разработки "{ide_name} {ide_version}" не поддерживается.'
 
     return render(request, 'realms/references/ide.html', {'term': term, 'results': results, 'error': error})
+
+
+def ide_bundle(request: HttpRequest, name: str = '') -> HttpResponse:
+    """Выгрузка справочника для автономного поиска в IDE.
+
+    Без имени файла возвращает манифест. Если клиент указал свою версию (?since=),
+    в манифесте дополнительно указывается файл изменений относительно неё (delta).
+
+    :param request:
+    :param name: Имя файла выгрузки.
+
+    """
+    if name:
+        path = ReferenceBundle.get_file(name)
+
+        if path is None:
+            raise Http404
+
+        return FileResponse(path.open('rb'), content_type='application/gzip')
+
+    manifest = ReferenceBundle.get_manifest()
+
+    if not manifest:
+        raise Http404
+
+    since = request.GET.get('since', '')
+    manifest['delta'] = manifest['deltas'].get(since, '')
+
+    return JsonResponse(manifest)
@@ -4,6 +4,8 @@ from ..generics.views import DetailsView, HttpRequest
 class PersonDetailsView(DetailsView):
     """Представление с детальной информацией о персоне."""
 
+    use_etag: bool = False
+
     def update_context(self, context: dict, request: HttpRequest):
         user = context['item']
         context['materials'] = lambda: user.get_materials()  # Ленивость для кеша в шаблоне
@@ -10,6 +10,8 @@ from ..models import Community, Event, Place, User, Vacancy
 class PlaceDetailsView(DetailsView):
     """Представление с детальной информацией о месте."""
 
+    use_etag: bool = False
+
     @method_decorator(login_required)
     def set_im_here(self, request: HttpRequest, obj_id: int) -> HttpResponse:
         """Обслуживает ajax-запрос. Прописывает место и часовой пояс в профиль пользователя.
@@ -15,6 +15,8 @@ class ReferenceListingView(RealmView):
 class ReferenceDetailsView(DetailsView):
     """Представление статьи справочника."""
 
+    use_etag: bool = False
+
     def update_context(self, context: dict, request: HttpRequest):
 
         reference = context['item']
@@ -6,7 +6,8 @@ from django.shortcuts import redirect, render
 
 from ..generics.views import HttpRequest
 from ..models import App, Category, Person, Reference, ReferenceMissing
-from ..utils import message_warning, search_models
+from ..search.suggest import SUGGESTER
+from ..utils import message_info, message_warning, search_models
 
 
 def search(request: HttpRequest) -> HttpResponse:
@@ -15,7 +16,7 @@ def search(request: HttpRequest) -> HttpResponse:
 
     """
     search_term, results = search_models(
-        request.POST.get('text', ''), search_in=(
+        request.POST.get('text') or request.GET.get('text', ''), search_in=(
             Category,
             Person,
             Reference,
@@ -31,6 +32,15 @@ def search(request: HttpRequest) -> HttpResponse:
 
         ReferenceMissing.add(search_term)
 
+        if suggestions := SUGGESTER.suggest(search_term):
+            # Возможно, опечатка. Предложим исправленные варианты.
+            return render(request, 'static/search.html', {
+                'search_term': search_term,
+                'results': [],
+                'results_len': 0,
+                'suggestions': suggestions,
+            })
+
         message_warning(
             request, 'Поиск по справочнику и категориям не дал результатов, '
                      'и мы переключились на поиск по всему сайту.')
@@ -43,6 +53,11 @@ def search(request: HttpRequest) -> HttpResponse:
 
     results_len = len(results)
 
+    if dropped := results.dropped:
+        message_info(
+            request, f'Показаны наиболее подходящие результаты. Ещё {dropped} '
+                     'найденных сочтены малорелевантными и скрыты.')
+
     if results_len == 1:
         return redirect(results[0].get_absolute_url())
 
@@ -12,6 +12,8 @@ from ..models import User
 class UserDetailsView(DetailsView):
     """Представление с детальной информацией о пользователе."""
 
+    use_etag: bool = False
+
     def check_view_permissions(self, request: HttpRequest, item: User):
         super().check_view_permissions(request, item)
 
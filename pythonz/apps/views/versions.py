@@ -4,6 +4,8 @@ from ..generics.views import DetailsView, HttpRequest
 class VersionDetailsView(DetailsView):
     """Представление с детальной информацией о версии Питона."""
 
+    use_etag: bool = False
+
     def update_context(self, context: dict, request: HttpRequest):
         version = context['item']
         context['added'] = version.reference_added.order_by('title')
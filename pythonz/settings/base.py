@@ -32,6 +32,16 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        # Кеш должен быть общим для всех процессов uWSGI: поколения, отметки
+        # об изменении списков и прочие инвалидации должны видеть все рабочие процессы.
+        # Кеш в памяти uWSGI объявляется в uwsgicfg.py.
+        'BACKEND': 'pythonz.apps.uwsgicache.SharedCache',
+        'LOCATION': PROJECT_NAME,
+    }
+}
+
 
 SITE_ID = 1
 
@@ -12,6 +12,13 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        # Кеш в памяти uWSGI недоступен вне uWSGI. Тесты выполняются в одном процессе.
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 PARTNER_IDS = {
     'booksru': 'abc',
     'litres': 'def',
@@ -36,6 +36,11 @@ def get_configurations() -> PythonSection:
 
     section.spooler.add(f"{dir_state / 'spool'}")
 
+    # Кеш Django (см. CACHES), общий для рабочих процессов и спулера.
+    # Значения занимают блоки по 1 КБ (всего 64 МБ), при заполнении вытесняются давно не читанные.
+    section.caching.add_cache(
+        project, max_items=50000, block_size=1024, block_count=65536, mode_bitmap=True, full_purge_lru=True)
+
     if in_production and domain:
         section.configure_certbot_https(
             domain=domain,
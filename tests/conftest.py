@@ -1,6 +1,7 @@
 import os
 
 import pytest
+from django.core.cache import cache
 from pytest_djangoapp import configure_djangoapp_plugin
 
 # Используем имитатор вместо uwsgi.
@@ -13,6 +14,19 @@ pytest_plugins = configure_djangoapp_plugin(
 )
 
 
+@pytest.fixture(autouse=True)
+def reset_search_state():
+    """Сбрасывает кеш и индексы в памяти процесса, т.к. БД для каждого теста новая."""
+    from pythonz.apps.models import Reference  # noqa: PLC0415
+    from pythonz.apps.search.ranking import TermStats  # noqa: PLC0415
+    from pythonz.apps.search.suggest import SUGGESTER  # noqa: PLC0415
+
+    cache.clear()
+    Reference.term_index.reset()
+    SUGGESTER.reset()
+    TermStats.reset_all()
+
+
 @pytest.fixture
 def robot(user_create, settings):
     """Возвращает объект пользователя-робота (суперпользователь)."""
@@ -0,0 +1,40 @@
+import json
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from pythonz.apps.integration import telegram
+from pythonz.apps.models import Reference
+
+
+def test_inline_cache(robot, db_queries, monkeypatch):
+    reverse('index')  # загрузка URL до сохранения статей
+
+    monkeypatch.setattr(telegram, 'INLINE_STATS_FLUSH_EVERY', 2)
+
+    ref = Reference.objects.create(title='list', submitter=robot, status=Reference.Status.PUBLISHED)
+
+    results = telegram.get_inline_reference('list')
+    assert len(results) == 1
+    assert json.loads(results[0].to_json())['title'] == 'list'
+
+    # Повторный запрос не обращается к БД.
+    with db_queries.scope(expect=0):
+        results = telegram.get_inline_reference('LIST')
+    assert json.loads(results[0].to_json())['title'] == 'list'
+
+    # Изменения в справочнике делают результаты недействительными.
+    ref.title = 'list type'
+    ref.save()
+    results = telegram.get_inline_reference('list')
+    assert json.loads(results[0].to_json())['title'] == 'list type'
+
+    # Прогрев частых запросов.
+    assert cache.get(telegram.INLINE_STATS_KEY) == {('reference', 'list'): 2}
+    assert telegram.warm_inline_cache() == 0  # уже в кеше
+
+    ref.save()
+    assert telegram.warm_inline_cache() == 1
+
+    with db_queries.scope(expect=0):
+        telegram.get_inline_reference('list')
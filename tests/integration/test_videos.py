@@ -13,3 +13,16 @@ def test_youtube():
     emb, img = VideoBroker.get_data_from_youtube('https://youtu.be/WW0DTSioHQU?some=1&other=2')
     assert 'embed' in emb
     assert img == img_expected
+
+
+def test_vimeo_code_offline(monkeypatch):
+
+    def get_json(url):
+        raise AssertionError('Unexpected network request')
+
+    monkeypatch.setattr('pythonz.apps.integration.utils.get_json', get_json)
+
+    code = VideoBroker.get_code('https://vimeo.com/12345/', wrap_responsive=True)
+
+    assert code.startswith('<div class="embed-responsive')
+    assert '//player.vimeo.com/video/12345?' in code
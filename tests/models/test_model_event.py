@@ -15,3 +15,24 @@ def test_event_unique_source(robot):
 def test_event_fetch_items(robot, mock_get_location):
     Event.fetch_items()
     assert Event.objects.first().time_published
+
+
+def test_event_typograph_many(robot, monkeypatch):
+    items = [{'title': 'Митап - "один"'}, {'title': 'Митап - два', 'description': 'Описание (c)'}]
+
+    typographed = Event.typograph_many(items)
+
+    assert items[0]['title'] == 'Митап — «один»'
+    assert typographed == [
+        {'title': 'Митап — «один»'},
+        {'title': 'Митап — два', 'description': 'Описание ©'},
+    ]
+
+    applied = []
+    monkeypatch.setattr('pythonz.apps.generics.models.BasicTypograph.apply_to', applied.append)
+
+    event = Event(submitter=robot, **items[1])
+    event._typographed = typographed[1]
+    event.save()
+
+    assert applied == []
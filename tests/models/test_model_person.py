@@ -24,3 +24,20 @@ def test_person():
         'Nathaniel J. Smith',
         'N. J. Smith'
     }
+
+
+def test_person_name_sort(robot):
+
+    for name in ('Гвидо ван Россум', 'Тим Питерс', 'Раймонд Хеттингер'):
+        Person.create(name, save=True)
+
+    person = Person.objects.get(name='Тим Питерс')
+    assert person.name_sort == 'Питерс Тим'
+
+    person.name = 'Тим Петерс'
+    person.save(update_fields=['name'])
+    person.refresh_from_db()
+    assert person.name_sort == 'Петерс Тим'
+
+    assert [person.name_sort for person in Person.get_paginator_objects()] == [
+        'Петерс Тим', 'Россум Гвидо ван', 'Хеттингер Раймонд']
@@ -1,4 +1,8 @@
-from pythonz.apps.models import Reference
+from uwsgiconf import uwsgi
+from uwsgiconf.runtime.spooler import _task_functions
+
+from pythonz.apps import uwsgiinit  # noqa: F401 регистрирует задачи спулера
+from pythonz.apps.models import Reference, ReferenceMissing
 
 
 def test_reference_types(robot):
@@ -16,3 +20,83 @@ def test_reference_types(robot):
     assert ref.is_type_bundle
     ref.refresh_from_db()
     assert ref.is_type_bundle
+
+
+def test_reference_missing(db_queries):
+
+    ReferenceMissing.objects.create(term='asyncio', synonyms='coroutine')
+    ReferenceMissing.objects.create(term='dataclass')
+
+    # Промахи копятся в кеше, в БД не пишутся.
+    with db_queries.scope(expect=0):
+        for term in ('asyncio', 'ASYNCIO', 'coroutine', 'dataclass', 'walrus', 'Walrus', 'walrus'):
+            ReferenceMissing.add(term)
+
+    assert ReferenceMissing.flush() == 7
+    assert ReferenceMissing.flush() == 0
+
+    hits = dict(ReferenceMissing.objects.values_list('term', 'hits'))
+    assert hits == {'asyncio': 3, 'dataclass': 1, 'walrus': 3}
+
+    ReferenceMissing.add('dataclass')
+    assert ReferenceMissing.flush() == 1
+    assert ReferenceMissing.objects.get(term='dataclass').hits == 2
+
+
+def test_reference_missing_spooled(monkeypatch):
+    spooled = []
+    monkeypatch.setattr(uwsgi, 'is_stub', False)
+    monkeypatch.setattr(uwsgi, 'send_to_spooler', lambda message: spooled.append(message))
+
+    # Под uWSGI промах уходит в спулер, а не в кеш рабочего процесса.
+    ReferenceMissing.add('walrus')
+    assert len(spooled) == 1
+    assert ReferenceMissing.flush() == 0
+
+    # В спулере промах попадает в журнал.
+    _task_functions['spool_missing_ref']('walrus')
+    assert ReferenceMissing.flush() == 1
+    assert ReferenceMissing.objects.get(term='walrus').hits == 1
+
+
+def test_reference_save_unchanged(robot, monkeypatch):
+
+    ref = Reference.objects.create(
+        title='func', description='Описание - тут', text_src='**текст**', submitter=robot)
+
+    assert ref.description == 'Описание — тут'
+    assert ref.text == '<b>текст</b>'
+
+    calls = []
+
+    def compile_cached(text):
+        calls.append(text)
+        return text
+
+    monkeypatch.setattr('pythonz.apps.utils.TextCompiler.compile_cached', compile_cached)
+
+    ref = Reference.objects.get(pk=ref.pk)
+    ref.search_terms = 'функция'
+    ref.save()
+    assert not calls
+
+    ref.text_src = '*текст*'
+    ref.save()
+    assert calls == ['*текст*']
+
+    ref.save()
+    assert calls == ['*текст*']
+
+    # Ограниченное сохранение не затрагивает прочие поля.
+    ref.description = 'Другое - описание'
+    ref.set_support(robot)
+    ref.refresh_from_db()
+    assert ref.supporters_num == 1
+    assert ref.description == 'Описание — тут'
+
+    # Не вошедшее в ограниченное сохранение изменение считается несохранённым.
+    ref.text_src = '**другой текст**'
+    ref.save(update_fields=['search_terms'])
+    assert calls == ['*текст*']
+    ref.save()
+    assert calls == ['*текст*', '**другой текст**']
@@ -0,0 +1,487 @@
+import gzip
+import json
+from importlib import import_module
+from time import perf_counter
+
+import pytest
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import Q
+from django.urls import reverse
+
+from pythonz.apps.caching import cache_get_generation, cache_get_generations, get_search_generation_name
+from pythonz.apps.exceptions import LogicError
+from pythonz.apps.models import PEP, App, Category, Person, Reference
+from pythonz.apps.search.benchmark import SearchBenchmark
+from pythonz.apps.search.bundle import ReferenceBundle
+from pythonz.apps.search.engine import SearchEngine
+from pythonz.apps.search.fulltext import FullTextIndex
+from pythonz.apps.search.ranking import TermStats
+from pythonz.apps.search.suggest import SUGGESTER
+from pythonz.apps.utils import search_models
+
+
+@pytest.fixture
+def search_index():
+    # Загружаем URL заранее, чтобы построение дерева справочника не пришлось на сохранение статей.
+    reverse('index')
+
+    FullTextIndex.create()
+    FullTextIndex.connect()
+    yield FullTextIndex
+    FullTextIndex.reset()
+
+
+@pytest.fixture
+def create_reference(robot):
+
+    def create_reference_(title: str, **kwargs):
+        return Reference.objects.create(
+            title=title, submitter=robot, status=Reference.Status.PUBLISHED, **kwargs)
+
+    return create_reference_
+
+
+def test_fulltext_find(search_index, create_reference):
+
+    ref_list = create_reference('list', search_terms='список')
+    ref_dict = create_reference('dict', search_terms='словарь')
+    Reference.objects.create(title='Draft list', submitter=ref_list.submitter)  # Черновик не ищется.
+
+    assert list(Reference.find('list')) == [ref_list]
+    assert list(Reference.find('СПИСОК')) == [ref_list]  # регистр не важен, в т.ч. для кириллицы
+    assert set(Reference.find('ова', 'lis')) == {ref_list, ref_dict}
+    assert not Reference.find('tuple').exists()
+
+    # Короткие термины ищутся без индекса.
+    assert list(Reference.find('di')) == [ref_dict]
+
+    ref_dict.title = 'dictionary'
+    ref_dict.save()
+    assert list(Reference.find('ionar')) == [ref_dict]
+
+    ref_dict.delete()
+    assert not Reference.find('ionar').exists()
+
+
+def test_fulltext_realms(search_index, robot):
+
+    person = Person.create('Гвидо ван Россум', save=True)
+    person.aka = 'BDFL'
+    person.save()
+
+    app = App.objects.create(
+        title='Some', slug='someapp', submitter=robot, status=App.Status.PUBLISHED)
+
+    category = Category.objects.create(creator=robot, title='Асинхронность', note='asyncio')
+
+    assert list(Person.find('bdfl')) == [person]
+    assert list(App.find('someap')) == [app]
+    assert list(Category.find('asyncio')) == [category]
+
+    term, results = search_models('bdfl', search_in=(Category, Person, Reference, App))
+    assert results == [person]
+
+    # Короткие термины во всех областях ищутся по началам слов, как и в справочнике.
+    reference = Reference.objects.create(
+        title='Россия', submitter=robot, status=Reference.Status.PUBLISHED)
+    assert list(Person.find('ро')) == [person]
+    assert not Person.find('сс').exists()
+    assert not Reference.find('сс').exists()
+
+    term, results = search_models('ро', search_in=(Category, Person, Reference, App))
+    assert set(results) == {person, reference}
+
+
+def test_fulltext_rebuild(search_index, create_reference, monkeypatch):
+
+    create_reference('list')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(FullTextIndex, '_available', False)
+        create_reference('tuple')  # Индекс не обновляется.
+
+    def find(term):
+        return Reference.objects.filter(search_index.get_filter(Reference, term))
+
+    assert not find('tuple').exists()
+
+    assert search_index.rebuild() == 2
+    assert find('tuple').exists()
+    assert find('list').exists()
+
+
+def test_fulltext_migration(search_index, create_reference, settings):
+
+    settings.MIGRATION_MODULES = {}  # Миграции для тестов отключены.
+    create_reference('list')
+    search_index.drop()
+
+    # Миграция использует исторические модели и переданное ей соединение.
+    migration = import_module('pythonz.apps.migrations.0060_search_index')
+    state = MigrationLoader(connection).project_state(('apps', '0060_search_index'))
+
+    with connection.schema_editor() as schema_editor:
+        migration.create_index(state.apps, schema_editor)
+
+    search_index.reset()
+    assert list(Reference.find('list')) == [Reference.objects.get(title='list')]
+
+
+def test_term_index(search_index, create_reference, db_queries):
+
+    ref_list = create_reference('list', search_terms='список')
+    ref_dict = create_reference('dict', search_terms='словарь')
+
+    index = Reference.term_index
+
+    assert index.find_ids('ИСО') == {ref_list.id}
+    assert index.find_ids('ова', 'lis') == {ref_list.id, ref_dict.id}
+    assert index.find_ids('tuple') == set()
+
+    # Короткие термины ищутся по началам слов.
+    assert index.find_ids('di') == {ref_dict.id}
+    assert index.find_ids('ic') == set()
+
+    # Построенный индекс обходится без запросов к БД.
+    with db_queries.scope(expect=0):
+        index.find_ids('list')
+
+    # Слова прежнего заголовка не находятся и по началам.
+    ref_dict.title = 'mapping'
+    ref_dict.save()
+    assert index.find_ids('di') == set()
+
+    ref_dict.title = 'dictionary'
+    ref_dict.save()
+    assert index.find_ids('ionar') == {ref_dict.id}
+    assert list(Reference.find('ionar')) == [ref_dict]
+
+    ref_dict.status = Reference.Status.DRAFT
+    ref_dict.save()
+    assert index.find_ids('ionar') == set()
+
+    ref_list.delete()
+    assert index.find_ids('list') == set()
+
+    # Изменения, сделанные в другом процессе, приводят к перестроению индекса.
+    created = create_reference('tuple')
+    index.reset()
+    index.find_ids('tuple')
+    Reference.objects.filter(id=created.id).update(title='set')
+    assert index.find_ids('set') == set()
+    index.update(created)  # поколение в кеше увеличено сторонним процессом
+    created.title = 'set'
+    assert index.find_ids('set') == {created.id}
+
+
+def test_term_index_on_commit(search_index, create_reference):
+
+    ref = create_reference('list')
+    index = Reference.term_index
+    stats = TermStats.get(Reference)
+    stats.actualize()
+    generation = cache_get_generation(index.generation_name)
+    generation_stats = cache_get_generation(stats.generation_name)
+
+    # Поколение увеличивается лишь после фиксации транзакции.
+    with transaction.atomic():
+        ref.title = 'tuple'
+        ref.save()
+        assert cache_get_generation(index.generation_name) == generation
+        assert cache_get_generation(stats.generation_name) == generation_stats
+
+    assert cache_get_generation(index.generation_name) > generation
+    assert cache_get_generation(stats.generation_name) == generation_stats + 1
+    assert stats.df['tuple'] == 1
+
+    # Откаченные изменения статистику не затрагивают.
+    with transaction.atomic():
+        ref.delete()
+        transaction.set_rollback(True)
+
+    assert cache_get_generation(stats.generation_name) == generation_stats + 1
+    assert stats.df['tuple'] == 1
+
+    # Вытесненное из кеша поколение не начинается заново с прежних значений.
+    cache.delete(f'generation|{index.generation_name}')
+    assert cache_get_generation(index.generation_name) > generation + 1
+
+
+def test_term_index_overflow(search_index, create_reference, monkeypatch):
+    monkeypatch.setattr(Reference.term_index, 'max_ids', 1)
+
+    create_reference('list')
+    create_reference('linked list')
+
+    assert Reference.term_index.find_ids('list') is None
+    assert Reference.find('list').count() == 2
+
+
+@pytest.mark.slow
+def test_term_index_benchmark(search_index, robot):
+    words = ['list', 'dict', 'tuple', 'set', 'thread', 'async', 'socket', 'json', 'path', 'regex']
+
+    Reference.objects.bulk_create(
+        Reference(
+            title=f'{words[idx % len(words)]}{idx}',
+            search_terms=f'{words[(idx * 7) % len(words)]} термин{idx}',
+            slug=f'ref{idx}',
+            submitter=robot,
+            status=Reference.Status.PUBLISHED,
+        )
+        for idx in range(50000)
+    )
+
+    index = Reference.term_index
+    index.build()
+
+    terms = [f'{words[idx % len(words)]}{idx}' for idx in range(10000, 50000, 1000)]
+
+    def measure(func):
+        started = perf_counter()
+        for term in terms:
+            list(func(term))
+        return perf_counter() - started
+
+    qs = Reference.objects.published()
+
+    time_index = measure(lambda term: qs.filter(id__in=index.find_ids(term)))
+    time_orm = measure(lambda term: qs.filter(Q(title__icontains=term) | Q(search_terms__icontains=term)))
+
+    print(f'\nTerm index: {time_index:.4f}s; database: {time_orm:.4f}s; terms: {len(terms)}')
+    assert time_index < time_orm
+
+
+def test_search_cache(search_index, create_reference, db_queries):
+
+    search_in = (Category, Person, Reference, App)
+    ref_list = create_reference('list')
+
+    assert search_models(' list ', search_in=search_in) == ('list', [ref_list])
+
+    # Повторный поиск (с точностью до обрамляющих пробелов и скобок) обходится одной выборкой по идентификаторам.
+    with db_queries.scope(expect=1):
+        assert search_models('(list)', search_in=search_in) == ('list', [ref_list])
+
+    # Регистр в БД учитывается не всегда так же, как в Python, поэтому результаты кешируются отдельно.
+    with db_queries.scope() as queries:
+        assert search_models('LIST', search_in=search_in) == ('LIST', [ref_list])
+        assert len(queries.get_log()) > 1
+
+    # Изменение объектов области сбрасывает результаты.
+    assert search_models('linked', search_in=search_in)[1] == []
+    ref_linked = create_reference('linked list')
+    assert search_models('linked', search_in=search_in)[1] == [ref_linked]
+
+    assert search_models('связные', search_in=search_in)[1] == []
+    category = Category.objects.create(creator=ref_list.submitter, title='Связные списки', note='linked list')
+    assert search_models('связные', search_in=search_in)[1] == [category]
+
+
+def test_search_engine(search_index, create_reference, robot, db_queries):
+
+    search_in = (Category, Person, Reference, App)
+
+    ref_linked = create_reference('linked list')
+    ref_list = create_reference('list')
+    ref_lists = create_reference('lists')
+    category = Category.objects.create(creator=robot, title='list', note='списки')
+    person = Person.create('Lisa List', save=True)
+
+    SearchEngine.find(search_in, 'list')  # прогрев индексов
+
+    with db_queries.scope(expect=1):
+        found = SearchEngine.find(search_in, 'list')
+
+    # Точные совпадения заголовков, затем начинающиеся с термина, затем прочие.
+    # При равенстве оценок порядок определяется порядком областей.
+    assert [(result.realm, result.id, result.title, result.score) for result in found] == [
+        ('apps.category', category.id, 'list', 3),
+        ('apps.reference', ref_list.id, 'list', 3),
+        ('apps.reference', ref_lists.id, 'lists', 2),
+        ('apps.person', person.id, 'Lisa List', 1),
+        ('apps.reference', ref_linked.id, 'linked list', 1),
+    ]
+
+    assert len(SearchEngine.find(search_in, 'list', limit=2)) == 2
+
+    ref_linked.delete()
+
+    with db_queries.scope(expect=3):  # по запросу на каждую область
+        hydrated = SearchEngine.hydrate(search_in, found)
+
+    assert [obj for _, obj in hydrated] == [category, ref_list, ref_lists, person]
+    assert hydrated[1][0].url == ref_list.get_absolute_url()
+
+
+def test_suggest(search_index, create_reference, request_client, monkeypatch):
+
+    create_reference('dict', search_terms='словарь, dictionary')
+    create_reference('Дата и время')
+    Person.create('Гвидо ван Россум', save=True)
+
+    assert SUGGESTER.suggest('dcit') == ['dict']
+    assert SUGGESTER.suggest('словрь') == ['словарь']
+    assert SUGGESTER.suggest('dictionry') == ['dictionary']
+    assert SUGGESTER.suggest('дата и врямя') == ['Дата и время']
+    assert SUGGESTER.suggest('Росум') == ['Россум']
+    assert SUGGESTER.suggest('dict') == []
+    assert SUGGESTER.suggest('zzzz') == []
+
+    # Словарь перестраивается в фоне при изменении справочника,
+    # до тех пор подсказки выдаются по прежнему словарю.
+    scheduled = []
+    monkeypatch.setattr(SUGGESTER, 'schedule_build', lambda: scheduled.append(True))
+
+    create_reference('tuple')
+    assert SUGGESTER.suggest('tupel') == []
+    assert SUGGESTER.suggest('dcit') == ['dict']
+    assert scheduled == [True]
+
+    SUGGESTER.build()
+    assert SUGGESTER.suggest('tupel') == ['tuple']
+
+    response = request_client().post('/search/', {'text': 'dcit'})
+    assert response.status_code == 200
+    assert '?text=dict' in response.content.decode()
+
+
+def test_ranking(search_index, create_reference, robot, request_client):
+
+    search_in = (Category, Person, Reference, App)
+
+    ref_list = create_reference('list', search_terms='список', description='Изменяемая последовательность.')
+    ref_linked = create_reference('linked list', description='Связный список.')
+    ref_deque = create_reference('collections.deque', description='Двусвязный список list, очередь.')
+    create_reference('tuple', description='Неизменяемая последовательность, в отличие от list.')
+
+    # Точное совпадение заголовка перевешивает прочие, что даёт перенаправление на единственный результат.
+    results = search_models('list', search_in=search_in)[1]
+    assert results == [ref_list]
+    assert results.dropped == 1
+
+    # Об отброшенных результатах пользователю сообщается.
+    response = request_client().post('/search/', {'text': 'list'}, follow=True)
+    assert 'малорелевантными' in response.content.decode()
+
+    # Совпадения в заголовке весомее совпадений в описании.
+    results = search_models('linked', search_in=search_in)[1]
+    assert results == [ref_linked]
+
+    results = search_models('спис', search_in=search_in)[1]
+    assert results[0] == ref_list
+    assert set(results) <= {ref_list, ref_linked, ref_deque}
+
+    # Статистика обновляется вместе с объектами.
+    stats = TermStats.get(Reference)
+    docs_count = len(stats.docs)
+    assert stats.df['list'] == 4
+
+    ref_deque.delete()
+    assert len(stats.docs) == docs_count - 1
+    assert stats.df['list'] == 3
+
+    ref_linked.title = 'linked'
+    ref_linked.save()
+    assert stats.df['list'] == 2
+
+
+def test_benchmark(search_index, tmp_path, settings):
+
+    settings.IN_PRODUCTION = False
+    generation = cache_get_generation(get_search_generation_name(Reference))
+    report = SearchBenchmark(size=60, iterations=20).run()
+
+    assert set(report) == {'search', 'ide', 'telegram', 'telegram_pep'}
+
+    for summary in report.values():
+        assert summary['calls'] == 20
+        assert summary['p95'] >= summary['p50'] > 0
+        assert summary['queries'] >= 0
+
+    # Данные для замеров не остаются в БД.
+    assert not Reference.objects.exists()
+    assert not Reference.find('list').exists()
+    assert not PEP.objects.exists()
+
+    # Общий кеш замерами не затрагивается.
+    assert cache_get_generation(get_search_generation_name(Reference)) == generation
+
+    settings.IN_PRODUCTION = True
+
+    with pytest.raises(LogicError):
+        SearchBenchmark(size=60, iterations=20).run()
+
+    baseline_path = tmp_path / 'baseline.json'
+    assert SearchBenchmark.load_baseline(baseline_path) == {}
+    SearchBenchmark.save_baseline(baseline_path, report)
+
+    baseline = SearchBenchmark.load_baseline(baseline_path)
+    baseline['search']['p50'] = report['search']['p50'] * 2
+    lines = SearchBenchmark.compare(report, baseline)
+    assert len(lines) == 4
+    assert lines[0].startswith('search: p50=')
+    assert '(-50.0%)' in lines[0]
+
+
+def test_ide_bundle(search_index, create_reference, settings, tmp_path, request_client):
+    settings.PROJECT_DIR_STATE = tmp_path
+
+    client = request_client()
+    assert client.get('/references/ide/bundle/').status_code == 404
+
+    ref_list = create_reference('list', description='Список.', func_proto='list(iterable)')
+    ref_dict = create_reference('dict')
+
+    manifest = ReferenceBundle.build()
+    assert manifest['version'] == 1
+    assert manifest['count'] == 2
+    assert manifest['deltas'] == {}
+
+    # Данные не изменились — версия прежняя.
+    assert ReferenceBundle.build()['version'] == 1
+
+    bundle = ReferenceBundle.load(ReferenceBundle.get_file(manifest['bundle']))
+    items = [dict(zip(bundle['fields'], item, strict=True)) for item in bundle['items']]
+    assert items[0]['title'] == 'list'
+    assert items[0]['proto'] == 'list(iterable)'
+    assert items[0]['url'].endswith(ref_list.get_absolute_url())
+
+    ref_list.title = 'list type'
+    ref_list.save()
+    ref_dict_id = ref_dict.id
+    ref_dict.delete()
+    create_reference('tuple')
+
+    manifest = ReferenceBundle.build()
+    assert manifest['version'] == 2
+
+    response = client.get('/references/ide/bundle/', {'since': '1'})
+    assert response.json()['delta'] == 'delta-1-2.json.gz'
+
+    response = client.get('/references/ide/bundle/delta-1-2.json.gz')
+    delta = json.loads(gzip.decompress(b''.join(response.streaming_content)))
+    assert delta['delete'] == [ref_dict_id]
+    assert sorted(item[3] for item in delta['upsert']) == ['list type', 'tuple']
+
+    assert client.get('/references/ide/bundle/manifest.json').status_code == 404
+    assert client.get('/references/ide/bundle/bundle-3.json.gz').status_code == 404
+
+
+def test_search_counter_saves(search_index, create_reference, user_create):
+
+    ref = create_reference('list')
+    Reference.term_index.find_ids('list')
+
+    names = (get_search_generation_name(Reference), Reference.term_index.generation_name)
+    generations = cache_get_generations(*names)
+
+    # Голос изменяет лишь счётчик, на поиск это не влияет.
+    ref.set_support(user_create())
+    assert cache_get_generations(*names) == generations
+
+    ref.title = 'tuple'
+    ref.save(update_fields=['title'])
+    assert all(new > old for new, old in zip(cache_get_generations(*names), generations, strict=True))
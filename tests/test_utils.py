@@ -1,4 +1,26 @@
-from pythonz.apps.utils import BasicTypograph, PersonName, TextCompiler, swap_layout, url_mangle
+from pathlib import Path
+from random import Random
+from threading import Thread
+from time import perf_counter
+
+import pytest
+from django.core.cache import cache
+
+from pythonz.apps.caching import cache_get_generation, get_details_generation_name
+from pythonz.apps.models import Reference
+from pythonz.apps.recompiler import TextRecompiler
+from pythonz.apps.utils import (
+    BasicTypograph,
+    PersonName,
+    TextCompiler,
+    TextProfiler,
+    swap_layout,
+    url_mangle,
+)
+from pythonz.apps.uwsgicache import NUMBER, SharedCache
+
+CORPUS_DIR = Path(__file__).parent / 'compiler_corpus'
+"""Тексты материалов (статей, справочника, сводок) для проверки и замеров TextCompiler."""
 
 
 def test_person_name():
@@ -75,9 +97,8 @@ def test_typography():
     assert BasicTypograph.apply_to(input_str) == expected_str
 
 
-def test_text_compiler():
-
-    compile = TextCompiler.compile
+@pytest.mark.parametrize('compile', [TextCompiler.compile, TextCompiler.compile_reference])
+def test_text_compiler(compile):
 
     assert compile('- ``func(*args, **kwargs)`` -') == '- <code>func(*args, **kwargs)</code> -'
     assert compile("    myfunc(*[1], **{'three': 'some'})") == "    myfunc(*[1], **{'three': 'some'})"
@@ -171,7 +192,254 @@ def test_text_compiler():
     assert 'yastatic' in compiled
 
 
+def test_text_compiler_corpus():
+
+    for path in sorted(CORPUS_DIR.glob('*.rst')):
+        text = path.read_text()
+
+        # Типичные материалы обрабатываются без обращения к эталонной реализации.
+        compiled = TextCompiler.compile_blocks(TextCompiler.prepare(text))
+        assert compiled == TextCompiler.compile_reference(text), path.name
+
+
+def test_text_compiler_differential():
+
+    fragments = (
+        '* ', '*', '**', '`', '``', '```', ' ', 'a', 'слово', '\n', '\n', '\n\n\n', '\r\n', '\t',
+        '**жирный**', '*курсив*', '``код()``', 'func(*args, **kwargs)', '2 ** 10',
+        '.. code:: python\n', '.. code::\n', '.. table::\n', ' | ', '! ', '!b:d+ ',
+        '.. note:: ', '.. warning:: ', '.. title:: ', '.. image:: ', '.. gist:: ', '.. poll:: ', '.. podster:: ',
+        'http://some.com/a', 'https://some.com/long/path/to/some/resource/which/ends?with=this',
+        '`ссылка <http://some.com/>`_', '<b>', '</p>', '&', '&amp;', '"', '..', '::',
+    )
+
+    rnd = Random(0)
+
+    for _ in range(3000):
+        text = ''.join(rnd.choice(fragments) for _ in range(rnd.randint(1, 30)))
+        assert TextCompiler.compile(text) == TextCompiler.compile_reference(text), text
+
+
+def test_text_compiler_cache(monkeypatch):
+    text = '**some**'
+
+    compiled = TextCompiler.compile_cached(text)
+    assert compiled == '<b>some</b>'
+    assert cache.get(TextCompiler.get_cache_key(text)) == compiled
+
+    compiled_texts = []
+    monkeypatch.setattr(TextCompiler, 'compile', lambda text: compiled_texts.append(text) or 'new')
+
+    # Одинаковый текст повторно не компилируется.
+    assert TextCompiler.compile_cached(text) == compiled
+    assert not compiled_texts
+
+    # Смена версии делает недействительными прежние результаты.
+    monkeypatch.setattr(TextCompiler, 'VERSION', TextCompiler.VERSION + 1)
+    assert TextCompiler.compile_cached(text) == 'new'
+    assert compiled_texts == [text]
+
+
+@pytest.mark.slow
+def test_text_compiler_benchmark():
+    texts = [path.read_text() for path in sorted(CORPUS_DIR.glob('*.rst'))] * 200
+
+    def measure(func):
+        started = perf_counter()
+        for text in texts:
+            func(text)
+        return perf_counter() - started
+
+    time_compile = measure(TextCompiler.compile)
+    time_reference = measure(TextCompiler.compile_reference)
+
+    print(f'\nSingle pass: {time_compile:.4f}s; reference: {time_reference:.4f}s; texts: {len(texts)}')
+    assert time_compile < time_reference
+
+
 def test_swap_layout():
     assert swap_layout('вуа') == 'def'
     assert not swap_layout('def')
     assert swap_layout('Ш рфму ыуут ьщку ерфт ьщыею') == 'I have seen more than most.'
+
+
+def test_text_recompiler(robot, tmp_path):
+
+    names = ('one', 'two', 'three', 'four', 'five')
+
+    refs = [
+        Reference.objects.create(title=f'ref{idx}', text_src=f'**{name}**', submitter=robot)
+        for idx, name in enumerate(names)
+    ]
+    Reference.objects.filter(pk__in=[ref.pk for ref in refs[1:]]).update(text='stale')
+    Reference.objects.filter(pk=refs[4].pk).update(text_src='**five**--')
+
+    generation_name = get_details_generation_name(Reference, refs[4].pk)
+    generation = cache_get_generation(generation_name)
+
+    checkpoint = tmp_path / 'checkpoint.json'
+    recompiler = TextRecompiler([Reference], checkpoint=checkpoint, chunk_size=2, workers=1)
+
+    def interrupt(label, rows, updated):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        recompiler.run(progress=interrupt)
+
+    assert checkpoint.exists()
+
+    report = recompiler.run()
+    assert report['apps.reference']['rows'] == 3
+    assert report['apps.reference']['updated'] == 3
+    assert not checkpoint.exists()
+
+    texts = dict(Reference.objects.values_list('pk', 'text'))
+    assert texts == {ref.pk: f'<b>{name}</b>' for name, ref in zip(names, refs, strict=True)}
+    assert Reference.objects.get(pk=refs[4].pk).text_src == '**five**'
+
+    # Закешированные страницы обновлённых объектов инвалидируются.
+    assert cache_get_generation(generation_name) > generation
+
+    report = recompiler.run()
+    assert report['apps.reference'] == {'rows': 5, 'updated': 0, 'seconds': pytest.approx(0, abs=5)}
+
+
+def test_shared_cache_encoding():
+    # Целые числа хранятся 64-битными значениями, чтобы uWSGI мог увеличивать их атомарно.
+    # Прочие значения не должны совпадать с ними по длине.
+    for value in (0, 1, -1, 2 ** 63 - 1, 'ab', b'abcdefgh', 2 ** 64, True, None, [1, 2], 1.5):
+        data = SharedCache._encode(value)
+        assert (len(data) == NUMBER.size) == (type(value) is int and value < 2 ** 63)
+
+        decoded = SharedCache._decode(data)
+        assert decoded == value
+        assert type(decoded) is type(value)
+
+    assert SharedCache._encode(5) == NUMBER.pack(5)
+
+
+def test_text_compiler_preview():
+
+    text = (
+        'Вступление.\n\n'
+        'Абзац **один**.\n\n'
+        '```\nцитата\n\nещё\n```\n\n'
+        '* пункт\n* пункт\n\n'
+        'Абзац **один**.\n\n'
+        '.. code:: python\n\ndef a():\n\n    pass\n\n\n'
+    )
+
+    blocks = TextCompiler.split_blocks(text)
+
+    assert ''.join(blocks) == text
+    assert len(blocks) == 6
+    assert blocks[2].startswith('```')
+    assert 'ещё' in blocks[2]
+    assert blocks[5].startswith('.. code::')
+    assert 'pass' in blocks[5]
+
+    preview = TextCompiler.compile_preview(text)
+    block_ids = preview['blocks']
+
+    assert len(block_ids) == 6
+    assert block_ids[1] == block_ids[4]
+    assert len(preview['html']) == 5
+    assert preview['html'][block_ids[0]] == TextCompiler.compile(blocks[0])
+    assert ''.join(preview['html'][block_id] for block_id in block_ids) == TextCompiler.compile(text)
+
+    edited = text.replace('* пункт\n* пункт', '* пункт\n* другой пункт')
+    preview = TextCompiler.compile_preview(edited, known=block_ids)
+
+    assert len(preview['blocks']) == 6
+    assert list(preview['html']) == [preview['blocks'][3]]
+    assert 'другой пункт' in preview['html'][preview['blocks'][3]]
+
+
+def test_text_compiler_preview_corpus():
+
+    for path in sorted(CORPUS_DIR.glob('*.rst')):
+        text = path.read_text()
+        preview = TextCompiler.compile_preview(text)
+        joined = ''.join(preview['html'][block_id] for block_id in preview['blocks'])
+
+        assert joined == TextCompiler.compile(text), path.name
+
+
+def test_text_compiler_preview_fuzz():
+
+    def check(text):
+        preview = TextCompiler.compile_preview(text)
+        joined = ''.join(preview['html'][block_id] for block_id in preview['blocks'])
+        assert joined == TextCompiler.compile(text), repr(text)
+
+    # Элемент списка и директива поглощают следующие за ними пустые строки.
+    check('*\n\n<b>`\n')
+    check('.. \n\nnote:: a\n')
+
+    rnd = Random(0)
+    tokens = [
+        '*', '* ', ' ', '\n', '\n\n', '\n\n\n', '`', '``', '```', '<b>', '</b>', '..', '.. ', 'code::', 'note::',
+        'table::', 'a', 'bb', '_', '-', '**', 'http://x.ru', '<http://y.ru>', '`_', '! a | b', '1.', '#', 'py',
+    ]
+
+    for _ in range(1000):
+        check(''.join(rnd.choices(tokens, k=rnd.randint(1, 14))))
+
+
+def test_typograph_corpus():
+
+    titles = (Path(__file__).parent / 'typograph_corpus.txt').read_text().splitlines()
+
+    expected = [BasicTypograph.apply_to_reference(title) for title in titles]
+
+    assert [BasicTypograph.apply_to(title) for title in titles] == expected
+    assert BasicTypograph.apply_many(titles) == expected
+    assert BasicTypograph.apply_many([]) == []
+    assert BasicTypograph.apply_many(['a\x00 - b', '']) == ['a\x00 — b', '']
+
+
+def test_typograph_differential():
+
+    rnd = Random(0)
+    alphabet = ['a', 'б', '1', '2', ' ', '  ', '\t', '\n', '-', '--', ',', '.', '..', '"', "'", "''",
+                '„', '“', '”', '\xad', '–', '—', '―', '−', '(', ')', 'c', 'с', 'tm', 'r', '(c)', '(tm)']
+
+    strings = [''.join(rnd.choices(alphabet, k=rnd.randint(0, 30))) for _ in range(5000)]
+
+    for string in strings:
+        assert BasicTypograph.apply_to(string) == BasicTypograph.apply_to_reference(string), repr(string)
+
+    assert BasicTypograph.apply_many(strings) == [BasicTypograph.apply_to_reference(string) for string in strings]
+
+
+def test_text_profiler():
+
+    text = (CORPUS_DIR / 'article_asyncio.rst').read_text()
+
+    with TextProfiler.enable() as profiler:
+        compiled = TextCompiler.compile(text)
+        BasicTypograph.apply_to('Статья - "о главном"...')
+
+    assert TextProfiler.current.get() is None
+    assert compiled == TextCompiler.compile(text)
+
+    with TextProfiler.enable() as profiler_outer:
+        # Компиляция в другом потоке не попадает в замеры.
+        thread = Thread(target=TextCompiler.compile, args=(text,))
+        thread.start()
+        thread.join()
+
+    assert profiler_outer.rules == {}
+
+    rules = profiler.rules
+    assert rules['compile_blocks'][0] == 1
+    assert rules['compile_blocks'][2] == rules['prepare'][3]
+    assert rules['render_code'][0] > 0
+    assert {'typograph_normalize', 'typograph_replace', 'typograph_quotes'} <= set(rules)
+    assert profiler.get_worst(1)[0][0] in rules
+
+    # Эталонная реализация учитывает каждое из правил.
+    with TextProfiler.enable() as profiler:
+        TextCompiler.apply_rules(TextCompiler.prepare(text))
+
+    assert {'RE_UL', 'RE_TABLE', 'RE_VIDEO', 'RE_URL'} <= set(profiler.rules)
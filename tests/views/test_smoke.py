@@ -1,9 +1,15 @@
+import re
+
 import pytest
 from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from sitecats.models import ModelWithCategory
 
-from pythonz.apps.realms import PEP, Article, Category, get_realm
+from pythonz.apps.generics.views import ListingView
+from pythonz.apps.realms import PEP, Article, Category, Discussion, get_realm
+from pythonz.apps.recompiler import TextRecompiler
 
 
 @pytest.fixture
@@ -302,3 +308,272 @@ def test_categories_feed(request_client, robot, init_category):
 
     content = client.get(f'/categories/{category.id}/feed/').content.decode()
     assert f'<guid isPermaLink="false">article_{article.id}</guid>' in content
+
+
+def test_listing_keyset(request_client, robot, monkeypatch):
+
+    monkeypatch.setattr(PEP, 'items_per_page', 2)
+    monkeypatch.setattr(ListingView, 'keyset_numbered_pages', 2)
+
+    for num in range(1, 8):
+        PEP.objects.create(num=num, title=f'pepkeyset{num}', status=PEP.Status.ACTIVE, submitter=robot)
+
+    # Одинаковые значения поля сортировки различаются по идентификатору.
+    PEP.objects.update(time_created=timezone.now())
+
+    client = request_client(user=None)
+
+    def get_titles(content):
+        return re.findall(r'>(pepkeyset\d)<', content)
+
+    content = client.get('/peps/', {'p': 1}).content.decode()
+    titles = get_titles(content)
+    assert '?p=2' in content
+    assert '?p=3' not in content
+    assert '?after=' not in content
+
+    content = client.get('/peps/', {'p': 2}).content.decode()
+    titles.extend(get_titles(content))
+
+    while cursor := re.search(r'\?after=([\w-]+)', content):
+        content = client.get('/peps/', {'after': cursor.group(1)}).content.decode()
+        assert '?p=2' not in content
+        titles.extend(get_titles(content))
+
+    assert sorted(titles) == [f'pepkeyset{num}' for num in range(1, 8)]
+
+    # Некорректный курсор приводит к первой странице.
+    content = client.get('/peps/', {'after': 'broken'}).content.decode()
+    assert get_titles(content) == titles[:2]
+
+
+def test_listing_count_cached(request_client, robot, init_category):
+
+    client = request_client(user=None)
+    category = init_category(title='counted')
+
+    def publish(title):
+        article = Article(submitter=robot, title=title)
+        article.mark_published()
+        article.save()
+        return article
+
+    def get_counts(url):
+        with CaptureQueriesContext(connection) as captured:
+            content = client.get(url).content.decode()
+        return content, len([query for query in captured if 'COUNT(' in query['sql']])
+
+    untagged = publish('countedone')
+    tagged = publish('countedtwo')
+
+    # Количество подсчитывается лишь однажды.
+    assert get_counts('/articles/')[1] == 1
+    assert get_counts('/articles/')[1] == 0
+
+    # Смена статуса инвалидирует количество.
+    publish('countedthree')
+    content, counts = get_counts('/articles/')
+    assert counts == 1
+    assert 'countedthree' in content
+
+    url_tags = f'/articles/tags/{category.id}/'
+    tagged.add_to_category(category, user=robot)
+    assert get_counts(url_tags)[1] == 1
+    assert get_counts(url_tags)[1] == 0
+
+    # Как и изменение связи с категорией.
+    untagged.add_to_category(category, user=robot)
+    content, counts = get_counts(url_tags)
+    assert counts == 1
+    assert 'countedone' in content
+
+    # И удаление объекта (в том числе не привязанного к категориям).
+    deleted = publish('countedfour')
+    get_counts('/articles/')
+    assert get_counts('/articles/')[1] == 0
+    deleted.delete()
+    content, counts = get_counts('/articles/')
+    assert counts == 1
+    assert 'countedfour' not in content
+
+
+def test_listing_watermark(request_client, robot, init_category):
+
+    client = request_client(user=None)
+    category = init_category(title='watermarked')
+
+    article = Article(submitter=robot, title='watermarked')
+    article.mark_published()
+    article.save()
+
+    def get(url, **headers):
+        return client.get(url, headers=headers)
+
+    response = get('/articles/')
+    etag = response['ETag']
+    assert etag.startswith('W/')
+    assert response['Last-Modified']
+
+    # Условный запрос обслуживается без обращения к БД.
+    with CaptureQueriesContext(connection) as captured:
+        assert get('/articles/', if_none_match=etag).status_code == 304
+    assert not captured.captured_queries
+
+    # Изменения связей с категориями учитывают и метка категории, и метка области.
+    url_tags = f'/articles/tags/{category.id}/'
+    etag_tags = get(url_tags)['ETag']
+    assert get(url_tags, if_none_match=etag_tags).status_code == 304
+
+    article.add_to_category(category, user=robot)
+    assert get(url_tags, if_none_match=etag_tags).status_code == 200
+    response = get('/articles/', if_none_match=etag)
+    assert response.status_code == 200
+
+    etag = response['ETag']
+    assert get('/articles/', if_none_match=etag).status_code == 304
+
+    # Сохранение объекта изменяет метку области.
+    article.save()
+    response = get('/articles/', if_none_match=etag)
+    assert response.status_code == 200
+
+    # Как и удаление объекта.
+    etag = response['ETag']
+    assert get('/articles/', if_none_match=etag).status_code == 304
+    article.delete()
+    assert get('/articles/', if_none_match=etag).status_code == 200
+
+
+def test_details_etag(request_client, robot, user_create, init_category, monkeypatch, tmp_path):
+
+    article = Article(submitter=robot, title='etagged')
+    article.mark_published()
+    article.save()
+
+    url = f'/articles/{article.id}/'
+    client = request_client(user=None)
+
+    def check(expected_status):
+        nonlocal etag
+        response = client.get(url, headers={'if_none_match': etag})
+        assert response.status_code == expected_status
+        etag = response['ETag']
+
+    etag = client.get(url)['ETag']
+    check(304)
+
+    # Привязка к категории.
+    article.add_to_category(init_category(title='etagged'), user=robot)
+    check(200)
+    check(304)
+
+    # Обсуждение.
+    Discussion.objects.create(submitter=robot, title='etagged', linked_object=article)
+    check(200)
+    check(304)
+
+    # Перекомпиляция текста в обход save().
+    Article.objects.filter(pk=article.pk).update(text='stale')
+    TextRecompiler([Article], checkpoint=tmp_path / 'checkpoint.json', workers=1).run()
+    check(200)
+    check(304)
+
+    # Обновление сайта.
+    monkeypatch.setattr('pythonz.apps.generics.views.ETAG_VERSION', 'updated')
+    check(200)
+    check(304)
+
+    # Ajax-запросы по тому же адресу не кешируются.
+    assert 'ETag' not in client.get(url, headers={'HX-Request': 'true'})
+
+    # Флаги пользователя.
+    user = user_create()
+    client = request_client(user=user)
+    etag_user = client.get(url)['ETag']
+    assert etag_user != etag
+
+    article.set_bookmark(user)
+    assert client.get(url, headers={'if_none_match': etag_user}).status_code == 200
+
+
+def test_listing_categories_map(request_client, robot, init_category):
+
+    view = get_realm('article').get_view('listing')
+    client = request_client(user=None)
+
+    article = Article(submitter=robot, title='mapped')
+    article.mark_published()
+    article.save()
+
+    category = init_category(title='mappedone')
+    article.add_to_category(category, user=robot)
+
+    def get_categories():
+        with CaptureQueriesContext(connection) as captured:
+            categories = view.get_categories()
+        return [(category.title, category.note) for category in categories], len(captured)
+
+    categories, queries = get_categories()
+    assert categories == [('mappedone', f'/articles/tags/{category.id}/')]
+    assert queries
+
+    assert get_categories() == (categories, 0)
+
+    def get_listed():
+        return re.findall(r'class="mr-1 small">(mapped\w+)<', client.get('/articles/').content.decode())
+
+    assert get_listed() == ['mappedone']
+
+    # Изменение категории.
+    category.title = 'mappedtwo'
+    category.save()
+    assert get_categories()[0] == [('mappedtwo', f'/articles/tags/{category.id}/')]
+    assert get_listed() == ['mappedtwo']
+
+    # Изменение связей.
+    article.remove_from_category(category)
+    assert get_categories()[0] == []
+
+
+def test_most_voted_cached(robot, user_create, init_category):
+
+    category = init_category(title='voted')
+    user = user_create()
+
+    articles = []
+    for title in ('votedone', 'votedtwo'):
+        article = Article(submitter=robot, title=title)
+        article.mark_published()
+        article.save()
+        article.add_to_category(category, user=robot)
+        articles.append(article)
+
+    def get_most_voted():
+        with CaptureQueriesContext(connection) as captured:
+            objects = Article.get_most_voted_objects_in_category(str(category.id))
+        return [obj.title for obj in objects], len(captured)
+
+    assert get_most_voted()[0] == []
+
+    articles[0].set_support(user)
+    assert Article.get_most_voted_objects()[0].title == 'votedone'
+    assert get_most_voted()[0] == ['votedone']
+
+    # Из кеша берутся идентификаторы, объекты получаются одним запросом.
+    assert get_most_voted() == (['votedone'], 1)
+
+    # Голос инвалидирует и списки в категориях.
+    articles[1].set_support(user)
+    articles[1].set_support(robot)
+    assert get_most_voted()[0] == ['votedtwo', 'votedone']
+
+    # Как и изменение связей с категорией.
+    articles[0].remove_from_category(category)
+    assert get_most_voted()[0] == ['votedtwo']
+
+    # Снятый с публикации материал убирается из кеша.
+    articles[1].status = Article.Status.DRAFT
+    articles[1].save()
+    assert get_most_voted()[0] == []
+    assert Article.get_most_voted_objects()[0].title == 'votedone'
+    assert get_most_voted() == ([], 2)